@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Small timeline animation engine for the render loop
+
+A Track moves a value from `start` to `end` over `duration` seconds after an
+optional delay, with an easing curve and once / loop / ping-pong modes. Its
+position is a pure function of the monotonic clock, so a frame that runs late
+lands where it should be instead of accumulating error, and panels sharing an
+anchor time show the same position. Tracks are configured in place and the
+Timeline updates its active tracks without building new containers per frame.
+"""
+import math
+
+ONCE = "once"
+LOOP = "loop"
+PINGPONG = "pingpong"
+
+_EPSILON = 1e-4   # Wake just after a pixel boundary, not just before it
+
+
+def linear(p):
+    return p
+
+
+def ease_in(p):
+    return p * p * p
+
+
+def ease_out(p):
+    q = 1.0 - p
+    return 1.0 - q * q * q
+
+
+def ease_in_out(p):
+    return p * p * (3.0 - 2.0 * p)
+
+
+EASINGS = {"linear": linear, "ease_in": ease_in, "ease_out": ease_out, "ease_in_out": ease_in_out}
+
+
+def quantize(value):
+    """Round half up, the same way for every track, so motion never wobbles"""
+    return math.floor(value + 0.5)
+
+
+class Track:
+    """One animated value; `value` and `pixel` are refreshed by update()"""
+
+    __slots__ = ("start", "end", "duration", "delay", "repeat_delay", "easing", "mode",
+                 "began", "value", "pixel", "active", "done", "_remaining", "_direction")
+
+    def __init__(self):
+        self.active = False
+        self.configure(0.0, 0.0, 0.0)
+
+    def configure(self, start, end, duration, delay=0.0, easing=linear, mode=ONCE, repeat_delay=0.0):
+        """Set up the motion; `repeat_delay` holds at the start of every loop
+        (and at both ends for ping-pong)"""
+        self.start = float(start)
+        self.end = float(end)
+        self.duration = max(float(duration), 1e-6)
+        self.delay = float(delay)
+        self.repeat_delay = float(repeat_delay)
+        self.easing = easing
+        self.mode = mode
+        self.value = self.start
+        self.pixel = quantize(self.start)
+        self.done = False
+        self._remaining = None
+        self._direction = 0
+        return self
+
+    def begin(self, anchor):
+        """Start (or re-anchor) the track at monotonic time `anchor`"""
+        self.began = anchor
+        self.active = True
+        self.done = False
+
+    def _progress(self, local):
+        """Linear progress 0..1 at `local` seconds past the delay
+
+        Also records how long the current segment lasts and which way the
+        value is moving (+1, -1 or 0 while holding).
+        """
+        d = self.duration
+        hold = self.repeat_delay
+        if self.mode == ONCE:
+            if local >= d:
+                self._remaining, self._direction = None, 0
+                return 1.0
+            self._remaining, self._direction = d - local, 1
+            return local / d
+        if self.mode == LOOP:
+            if local < d:
+                self._remaining, self._direction = d - local, 1
+                return local / d
+            r = (local - d) % (hold + d)
+            if r < hold:
+                self._remaining, self._direction = hold - r, 0
+                return 0.0
+            self._remaining, self._direction = hold + d - r, 1
+            return (r - hold) / d
+        r = local % (2.0 * (d + hold))
+        if r < d:
+            self._remaining, self._direction = d - r, 1
+            return r / d
+        if r < d + hold:
+            self._remaining, self._direction = d + hold - r, 0
+            return 1.0
+        if r < 2.0 * d + hold:
+            self._remaining, self._direction = 2.0 * d + hold - r, -1
+            return 1.0 - (r - d - hold) / d
+        self._remaining, self._direction = 2.0 * (d + hold) - r, 0
+        return 0.0
+
+    def update(self, now):
+        local = now - self.began - self.delay
+        if local < 0.0:
+            self.value = self.start
+            self._remaining, self._direction = -local, 0
+        else:
+            p = self._progress(local)
+            self.value = self.start + (self.end - self.start) * self.easing(p)
+            if self.mode == ONCE and self._remaining is None:
+                self.done = True
+        self.pixel = quantize(self.value)
+
+    def next_change(self, now, frame_interval):
+        """Monotonic time the quantized position next changes, or None if never
+
+        Linear motion is solved exactly, so a 3 px/s marquee is drawn exactly
+        when it moves a pixel rather than on whichever frame tick comes next.
+        """
+        if self.done or self._remaining is None:
+            return None
+        segment_end = now + self._remaining + _EPSILON
+        if self._direction == 0:
+            return segment_end
+        if self.easing is not linear:
+            return min(now + frame_interval, segment_end)
+        speed = abs(self.end - self.start) / self.duration
+        if speed == 0.0:
+            return segment_end
+        rising = (self.end - self.start) * self._direction > 0
+        boundary = self.pixel + 0.5 if rising else self.pixel - 0.5
+        return min(now + abs(boundary - self.value) / speed + _EPSILON, segment_end)
+
+
+class Timeline:
+    """The active tracks of one display, updated once per frame"""
+
+    def __init__(self):
+        self.tracks = []
+
+    def play(self, track, anchor):
+        track.begin(anchor)
+        if track not in self.tracks:
+            self.tracks.append(track)
+        return track
+
+    def stop(self, track):
+        track.active = False
+        if track in self.tracks:
+            self.tracks.remove(track)
+
+    def update(self, now):
+        """Advance every active track; finished one-shot tracks are dropped"""
+        i = 0
+        tracks = self.tracks
+        while i < len(tracks):
+            track = tracks[i]
+            track.update(now)
+            if track.done:
+                track.active = False
+                del tracks[i]
+            else:
+                i += 1
+
+    def next_change(self, now, frame_interval):
+        """Earliest time any active track moves, or None when all are still"""
+        soonest = None
+        for track in self.tracks:
+            t = track.next_change(now, frame_interval)
+            if t is not None and (soonest is None or t < soonest):
+                soonest = t
+        return soonest
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Minimal BDF bitmap font reader and RGB framebuffer text drawing
+
+Renders the same .bdf files the rgbmatrix library uses into a plain
+bytearray framebuffer (width * height * 3, row-major RGB), so pages, layers
+and headless previews can be rasterized off the panel and pixel-match it.
+"""
+import os
+
+
+class Glyph:
+    __slots__ = ("advance", "width", "height", "x_off", "y_off", "rows", "row_bits")
+
+    def __init__(self, advance, width, height, x_off, y_off, rows):
+        self.advance = advance
+        self.width = width
+        self.height = height
+        self.x_off = x_off
+        self.y_off = y_off
+        self.rows = rows
+        self.row_bits = ((width + 7) // 8) * 8
+
+
+class BdfFont:
+    """Glyphs by code point; missing characters draw as the default glyph"""
+
+    def __init__(self, glyphs, height, ascent, default_advance):
+        self.glyphs = glyphs
+        self.height = height
+        self.ascent = ascent
+        self.default_advance = default_advance
+        self.default = glyphs.get(ord("?"))
+
+    @classmethod
+    def load(cls, path):
+        glyphs = {}
+        height = ascent = 0
+        advance = 6
+        with open(path, "r", encoding="latin-1") as f:
+            lines = iter(f.read().splitlines())
+        for line in lines:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == "FONTBOUNDINGBOX":
+                advance, height = int(parts[1]), int(parts[2])
+            elif parts[0] == "FONT_ASCENT":
+                ascent = int(parts[1])
+            elif parts[0] == "STARTCHAR":
+                encoding, dwidth, bbx, rows = -1, advance, (0, 0, 0, 0), []
+                for line in lines:
+                    parts = line.split()
+                    if not parts:
+                        continue
+                    if parts[0] == "ENCODING":
+                        encoding = int(parts[1])
+                    elif parts[0] == "DWIDTH":
+                        dwidth = int(parts[1])
+                    elif parts[0] == "BBX":
+                        bbx = tuple(int(p) for p in parts[1:5])
+                    elif parts[0] == "BITMAP":
+                        for line in lines:
+                            if line.startswith("ENDCHAR"):
+                                break
+                            rows.append(int(line.strip() or "0", 16))
+                        break
+                if encoding >= 0:
+                    glyphs[encoding] = Glyph(dwidth, bbx[0], bbx[1], bbx[2], bbx[3], rows)
+        return cls(glyphs, height, ascent or height, advance)
+
+    @classmethod
+    def placeholder(cls, width=6, height=10):
+        """Hollow boxes of the right size, for when the .bdf file is missing"""
+        box_w, box_h = width - 1, height - 3
+        full = (1 << 7) | (((1 << (box_w - 1)) - 1) << (8 - box_w))
+        edge = (1 << 7) | (1 << (8 - box_w))
+        rows = [full] + [edge] * (box_h - 2) + [full]
+        glyph = Glyph(width, box_w, box_h, 0, 0, rows)
+        font = cls({}, height, height - 2, width)
+        font.default = glyph
+        font.glyphs[32] = Glyph(width, 0, 0, 0, 0, [])
+        return font
+
+    @classmethod
+    def load_or_placeholder(cls, path, width=6, height=10):
+        if os.path.exists(path):
+            try:
+                return cls.load(path)
+            except (OSError, ValueError):
+                pass
+        return cls.placeholder(width, height)
+
+    def glyph(self, ch):
+        return self.glyphs.get(ord(ch), self.default)
+
+    def text_width(self, text):
+        width = 0
+        for ch in text:
+            g = self.glyph(ch)
+            width += g.advance if g is not None else self.default_advance
+        return width
+
+    def draw(self, buf, buf_w, buf_h, x, baseline, text, rgb):
+        """Draw `text` into an RGB bytearray; returns the advance like DrawText"""
+        r, g_, b = rgb
+        start_x = x
+        for ch in text:
+            glyph = self.glyph(ch)
+            if glyph is None:
+                x += self.default_advance
+                continue
+            top = baseline - glyph.y_off - glyph.height
+            left = x + glyph.x_off
+            shift = glyph.row_bits - 1
+            for row_index, bits in enumerate(glyph.rows):
+                py = top + row_index
+                if bits == 0 or py < 0 or py >= buf_h:
+                    continue
+                row_base = py * buf_w
+                for col in range(glyph.width):
+                    if bits >> (shift - col) & 1:
+                        px = left + col
+                        if 0 <= px < buf_w:
+                            i = (row_base + px) * 3
+                            buf[i] = r
+                            buf[i + 1] = g_
+                            buf[i + 2] = b
+            x += glyph.advance
+        return x - start_x
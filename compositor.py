@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Layered frame compositor for the title screen
+
+The screen is a stack of layers (title marquee, key/capo, song counter,
+clock, set timer, status icons, beat marker), each a box on the panel with
+its own cached raster. A layer says what it shows with content(now); the
+raster is redrawn only when that changes, and is kept as the list of its lit
+spans, so putting a frame together is a few slice copies per layer. A
+marquee rasterizes its whole title once and only moves a window over it.
+A 1 Hz clock and a 30 FPS marquee each cost their own redraw, nothing else.
+
+Frames are RGB bytes (width * height * 3, row-major), the same format as
+bdf_font buffers; black is transparent, later layers draw on top.
+"""
+import time
+
+_UNSET = object()
+TICK_SLACK = 0.001
+
+
+def _runs(buf, width, height):
+    """Lit spans of an RGB buffer: [(row, x, bytes)]"""
+    runs = []
+    for y in range(height):
+        row = buf[y * width * 3:(y + 1) * width * 3]
+        if not any(row):
+            continue
+        x = 0
+        while x < width:
+            if any(row[x * 3:x * 3 + 3]):
+                start = x
+                while x < width and any(row[x * 3:x * 3 + 3]):
+                    x += 1
+                runs.append((y, start, bytes(row[start * 3:x * 3])))
+            else:
+                x += 1
+    return runs
+
+
+class Layer:
+    """A box on the panel with its own cached raster
+
+    Subclasses implement content(now) (any comparable value, None hides the
+    layer) and render(buf, width, height, content). scroll(now) may slide a
+    raster wider than the box sideways without redrawing it.
+    """
+
+    def __init__(self, name, x, y, width, height):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.runs = []
+        self.renders = 0
+        self._content = _UNSET
+
+    def content(self, now):
+        raise NotImplementedError
+
+    def render(self, buf, width, height, content):
+        raise NotImplementedError
+
+    def raster_width(self, content):
+        return self.width
+
+    def scroll(self, now):
+        return 0
+
+    def next_change(self, now):
+        """Monotonic time this layer next looks different, or None if only events change it"""
+        return None
+
+    def move(self, x, y, width, height):
+        """Change the box; the raster is redrawn on the next refresh"""
+        if (x, y, width, height) == (self.x, self.y, self.width, self.height):
+            return
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self._content = _UNSET
+
+    def refresh(self, now):
+        """Redraw the raster if the content changed; True when it did"""
+        content = self.content(now)
+        if content == self._content:
+            return False
+        self._content = content
+        if content is None:
+            self.runs = []
+        else:
+            width = self.raster_width(content)
+            buf = bytearray(width * self.height * 3)
+            self.render(buf, width, self.height, content)
+            self.runs = _runs(buf, width, self.height)
+        self.renders += 1
+        return True
+
+    def blit(self, frame, frame_w, frame_h, dx):
+        left = max(self.x, 0)
+        right = min(self.x + self.width, frame_w)
+        for row, x, data in self.runs:
+            py = self.y + row
+            if not 0 <= py < frame_h:
+                continue
+            px = self.x + x - dx
+            start = max(px, left)
+            end = min(px + len(data) // 3, right)
+            if end <= start:
+                continue
+            offset = (py * frame_w + start) * 3
+            frame[offset:offset + (end - start) * 3] = data[(start - px) * 3:(end - px) * 3]
+
+
+class TextLayer(Layer):
+    """One line of text from text(now)
+
+    `interval` (seconds) re-reads it on wall-clock ticks, or on ticks counted
+    from the monotonic time origin() returns, for text that counts from there.
+    """
+
+    def __init__(self, name, x, y, width, height, font, text, rgb, align="left", interval=None, origin=None):
+        super().__init__(name, x, y, width, height)
+        self.font = font
+        self.text = text
+        self.rgb = rgb
+        self.align = align
+        self.interval = interval
+        self.origin = origin
+
+    def content(self, now):
+        text = self.text(now)
+        return (text, self.rgb(now) if callable(self.rgb) else self.rgb) if text else None
+
+    def render(self, buf, width, height, content):
+        text, rgb = content
+        x = 0
+        if self.align == "right":
+            x = width - self.font.text_width(text)
+        self.font.draw(buf, width, height, x, self.font.ascent, text, rgb)
+
+    def next_change(self, now):
+        if self.interval is None:
+            return None
+        since = now - self.origin() if self.origin is not None else time.time()
+        # A millisecond past the tick, so the text has certainly moved on by then
+        return now + self.interval - since % self.interval + TICK_SLACK
+
+
+class MarqueeLayer(TextLayer):
+    """Text rasterized once at full width; offset(now) scrolls it inside the box"""
+
+    def __init__(self, name, x, y, width, height, font, text, rgb, offset):
+        super().__init__(name, x, y, width, height, font, text, rgb)
+        self.offset = offset
+
+    def raster_width(self, content):
+        return max(self.width, self.font.text_width(content[0]))
+
+    def scroll(self, now):
+        return self.offset(now)
+
+
+class Compositor:
+    def __init__(self, width, height, layers):
+        self.width = width
+        self.height = height
+        self.layers = list(layers)
+        self.frame = bytes(width * height * 3)
+        self.version = 0          # Bumped whenever the composed frame changes
+        self._scrolls = None
+
+    def compose(self, now):
+        """Refresh the layers and rebuild the frame if any changed; returns self.frame"""
+        dirty = False
+        for layer in self.layers:
+            dirty = layer.refresh(now) or dirty
+        scrolls = tuple(layer.scroll(now) for layer in self.layers)
+        if not dirty and scrolls == self._scrolls:
+            return self.frame
+        self._scrolls = scrolls
+        frame = bytearray(self.width * self.height * 3)
+        for layer, dx in zip(self.layers, scrolls):
+            layer.blit(frame, self.width, self.height, dx)
+        self.frame = bytes(frame)
+        self.version += 1
+        return self.frame
+
+    def next_change(self, now):
+        times = [t for t in (layer.next_change(now) for layer in self.layers) if t is not None]
+        return min(times) if times else None
+
+    def layer(self, name):
+        return next(layer for layer in self.layers if layer.name == name)
+
+    def stats(self):
+        return " ".join(f"{layer.name}={layer.renders}" for layer in self.layers)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Leader/follower display sync over UDP multicast
+
+The leader panel multicasts a compact, sequence-numbered state packet on every
+song change and again every heartbeat. Followers apply it as soon as it arrives
+and fetch the leader's setlist over TCP when their own copy has a different hash.
+
+Try it on one machine with two shells:
+    python3 display_sync.py leader
+    python3 display_sync.py follower
+"""
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import ringlog
+
+MCAST_GROUP = "239.255.67.89"
+MCAST_PORT = 6790
+FETCH_PORT = 6791            # TCP port the leader serves its setlist on
+HEARTBEAT_INTERVAL = 0.5     # Seconds between repeated state packets
+ANCHOR_TOLERANCE = 0.05      # Re-anchor scroll phase only if it drifted this much
+FETCH_TIMEOUT = 2.0          # A follower that stalls mid-fetch must not hold up the others
+
+# magic, version, leader session, sequence, setlist hash, song index, phase (ms)
+PACKET = struct.Struct("!4sBIQ8sHI")
+MAGIC = b"SLST"
+VERSION = 1
+
+
+def setlist_hash(setlist):
+    """Short stable hash identifying a setlist's content"""
+    data = json.dumps(setlist, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(data).digest()[:8]
+
+
+def pack_state(session, seq, set_hash, index, phase):
+    phase_ms = max(0, min(int(phase * 1000), 0xFFFFFFFF))
+    return PACKET.pack(MAGIC, VERSION, session, seq, set_hash, index, phase_ms)
+
+
+def unpack_state(data):
+    """Return (session, seq, set_hash, index, phase_seconds) or None if not ours"""
+    if len(data) != PACKET.size:
+        return None
+    magic, version, session, seq, set_hash, index, phase_ms = PACKET.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return session, seq, set_hash, index, phase_ms / 1000.0
+
+
+def _multicast_socket(iface="0.0.0.0"):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(iface))
+    return sock
+
+
+class SyncLeader:
+    """Multicasts the current display state and serves the setlist to followers"""
+
+    def __init__(self, group=MCAST_GROUP, port=MCAST_PORT, fetch_port=FETCH_PORT,
+                 iface="0.0.0.0", interval=HEARTBEAT_INTERVAL):
+        self.addr = (group, port)
+        self.fetch_port = fetch_port
+        self.interval = interval
+        self.session = struct.unpack("!I", os.urandom(4))[0]
+        self.seq = 0
+        self.sock = _multicast_socket(iface)
+        self._state_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._set_hash = b"\0" * 8
+        self._set_json = b"[]"
+        self._index = 0
+        self._anchor = time.monotonic()
+
+    def set_setlist(self, setlist):
+        """Hash and serialize the setlist once, not on every heartbeat"""
+        data = json.dumps(setlist).encode("utf-8")
+        with self._state_lock:
+            self._set_hash = setlist_hash(setlist)
+            self._set_json = data
+        self._wake.set()
+
+    def publish(self, index, anchor=None):
+        """Record a song change and send it right away
+
+        `anchor` is the time.monotonic() of the song change; followers receive
+        the elapsed time since then, so their scroll phase lines up without
+        needing synchronized wall clocks.
+        """
+        with self._state_lock:
+            self._index = index
+            self._anchor = time.monotonic() if anchor is None else anchor
+        self._wake.set()
+
+    def _send(self):
+        with self._state_lock:
+            self.seq += 1
+            packet = pack_state(self.session, self.seq, self._set_hash, self._index,
+                                time.monotonic() - self._anchor)
+        try:
+            self.sock.sendto(packet, self.addr)
+        except OSError as e:
+            ringlog.warning("❌ Sync send failed: %s", e)
+
+    def _heartbeat_loop(self):
+        while True:
+            self._send()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _fetch_server(self, srv):
+        while True:
+            conn, addr = srv.accept()
+            with conn:
+                try:
+                    conn.settimeout(FETCH_TIMEOUT)
+                    conn.recv(64)  # Requested hash; we always serve the current setlist
+                    with self._state_lock:
+                        data = self._set_json
+                    conn.sendall(data)
+                except OSError as e:
+                    ringlog.warning("❌ Setlist fetch from %s failed: %s", addr[0], e)
+
+    def start(self):
+        # Listen before the first heartbeat so followers can pull immediately
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind(("0.0.0.0", self.fetch_port))
+        srv.listen(4)
+        threading.Thread(target=self._fetch_server, args=(srv,), name="sync_fetch", daemon=True).start()
+        threading.Thread(target=self._heartbeat_loop, name="sync_leader", daemon=True).start()
+        return self
+
+
+def fetch_setlist(host, want_hash, port=FETCH_PORT, timeout=FETCH_TIMEOUT):
+    """Pull the leader's setlist; returns it only if it matches `want_hash`"""
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall(want_hash.hex().encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    setlist = json.loads(b"".join(chunks).decode("utf-8"))
+    if setlist_hash(setlist) != want_hash:
+        return None
+    return setlist
+
+
+class SyncFollower:
+    """Applies leader state packets as they arrive
+
+    `apply_state(setlist, index, phase)` is called from the receive thread;
+    `setlist` is None unless a new one was just fetched from the leader, and
+    raising ValueError then refuses it.
+    """
+
+    def __init__(self, apply_state, local_hash, group=MCAST_GROUP, port=MCAST_PORT,
+                 fetch_port=FETCH_PORT, iface="0.0.0.0"):
+        self.apply_state = apply_state
+        self.local_hash = local_hash
+        self.fetch_port = fetch_port
+        self.session = None
+        self.seq = 0
+        self.received = 0
+        self.lost = 0
+        self.stale = 0
+        self._fetching = False
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind(("", port))
+        mreq = socket.inet_aton(group) + socket.inet_aton(iface)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+
+    def _accept(self, session, seq):
+        """Drop duplicates and reordered packets; a new session means the leader restarted"""
+        if session != self.session:
+            self.session = session
+            self.seq = seq
+            return True
+        if seq <= self.seq:
+            self.stale += 1
+            return False
+        self.lost += seq - self.seq - 1
+        self.seq = seq
+        return True
+
+    def _fetch(self, host, want_hash, index, phase, received_at):
+        try:
+            setlist = fetch_setlist(host, want_hash, self.fetch_port)
+            if setlist is not None:
+                # apply_state may refuse the setlist with ValueError; then it is fetched again
+                self.apply_state(setlist, index, phase + time.monotonic() - received_at)
+                self.local_hash = want_hash
+        except (OSError, ValueError) as e:
+            ringlog.warning("❌ Setlist fetch from %s failed: %s", host, e)
+        finally:
+            self._fetching = False
+
+    def _receive_loop(self):
+        while True:
+            data, addr = self.sock.recvfrom(64)
+            state = unpack_state(data)
+            if state is None:
+                continue
+            session, seq, set_hash, index, phase = state
+            if not self._accept(session, seq):
+                continue
+            self.received += 1
+            if set_hash == self.local_hash:
+                self.apply_state(None, index, phase)
+            elif not self._fetching:
+                # Fetch off the receive thread; the next heartbeat retries on failure
+                self._fetching = True
+                threading.Thread(target=self._fetch, name="sync_pull", daemon=True,
+                                 args=(addr[0], set_hash, index, phase, time.monotonic())).start()
+
+    def start(self):
+        threading.Thread(target=self._receive_loop, name="sync_follower", daemon=True).start()
+        return self
+
+
+def _demo():
+    setlist_path = os.path.join(os.path.dirname(__file__), "setlist.json")
+    with open(setlist_path, "r", encoding="utf-8") as f:
+        setlist = json.load(f)
+    role = sys.argv[1] if len(sys.argv) > 1 else "leader"
+    ringlog.start()
+
+    if role == "leader":
+        leader = SyncLeader()
+        leader.set_setlist(setlist)
+        leader.start()
+        index = 0
+        print(f"📡 Leader session {leader.session:08x} on {MCAST_GROUP}:{MCAST_PORT}")
+        while True:
+            leader.publish(index)
+            print(f"🎵 {index + 1}: {setlist[index]['title']}")
+            time.sleep(3)
+            index = (index + 1) % len(setlist)
+    else:
+        def apply_state(new_setlist, index, phase):
+            if new_setlist is not None:
+                setlist[:] = new_setlist
+                print(f"📥 Pulled setlist with {len(setlist)} songs")
+            if 0 <= index < len(setlist):
+                print(f"🎵 {index + 1}: {setlist[index]['title']} (phase {phase:.3f}s)")
+
+        # Start with an empty hash so the demo follower always exercises the pull path
+        follower = SyncFollower(apply_state, b"").start()
+        print(f"👂 Following {MCAST_GROUP}:{MCAST_PORT}")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"📊 received={follower.received} lost={follower.lost} stale={follower.stale}")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    _demo()
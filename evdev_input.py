@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Page-turner pedal read straight from its evdev device
+
+The same key mapping pedal_service.py uses, as a pollable source for the
+reactor: the device fd is read only when the kernel says it is readable,
+and a pedal that disconnects (Bluetooth sleep, battery) is looked for
+again every few seconds. Key-down and key-up go through the gesture
+recognizer (pedal_gestures.py) with the kernel's event timestamps, which
+are switched to CLOCK_MONOTONIC so they compare with time.monotonic().
+Needs python-evdev and read access to /dev/input/event*.
+"""
+import fcntl
+import os
+import struct
+import time
+
+import ringlog
+from pedal_gestures import GestureRecognizer
+
+try:
+    import evdev
+except Exception:
+    evdev = None
+
+# DBM-20 shows up as "Bluetooth Music Pedal"; the others are common page turners
+PEDAL_KEYWORDS = ['compx', '2.4g', 'dbm', 'donner', 'page turner', 'bluetooth music pedal', 'music pedal', 'receiver']
+
+# DBM-20: left button sends KEY_UP, right button KEY_DOWN; the rest are page-turner fallbacks
+KEY_COMMANDS = {
+    'KEY_UP': 'PREV',
+    'KEY_DOWN': 'NEXT',
+    'KEY_LEFT': 'PREV',
+    'KEY_PAGEUP': 'PREV',
+    'KEY_RIGHT': 'NEXT',
+    'KEY_PAGEDOWN': 'NEXT',
+    'KEY_ENTER': 'PAGE NEXT',
+    'KEY_SPACE': 'PAGE NEXT',
+    'KEY_ESC': 'PAGE 0',
+}
+
+RESCAN_INTERVAL = 3.0
+POWER_SUPPLY_DIR = "/sys/class/power_supply"
+EVIOCSCLOCKID = 0x400445A0   # _IOW('E', 0xa0, int)
+
+
+def find_pedal_device(verbose=True):
+    """Find the DBM-20 or other page turner pedal device"""
+    devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
+    for device in devices:
+        device_name = device.name.lower()
+        for keyword in PEDAL_KEYWORDS:
+            if keyword in device_name:
+                if verbose:
+                    print(f"✅ Found pedal device: {device.name} at {device.path}")
+                return device
+    if verbose:
+        # If no obvious pedal found, list all keyboard-like devices
+        print("❌ No obvious pedal device found. Available input devices:")
+        for device in devices:
+            if evdev.ecodes.EV_KEY in device.capabilities():
+                print(f"  - {device.name} ({device.path}) - keyboard capable")
+            else:
+                print(f"  - {device.name} ({device.path})")
+    return None
+
+
+def set_monotonic_clock(fd):
+    """Timestamp this device's events with CLOCK_MONOTONIC; False if the kernel refuses"""
+    try:
+        fcntl.ioctl(fd, EVIOCSCLOCKID, struct.pack("i", time.CLOCK_MONOTONIC))
+        return True
+    except OSError as e:
+        ringlog.warning("🦶 Event timestamps stay on the wall clock: %r", e)
+        return False
+
+
+def pedal_battery():
+    """Charge in percent that a Bluetooth HID pedal reports to the kernel, or None"""
+    try:
+        supplies = sorted(os.listdir(POWER_SUPPLY_DIR))
+    except OSError:
+        return None
+    for name in supplies:
+        if not name.startswith("hid-"):
+            continue
+        try:
+            with open(os.path.join(POWER_SUPPLY_DIR, name, "capacity"), "r") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def command_for(keycode):
+    """Command for a key-down keycode (evdev may give a list of aliases)"""
+    for code in keycode if isinstance(keycode, list) else [keycode]:
+        if code in KEY_COMMANDS:
+            return KEY_COMMANDS[code]
+    return None
+
+
+class PedalInput:
+    """Reactor source: on_command(command) for each recognized gesture"""
+
+    def __init__(self, on_command):
+        self.on_command = on_command
+        self.device = None
+        self.monotonic = False
+        self.retry_at = time.monotonic()
+        self.presses = 0
+        self.gestures = GestureRecognizer(lambda command, gesture: self.on_command(command))
+
+    def fileno(self):
+        return self.device.fd if self.device is not None else None
+
+    def next_deadline(self):
+        if self.device is None:
+            return self.retry_at
+        return self.gestures.next_deadline()
+
+    def _open(self):
+        self.retry_at = time.monotonic() + RESCAN_INTERVAL
+        try:
+            self.device = find_pedal_device(verbose=False)
+        except OSError as e:
+            ringlog.warning("🦶 Pedal scan failed: %r", e)
+            self.device = None
+        if self.device is not None:
+            self.monotonic = set_monotonic_clock(self.device.fd)
+            ringlog.info("🦶 Pedal on %s (%s)", self.device.path, self.device.name)
+
+    def step(self, timeout=0):
+        if self.device is None:
+            if time.monotonic() >= self.retry_at:
+                self._open()
+            return
+        try:
+            for event in self.device.read():
+                if event.type != evdev.ecodes.EV_KEY:
+                    continue
+                key_event = evdev.categorize(event)
+                timestamp = event.timestamp() if self.monotonic else time.monotonic()
+                if key_event.keystate == evdev.KeyEvent.key_up:
+                    self.gestures.key_up(event.code, timestamp)
+                    continue
+                if key_event.keystate != evdev.KeyEvent.key_down:
+                    continue  # Autorepeat: holds are timed here, not by the keyboard driver
+                command = command_for(key_event.keycode)
+                if command is None:
+                    ringlog.debug("🦶 Unmapped pedal key %s", key_event.keycode)
+                    continue
+                self.presses += 1
+                self.gestures.key_down(event.code, command, timestamp)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            ringlog.warning("🦶 Pedal disconnected: %r", e)
+            try:
+                self.device.close()
+            except OSError:
+                pass
+            self.device = None
+            self.gestures.reset()
+            self.retry_at = time.monotonic() + RESCAN_INTERVAL
+            return
+        self.gestures.poll(time.monotonic())
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Capture of every frame the panel showed, for rehearsal review
+
+main.py --capture writes captures/capture-<time>.slfc. The render thread
+only hands each drawn frame to a bounded queue (a full queue drops the
+frame and counts it, it never waits); a writer thread encodes and writes.
+Each frame is XORed with the one before, so unchanged pixels become zeros,
+and then run-length coded: a marquee step costs a few hundred bytes instead
+of a whole frame. Every KEY_INTERVAL frames is XORed with black instead, so
+a damaged file can be read from the next key frame.
+
+    header:  "SLFC" u8 version, u16 width, u16 height, f64 wall-clock start
+    frame:   f64 seconds since start, u8 kind (0 key, 1 delta), u32 length,
+             then (varint length, literal XOR bytes, varint zeros) runs
+
+Play one back or check it against a golden capture:
+    python3 frame_capture.py info captures/capture-20250101-200000.slfc
+    python3 frame_capture.py png captures/capture-...slfc frames/ --scale 8
+    python3 frame_capture.py gif captures/capture-...slfc rehearsal.gif --start 60 --end 90
+    python3 frame_capture.py diff new.slfc golden.slfc --png diffs/
+"""
+import argparse
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+
+import ringlog
+
+MAGIC = b"SLFC"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHd")
+RECORD = struct.Struct("<dBI")
+KEY, DELTA = 0, 1
+KEY_INTERVAL = 256        # Frames between key frames
+MIN_RUN = 4               # Shorter zero runs stay in the literal
+QUEUE_FRAMES = 64         # Two seconds at 30 FPS; past that frames are dropped, not waited for
+FLUSH_INTERVAL = 1.0
+CAPTURE_DIR = "captures"
+
+_zero_runs = re.compile(b"\\x00{%d,}" % MIN_RUN)
+
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _xor(a, b):
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def encode(frame, previous=None):
+    """Run-length coded XOR of frame with previous (None: a key frame)"""
+    diff = _xor(frame, previous) if previous is not None else bytes(frame)
+    out = []
+    pos = 0
+    for run in _zero_runs.finditer(diff):
+        out.append(_varint(run.start() - pos))
+        out.append(diff[pos:run.start()])
+        out.append(_varint(run.end() - run.start()))
+        pos = run.end()
+    if pos < len(diff):
+        out.append(_varint(len(diff) - pos))
+        out.append(diff[pos:])
+        out.append(_varint(0))
+    return b"".join(out)
+
+
+def decode(payload, previous, size):
+    """The frame from a payload and the frame before it (None for a key frame)"""
+    frame = bytearray(previous) if previous is not None else bytearray(size)
+    pos = offset = 0
+    while pos < len(payload):
+        length, pos = _read_varint(payload, pos)
+        if length:
+            literal = payload[pos:pos + length]
+            frame[offset:offset + length] = _xor(literal, frame[offset:offset + length])
+            pos += length
+            offset += length
+        zeros, pos = _read_varint(payload, pos)
+        offset += zeros
+    return bytes(frame)
+
+
+def _image_pixels(image, width, height):
+    """RGB bytes of a PIL image drawn at the top left of a black panel"""
+    from PIL import Image
+    panel = Image.new("RGB", (width, height))
+    if image is not None:
+        panel.paste(image.convert("RGB"), (0, 0))
+    return panel.tobytes()
+
+
+class CaptureWriter:
+    """Bounded queue in front of a writer thread; note() never blocks the render thread"""
+
+    def __init__(self, path, width, height, queue_frames=QUEUE_FRAMES):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.size = width * height * 3
+        self.started = time.monotonic()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height, time.time()))
+        self._queue = queue.Queue(maxsize=queue_frames)
+        self._previous = None
+        self._flushed_at = self.started
+        self.frames = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.bytes_written = HEADER.size
+        self.thread = threading.Thread(target=self._run, name="frame_capture", daemon=True)
+        self.thread.start()
+
+    def note(self, frame, t=None, block=False):
+        """Queue a frame (RGB bytes, or a PIL image / None for a chart page); t defaults to now"""
+        t = time.monotonic() - self.started if t is None else t
+        try:
+            self._queue.put((t, frame), block=block)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except (OSError, ValueError) as e:
+                ringlog.error("❌ Frame capture write failed: %r", e)
+                break
+        self.file.close()
+
+    def _write(self, t, frame):
+        if not isinstance(frame, (bytes, bytearray)):
+            frame = _image_pixels(frame, self.width, self.height)
+        if len(frame) != self.size:
+            raise ValueError(f"frame is {len(frame)} bytes, expected {self.size}")
+        if frame == self._previous:
+            self.duplicates += 1
+            return
+        key = self._previous is None or self.frames % KEY_INTERVAL == 0
+        payload = encode(frame, None if key else self._previous)
+        self.file.write(RECORD.pack(t, KEY if key else DELTA, len(payload)) + payload)
+        self._previous = bytes(frame)
+        self.frames += 1
+        self.bytes_written += RECORD.size + len(payload)
+        now = time.monotonic()
+        if now - self._flushed_at >= FLUSH_INTERVAL:
+            self.file.flush()
+            self._flushed_at = now
+
+    def close(self):
+        try:
+            self._queue.put(None, timeout=2.0)
+        except queue.Full:
+            pass   # The writer has stopped after an error
+        self.thread.join(timeout=5.0)
+
+    def stats_line(self):
+        raw = self.frames * self.size
+        ratio = raw / self.bytes_written if self.bytes_written else 0.0
+        return (f"{self.path}: frames={self.frames} duplicates={self.duplicates} dropped={self.dropped} "
+                f"queued={self._queue.qsize()} bytes={self.bytes_written} ratio={ratio:.0f}x")
+
+
+def read_capture(path):
+    """(width, height, wall start, frames) where frames yields (seconds, RGB bytes)"""
+    f = open(path, "rb")
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:4] != MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a frame capture")
+    _, version, width, height, wall = HEADER.unpack(header)
+    if version != VERSION:
+        f.close()
+        raise ValueError(f"{path} is capture version {version}, expected {VERSION}")
+
+    def frames():
+        size = width * height * 3
+        previous = None
+        with f:
+            while True:
+                record = f.read(RECORD.size)
+                if len(record) < RECORD.size:
+                    return
+                t, kind, length = RECORD.unpack(record)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return   # Cut off mid-frame: the capture was still being written
+                if kind == DELTA and previous is None:
+                    continue  # Damaged start; wait for a key frame
+                previous = decode(payload, previous if kind == DELTA else None, size)
+                yield t, previous
+
+    return width, height, wall, frames()
+
+
+# -- Capture for main.py --
+
+capture = None
+
+
+def start(width, height, path=None, directory=CAPTURE_DIR):
+    """Capture from now on, to `path` or a fresh file in `directory`"""
+    global capture
+    if not path:
+        path = os.path.join(directory, f"capture-{time.strftime('%Y%m%d-%H%M%S')}.slfc")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    capture = CaptureWriter(path, width, height)
+    return capture
+
+
+def note(frame):
+    """Capture a frame that just went to the panel; a no-op unless capturing"""
+    if capture is not None:
+        capture.note(frame)
+
+
+def stop():
+    global capture
+    if capture is not None:
+        capture.close()
+        capture = None
+
+
+# -- Player and visual regression --
+
+def _image(frame, width, height, scale):
+    from PIL import Image
+    image = Image.frombytes("RGB", (width, height), frame)
+    return image.resize((width * scale, height * scale), Image.NEAREST) if scale > 1 else image
+
+
+def _in_range(frames, start, end):
+    for t, frame in frames:
+        if t < start:
+            continue
+        if end is not None and t > end:
+            return
+        yield t, frame
+
+
+def info(path):
+    width, height, wall, frames = read_capture(path)
+    count = last = 0
+    for last, _ in frames:
+        count += 1
+    size = os.path.getsize(path)
+    raw = count * width * height * 3
+    print(f"{path}: {width}x{height}, {count} frames over {last:.1f}s from "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall))}, "
+          f"{size} bytes ({raw / size if size else 0:.0f}x smaller than raw)")
+
+
+def export_png(path, directory, scale=8, start=0.0, end=None):
+    width, height, _, frames = read_capture(path)
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for t, frame in _in_range(frames, start, end):
+        count += 1
+        _image(frame, width, height, scale).save(os.path.join(directory, f"frame-{count:05d}-{t:09.3f}.png"))
+    print(f"🖼️  {count} frames written to {directory}")
+
+
+def export_gif(path, out, scale=8, start=0.0, end=None):
+    width, height, _, frames = read_capture(path)
+    images, durations = [], []
+    last_t = None
+    for t, frame in _in_range(frames, start, end):
+        if last_t is not None:
+            durations.append(max(20, int((t - last_t) * 1000)))
+        images.append(_image(frame, width, height, scale))
+        last_t = t
+    if not images:
+        print("no frames in that range")
+        return
+    durations.append(1000)   # The last frame stayed up until the capture ended; show it for a second
+    images[0].save(out, save_all=True, append_images=images[1:], duration=durations, loop=0)
+    print(f"🎞️  {len(images)} frames written to {out}")
+
+
+def _differing_pixels(a, b):
+    diff = _xor(a, b)
+    return sum(1 for i in range(0, len(diff), 3) if diff[i:i + 3] != b"\0\0\0")
+
+
+def diff(path, golden, directory=None, scale=8):
+    """Frame-by-frame comparison; returns a list of differences, empty when they match"""
+    width, height, _, frames = read_capture(path)
+    g_width, g_height, _, golden_frames = read_capture(golden)
+    if (width, height) != (g_width, g_height):
+        return [f"panel size {width}x{height}, golden is {g_width}x{g_height}"]
+    frames, golden_frames = list(frames), list(golden_frames)
+    problems = []
+    if len(frames) != len(golden_frames):
+        problems.append(f"{len(frames)} frames, golden has {len(golden_frames)}")
+    for number, ((t, frame), (_, expected)) in enumerate(zip(frames, golden_frames), 1):
+        if frame == expected:
+            continue
+        problems.append(f"frame {number} at {t:.3f}s: {_differing_pixels(frame, expected)} pixels differ")
+        if directory:
+            from PIL import Image
+            os.makedirs(directory, exist_ok=True)
+            side = Image.new("RGB", (width * scale * 3, height * scale))
+            changed = _xor(frame, expected)
+            marks = bytes(255 if i % 3 == 0 and any(changed[i:i + 3]) else 0 for i in range(len(frame)))
+            for slot, pixels in enumerate((expected, frame, marks)):
+                side.paste(_image(pixels, width, height, scale), (slot * width * scale, 0))
+            side.save(os.path.join(directory, f"diff-{number:05d}.png"))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back or compare panel frame captures")
+    sub = parser.add_subparsers(dest="action", required=True)
+    p = sub.add_parser("info", help="frame count, duration and compression")
+    p.add_argument("capture")
+    for name, target in (("png", "directory"), ("gif", "out")):
+        p = sub.add_parser(name, help=f"export frames as {name.upper()}")
+        p.add_argument("capture")
+        p.add_argument(target)
+        p.add_argument("--scale", type=int, default=8, help="pixels per panel LED")
+        p.add_argument("--start", type=float, default=0.0, help="seconds into the capture")
+        p.add_argument("--end", type=float, help="seconds into the capture")
+    p = sub.add_parser("diff", help="compare with a golden capture; exit status 1 if they differ")
+    p.add_argument("capture")
+    p.add_argument("golden")
+    p.add_argument("--png", metavar="DIR", help="write golden | new | changed pixels images here")
+    args = parser.parse_args()
+    if args.action == "info":
+        info(args.capture)
+    elif args.action == "png":
+        export_png(args.capture, args.directory, args.scale, args.start, args.end)
+    elif args.action == "gif":
+        export_gif(args.capture, args.out, args.scale, args.start, args.end)
+    else:
+        problems = diff(args.capture, args.golden, args.png)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            sys.exit(1)
+        print("✅ Matches the golden capture")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Interrupt-driven GPIO buttons on the Linux GPIO character device
+
+Edge events come from the kernel with CLOCK_MONOTONIC timestamps and are
+waited on with epoll, so a press is handled as soon as the interrupt fires.
+Debouncing is done in software per pin using those timestamps: the first edge
+acts immediately and edges inside the debounce window are treated as bounce.
+The window adapts to each switch: it is kept at ADAPT_MARGIN times the longest
+bounce seen over the last BOUNCE_HISTORY edges, within MIN/MAX_DEBOUNCE_MS, so
+a clean switch allows fast double taps and a worn one is not read twice.
+Holding a button past its long-press time fires a second action.
+
+Needs the libgpiod v2 bindings (pip install gpiod). Without a Pi, try the
+mock line provider:
+    python3 gpio_buttons.py --mock
+"""
+import os
+import select
+import sys
+import threading
+import time
+from collections import deque
+
+import ringlog
+
+try:
+    import gpiod
+    from gpiod.line import Bias, Clock, Edge, Value
+except Exception:
+    gpiod = None
+
+GPIO_CHIP = "/dev/gpiochip0"
+DEFAULT_DEBOUNCE_MS = 30      # Starting window, before any bounce has been measured
+MIN_DEBOUNCE_MS = 10
+MAX_DEBOUNCE_MS = 100
+ADAPT_MARGIN = 2.0            # Window as a multiple of the longest recent bounce
+BOUNCE_HISTORY = 16           # Edges whose bounce length the window is based on
+ADAPT_AFTER = 8               # Edges measured before the window may shrink; it grows at once
+DEFAULT_LONG_PRESS_MS = 800
+
+
+class Button:
+    """One active-low push button and its debounce state"""
+
+    def __init__(self, pin, on_press, on_long_press=None,
+                 debounce_ms=DEFAULT_DEBOUNCE_MS, long_press_ms=DEFAULT_LONG_PRESS_MS):
+        self.pin = pin
+        self.on_press = on_press
+        self.on_long_press = on_long_press
+        self.debounce_ns = int(debounce_ms * 1_000_000)
+        self.long_press_ns = int(long_press_ms * 1_000_000)
+        self.pressed = False
+        self.last_edge_ns = None     # Timestamp of the last accepted edge
+        self.last_bounce_ns = None   # Timestamp of the last bounce after it
+        self.window_open = False     # The last accepted edge's bounce is not measured yet
+        self.bounce_spans = deque(maxlen=BOUNCE_HISTORY)
+        self.pressed_at_ns = 0
+        self.long_fired = False
+        self.settle_at_ns = None     # Re-read the level once bouncing is over
+        self.presses = 0
+        self.bounces = 0
+
+    def adapt(self):
+        """Measure the bounce after the last accepted edge and resize the window"""
+        if not self.window_open:
+            return
+        self.window_open = False
+        span = self.last_bounce_ns - self.last_edge_ns if self.last_bounce_ns is not None else 0
+        self.last_bounce_ns = None
+        self.bounce_spans.append(span)
+        wanted = int(max(self.bounce_spans) * ADAPT_MARGIN)
+        if wanted > self.debounce_ns or len(self.bounce_spans) >= ADAPT_AFTER:
+            self.debounce_ns = max(MIN_DEBOUNCE_MS * 1_000_000, min(wanted, MAX_DEBOUNCE_MS * 1_000_000))
+
+    def long_deadline(self):
+        if self.pressed and self.on_long_press is not None and not self.long_fired:
+            return self.pressed_at_ns + self.long_press_ns
+        return None
+
+
+class GpiodLineProvider:
+    """Edge events for a set of pins from a gpiochip via libgpiod"""
+
+    def __init__(self, pins, chip=GPIO_CHIP, consumer="setlist"):
+        settings = gpiod.LineSettings(edge_detection=Edge.BOTH, bias=Bias.PULL_UP,
+                                      event_clock=Clock.MONOTONIC)
+        self.request = gpiod.request_lines(chip, consumer=consumer, config={tuple(pins): settings})
+
+    def fileno(self):
+        return self.request.fd
+
+    def read_events(self):
+        """[(pin, falling, timestamp_ns)] for every queued edge"""
+        return [(e.line_offset, e.event_type == e.Type.FALLING_EDGE, e.timestamp_ns)
+                for e in self.request.read_edge_events()]
+
+    def is_low(self, pin):
+        return self.request.get_value(pin) == Value.INACTIVE
+
+    def close(self):
+        self.request.release()
+
+
+class MockLineProvider:
+    """Stand-in line provider: inject edges from a test or demo
+
+    Edges are queued and a byte is written to a pipe, so the reader wakes up
+    through epoll exactly as it would for the kernel's event fd.
+    """
+
+    def __init__(self, pins):
+        self.levels = {pin: 1 for pin in pins}   # Pulled up: 1 means released
+        self._events = deque()
+        self._r, self._w = os.pipe()
+        os.set_blocking(self._r, False)
+
+    def fileno(self):
+        return self._r
+
+    def inject(self, pin, low, timestamp_ns=None):
+        """Drive `pin` low (pressed) or high; timestamp defaults to now"""
+        self.levels[pin] = 0 if low else 1
+        self._events.append((pin, low, time.monotonic_ns() if timestamp_ns is None else timestamp_ns))
+        os.write(self._w, b"e")
+
+    def read_events(self):
+        try:
+            os.read(self._r, 4096)
+        except BlockingIOError:
+            pass
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def is_low(self, pin):
+        return self.levels.get(pin, 1) == 0
+
+    def close(self):
+        os.close(self._r)
+        os.close(self._w)
+
+
+class ButtonInput:
+    """Debounces edge events and dispatches press / long-press actions"""
+
+    def __init__(self, buttons, provider):
+        self.buttons = {b.pin: b for b in buttons}
+        self.provider = provider
+        self._stopped = False
+        self._wake_r, self._wake_w = os.pipe()
+        self._closed = False
+        self._close_lock = threading.Lock()   # stop() must not write to a pipe close() just closed
+
+    def _fire(self, button, action):
+        try:
+            action()
+        except Exception as e:
+            ringlog.error("❌ Button %d action failed: %r", button.pin, e)
+
+    def _set_pressed(self, button, pressed, timestamp_ns):
+        button.pressed = pressed
+        button.last_edge_ns = timestamp_ns
+        button.window_open = True
+        if pressed:
+            button.pressed_at_ns = timestamp_ns
+            button.long_fired = False
+            button.presses += 1
+            self._fire(button, button.on_press)
+
+    def handle_edge(self, pin, falling, timestamp_ns):
+        button = self.buttons.get(pin)
+        if button is None:
+            return
+        if button.last_edge_ns is not None and timestamp_ns - button.last_edge_ns < button.debounce_ns:
+            # Bounce: ignore it, but check the real level once the window closes
+            button.bounces += 1
+            button.last_bounce_ns = timestamp_ns
+            button.settle_at_ns = button.last_edge_ns + button.debounce_ns
+            return
+        button.adapt()
+        button.settle_at_ns = None   # This edge carries the level the settle check would read
+        if falling != button.pressed:
+            self._set_pressed(button, falling, timestamp_ns)
+
+    def handle_timers(self, now_ns):
+        for button in self.buttons.values():
+            if button.settle_at_ns is not None and now_ns >= button.settle_at_ns:
+                button.settle_at_ns = None
+                button.adapt()
+                low = self.provider.is_low(button.pin)
+                if low != button.pressed:
+                    self._set_pressed(button, low, now_ns)
+            deadline = button.long_deadline()
+            if deadline is not None and now_ns >= deadline:
+                button.long_fired = True
+                self._fire(button, button.on_long_press)
+
+    def _timeout(self):
+        """Seconds until the next settle check or long press, -1 if none"""
+        deadlines = []
+        for button in self.buttons.values():
+            if button.settle_at_ns is not None:
+                deadlines.append(button.settle_at_ns)
+            deadline = button.long_deadline()
+            if deadline is not None:
+                deadlines.append(deadline)
+        if not deadlines:
+            return -1
+        return max(0.0, (min(deadlines) - time.monotonic_ns()) / 1e9)
+
+    def fileno(self):
+        """The line provider's event fd"""
+        return self.provider.fileno()
+
+    def next_deadline(self):
+        """Monotonic time of the next settle check or long press, or None"""
+        timeout = self._timeout()
+        return None if timeout < 0 else time.monotonic() + timeout
+
+    def step(self, timeout=0):
+        """Handle queued edges, then any settle checks and long presses that are due"""
+        # The kernel's read blocks when nothing is queued, so only read when readable
+        if select.select([self.provider.fileno()], [], [], timeout)[0]:
+            for pin, falling, timestamp_ns in self.provider.read_events():
+                self.handle_edge(pin, falling, timestamp_ns)
+        self.handle_timers(time.monotonic_ns())
+
+    def run(self):
+        ep = select.epoll()
+        ep.register(self.provider.fileno(), select.EPOLLIN)
+        ep.register(self._wake_r, select.EPOLLIN)
+        try:
+            while not self._stopped:
+                for fd, _ in ep.poll(self._timeout()):
+                    if fd == self._wake_r:
+                        os.read(self._wake_r, 64)
+                        continue
+                    for pin, falling, timestamp_ns in self.provider.read_events():
+                        self.handle_edge(pin, falling, timestamp_ns)
+                self.handle_timers(time.monotonic_ns())
+        finally:
+            ep.close()
+            self.close()
+
+    def stop(self):
+        self._stopped = True
+        with self._close_lock:
+            if not self._closed:
+                os.write(self._wake_w, b"s")
+
+    def close(self):
+        """Release the lines and the wakeup pipe; run() does this when it stops"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+        self.provider.close()
+
+
+def _demo():
+    ringlog.start()
+    pins = (17, 27)
+    provider = MockLineProvider(pins)
+    buttons = [
+        Button(17, lambda: print("➡️  NEXT")),
+        Button(27, lambda: print("⬅️  PREV"), on_long_press=lambda: print("⏮️  FIRST SONG")),
+    ]
+    reader = ButtonInput(buttons, provider)
+    threading.Thread(target=reader.run, name="gpio_buttons", daemon=True).start()
+
+    print("🔘 Bouncy press and release on pin 17 (should print one NEXT)")
+    for low in (True, False, True, False, True):
+        provider.inject(17, low)
+        time.sleep(0.002)
+    time.sleep(0.1)
+    provider.inject(17, False)
+    time.sleep(0.1)
+
+    print("🔘 Holding pin 27 for one second (PREV, then FIRST SONG)")
+    provider.inject(27, True)
+    time.sleep(1.0)
+    provider.inject(27, False)
+    time.sleep(0.1)
+    for b in buttons:
+        print(f"📊 pin {b.pin}: presses={b.presses} bounces={b.bounces} "
+              f"debounce={b.debounce_ns / 1e6:.0f}ms")
+    reader.stop()
+
+
+if __name__ == "__main__":
+    if "--mock" in sys.argv:
+        _demo()
+    else:
+        print(__doc__)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Headless stand-in for the rgbmatrix bindings
+
+Implements the part of RGBMatrix, RGBMatrixOptions and graphics that the
+display code uses, drawing into in-memory RGB framebuffers with the same BDF
+fonts, so the app can run (and be replayed, benchmarked or captured) without
+a panel. main.py uses it when SETLIST_HEADLESS is set; "term" also shows
+every swapped frame in the terminal (see term_render.py):
+    SETLIST_HEADLESS=1 python3 main.py
+    SETLIST_HEADLESS=term python3 main.py
+"""
+import os
+
+from bdf_font import BdfFont
+
+
+class RGBMatrixOptions:
+    def __init__(self):
+        self.rows = 32
+        self.cols = 64
+        self.chain_length = 1
+        self.parallel = 1
+        self.gpio_slowdown = 1
+        self.hardware_mapping = "regular"
+        self.brightness = 100
+
+
+class FrameCanvas:
+    """width * height RGB pixels, row-major, 3 bytes each"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height * 3)
+
+    def Clear(self):
+        self.pixels[:] = bytes(len(self.pixels))
+
+    def Fill(self, r, g, b):
+        self.pixels[:] = bytes((r, g, b)) * (self.width * self.height)
+
+    def SetPixel(self, x, y, r, g, b):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = (y * self.width + x) * 3
+            self.pixels[i:i + 3] = bytes((r & 255, g & 255, b & 255))
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        image = image.convert("RGB")
+        src_w, src_h = image.size
+        data = image.tobytes()
+        for y in range(max(0, -offset_y), min(src_h, self.height - offset_y)):
+            x0 = max(0, -offset_x)
+            x1 = min(src_w, self.width - offset_x)
+            if x1 <= x0:
+                return
+            dst = ((y + offset_y) * self.width + offset_x + x0) * 3
+            src = (y * src_w + x0) * 3
+            self.pixels[dst:dst + (x1 - x0) * 3] = data[src:src + (x1 - x0) * 3]
+
+
+class RGBMatrix:
+    """Double-buffered like the real thing; `front` is what the panel would show"""
+
+    def __init__(self, options=None):
+        self.options = options or RGBMatrixOptions()
+        self.width = self.options.cols * self.options.chain_length
+        self.height = self.options.rows * self.options.parallel
+        self.front = FrameCanvas(self.width, self.height)
+        self.swaps = 0
+        self.terminal = None
+        if os.environ.get("SETLIST_HEADLESS") == "term":
+            from term_render import TerminalRenderer
+            self.terminal = TerminalRenderer(self.width, self.height)
+
+    def CreateFrameCanvas(self):
+        return FrameCanvas(self.width, self.height)
+
+    def SwapOnVSync(self, canvas):
+        previous, self.front = self.front, canvas
+        self.swaps += 1
+        if self.terminal is not None:
+            self.terminal.draw(canvas.pixels)
+        return previous
+
+
+class _Graphics:
+    """The rgbmatrix.graphics module"""
+
+    class Color:
+        def __init__(self, red=0, green=0, blue=0):
+            self.red = red
+            self.green = green
+            self.blue = blue
+
+    class Font:
+        def __init__(self):
+            self.bdf = BdfFont.placeholder()
+
+        def LoadFont(self, path):
+            self.bdf = BdfFont.load_or_placeholder(path)
+
+        @property
+        def height(self):
+            return self.bdf.height
+
+        @property
+        def baseline(self):
+            return self.bdf.ascent
+
+        def CharacterWidth(self, codepoint):
+            return self.bdf.text_width(chr(codepoint))
+
+    @staticmethod
+    def DrawText(canvas, font, x, y, color, text):
+        return font.bdf.draw(canvas.pixels, canvas.width, canvas.height, x, y, text,
+                             (color.red, color.green, color.blue))
+
+    @staticmethod
+    def DrawLine(canvas, x0, y0, x1, y1, color):
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+        err = dx + dy
+        while True:
+            canvas.SetPixel(x0, y0, color.red, color.green, color.blue)
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+
+graphics = _Graphics()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Append-only binary log of every inbound command
+
+Each run writes recordings/input-<stamp>.slrec: a header, then one record per
+event with the CLOCK_MONOTONIC time in nanoseconds, the source it came from
+and the raw command bytes exactly as received ("40(" as well as "GOTO 3").
+A state record with the setlist and current song is written first, so a
+replay starts from what the panel was showing. Each record goes out in a
+single O_APPEND write, so a crash loses at most the event being written.
+
+    header:  "SLRC" u8 version, f64 wall-clock start, u64 monotonic start ns
+    record:  u64 monotonic ns, u8 source, u16 length, payload
+
+Dump a log with:
+    python3 input_recorder.py recordings/input-20250101-200000-000.slrec
+"""
+import json
+import os
+import struct
+import sys
+import time
+
+import ringlog
+
+MAGIC = b"SLRC"
+VERSION = 1
+HEADER = struct.Struct("<4sBdQ")
+RECORD = struct.Struct("<QBH")
+RECORD_DIR = "recordings"
+MAX_PAYLOAD = 0xFFFF
+
+# Source codes are part of the file format: only ever append to this tuple
+SOURCES = ("state", "tcp", "serial", "gpio", "evdev", "keyboard", "midi", "osc")
+_source_codes = {name: code for code, name in enumerate(SOURCES)}
+
+
+class Recorder:
+    """Writes records to one log file; safe to call from any thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.records = 0
+        self.started_ns = time.monotonic_ns()
+        if os.fstat(self.fd).st_size == 0:
+            os.write(self.fd, HEADER.pack(MAGIC, VERSION, time.time(), self.started_ns))
+
+    def record(self, source, payload, timestamp_ns=None):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8", "replace")
+        payload = payload[:MAX_PAYLOAD]
+        ts = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        code = _source_codes.get(source, _source_codes["tcp"])
+        try:
+            # One write per record: O_APPEND keeps concurrent records whole
+            os.write(self.fd, RECORD.pack(ts, code, len(payload)) + payload)
+        except OSError as e:
+            ringlog.error("❌ Input recorder write failed: %r", e)
+            return
+        self.records += 1
+
+    def snapshot(self, index, setlist):
+        """Record the setlist and current song, as the starting point for a replay"""
+        self.record("state", json.dumps({"idx": index, "setlist": setlist}, separators=(",", ":")))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def read_log(path):
+    """(wall-clock start, monotonic start ns, [(ns, source, payload bytes)])
+
+    A record cut short by a crash or power loss ends the list instead of
+    raising, so a log from a bad night still replays up to the end.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: too short for a recording")
+    magic, version, wall, started_ns = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} input recording")
+    events = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        ts, code, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            break
+        source = SOURCES[code] if code < len(SOURCES) else f"source{code}"
+        events.append((ts, source, data[offset:offset + length]))
+        offset += length
+    return wall, started_ns, events
+
+
+recorder = None
+
+
+def start(directory=RECORD_DIR):
+    """Open a fresh log for this run"""
+    global recorder
+    os.makedirs(directory, exist_ok=True)
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    path = os.path.join(directory, f"input-{stamp}.slrec")
+    n = 1
+    while os.path.exists(path):   # Two starts in the same millisecond (restart loop, tests)
+        n += 1
+        path = os.path.join(directory, f"input-{stamp}-{n}.slrec")
+    recorder = Recorder(path)
+    return recorder
+
+
+def record(source, payload):
+    """Record one inbound event; a no-op when recording is off"""
+    if recorder is not None:
+        recorder.record(source, payload)
+
+
+def snapshot(index, setlist):
+    if recorder is not None:
+        recorder.snapshot(index, setlist)
+
+
+def stop():
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        recorder = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    wall, started_ns, events = read_log(sys.argv[1])
+    print(f"🎙️  Recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall))}, {len(events)} events")
+    for ts, source, payload in events:
+        text = payload.decode("utf-8", "replace")
+        if source == "state":
+            state = json.loads(text)
+            text = f"idx={state['idx']} ({len(state['setlist'])} songs)"
+        print(f"{(ts - started_ns) / 1e9:10.3f}s  {source:8} {text!r}")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Load generator for the command server on port 6789
+
+Opens N concurrent clients, each sending a weighted mix of commands at its
+share of a target rate, one connection per command like the tablet app and
+pedal bridges do. Sends follow an open-loop schedule and latency is measured
+from when a command was due, not when it finally went out, so a stalled
+server shows up as latency instead of quietly lowering the send rate.
+
+    # Start a headless instance, hit it with 8 clients at 200 commands/s
+    python3 loadgen.py --spawn --clients 8 --rate 200 --duration 10
+
+    # Against a running instance, reading its CPU use from /proc
+    python3 loadgen.py --server-pid 1234 --mix NEXT=4,PREV=4,GOTO=1,STATS=1
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+DEFAULT_MIX = "NEXT=5,PREV=3,GOTO=1,LIST=1,STATS=1"
+COMMANDS = ("NEXT", "PREV", "GOTO", "LIST", "STATS")
+CONNECT_TIMEOUT = 2.0
+REPLY_TIMEOUT = 5.0
+
+
+def parse_mix(text):
+    """[(command, weight)] from "NEXT=5,PREV=3,GOTO=1" """
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        name = name.strip().upper()
+        if name not in COMMANDS:
+            raise ValueError(f"unknown command in mix: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process from /proc, or None if unreadable"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)   # command -> seconds from due time to reply
+        self.errors = Counter()
+        self.sent = 0
+
+    def add(self, command, latency=None, error=None):
+        with self.lock:
+            self.sent += 1
+            if error is None:
+                self.latencies[command].append(latency)
+            else:
+                self.errors[error] += 1
+
+
+def send(host, port, line):
+    with socket.create_connection((host, port), timeout=CONNECT_TIMEOUT) as sock:
+        sock.settimeout(REPLY_TIMEOUT)
+        sock.sendall(line.encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    if not reply:
+        raise ConnectionError("no reply")
+    return reply
+
+
+def client(host, port, mix, rate, deadline, songs, results, seed):
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    interval = 1.0 / rate
+    due = time.monotonic() + rng.random() * interval   # Spread the clients' phases
+    while due < deadline:
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        command = rng.choices(names, weights)[0]
+        line = f"GOTO {rng.randrange(songs)}" if command == "GOTO" else command
+        try:
+            send(host, port, line)
+            results.add(command, time.monotonic() - due)
+        except socket.timeout:
+            results.add(command, error="timeout")
+        except ConnectionRefusedError:
+            results.add(command, error="refused")
+        except OSError as e:
+            results.add(command, error=type(e).__name__)
+        due += interval
+
+
+def spawn_server(port):
+    """Headless main.py in a child process; returns it once the port accepts connections"""
+    env = dict(os.environ, SETLIST_HEADLESS="1")
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, os.path.join(here, "main.py"), "--port", str(port),
+                             "--no-record", "--no-journal", "--metrics-port", "0", "--ws-port", "0", "--osc-port", "0"],
+                            cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.monotonic()
+    while time.monotonic() - started < 10:
+        if proc.poll() is not None:
+            raise SystemExit("❌ Headless server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("❌ Headless server did not start listening")
+
+
+def run(host, port, clients, rate, duration, mix, songs, server_pid=None):
+    results = Results()
+    cpu_before = cpu_seconds(server_pid) if server_pid else None
+    started = time.monotonic()
+    deadline = started + duration
+    threads = [threading.Thread(target=client, name=f"loadgen-{i}", daemon=True,
+                                args=(host, port, mix, rate / clients, deadline, songs, results, i))
+               for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    cpu_after = cpu_seconds(server_pid) if server_pid else None
+    report(results, elapsed, rate, clients,
+           None if cpu_before is None or cpu_after is None else (cpu_after - cpu_before) / elapsed)
+    return results
+
+
+def report(results, elapsed, rate, clients, server_cpu):
+    ok = sum(len(v) for v in results.latencies.values())
+    print(f"🚦 {clients} clients, target {rate:.0f}/s for {elapsed:.1f}s")
+    print(f"📊 sent={results.sent} ok={ok} errors={sum(results.errors.values())} "
+          f"throughput={ok / elapsed:.1f}/s")
+    everything = sorted(l for v in results.latencies.values() for l in v)
+    rows = [("all", everything)] + [(name, sorted(v)) for name, v in sorted(results.latencies.items())]
+    print(f"   {'command':8} {'count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for name, values in rows:
+        print(f"   {name:8} {len(values):7d} " + " ".join(
+            f"{percentile(values, p) * 1000:7.2f}ms" for p in (50, 90, 99)) +
+            f" {(values[-1] if values else 0) * 1000:7.2f}ms")
+    if results.errors:
+        print("❌ " + " ".join(f"{k}={v}" for k, v in results.errors.most_common()))
+    if server_cpu is not None:
+        print(f"🖥️  server CPU {server_cpu * 100:.1f}% of one core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load against the setlist command server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6789)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=50.0, help="total commands per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted commands (default {DEFAULT_MIX})")
+    parser.add_argument("--songs", type=int, default=8, help="GOTO picks a song below this")
+    parser.add_argument("--server-pid", type=int, help="report this process's CPU use")
+    parser.add_argument("--spawn", action="store_true", help="start a headless main.py to test against")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    proc = None
+    if args.spawn:
+        proc = spawn_server(args.port)
+        args.server_pid = proc.pid
+        print(f"🚀 Headless server pid {proc.pid}")
+    try:
+        run(args.host, args.port, max(1, args.clients), args.rate, args.duration, mix, args.songs, args.server_pid)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,49 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import threading
 import time
 import socket
 import os
+import signal
 import sys
 from PIL import Image, ImageDraw, ImageFont
 
-# Try hardware bindings
-try:
-    from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics
-except Exception:
-    RGBMatrix = None
-    RGBMatrixOptions = None
-    graphics = None
+import animation
+import compositor
+import display_sync
+import evdev_input
+import frame_capture
+import gpio_buttons
+import input_recorder
+import metrics
+import position_journal
+import profiler
+import reactor
+import serial_input
+import midi_input
+import osc_input
+import state_push
+import setlist_query
+import setlist_upload
+import setlists
+import shared_state
+import song_pages
+import tempo
+from bdf_font import BdfFont
+import ringlog
+import rt_sched
 
-try:
-    import serial
-except Exception:
-    serial = None
+# Try hardware bindings; SETLIST_HEADLESS=1 draws into memory instead (replay, benchmarks)
+if os.environ.get("SETLIST_HEADLESS"):
+    from headless_matrix import RGBMatrix, RGBMatrixOptions, graphics
+else:
+    try:
+        from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics
+    except Exception:
+        RGBMatrix = None
+        RGBMatrixOptions = None
+        graphics = None
 
 try:
     import RPi.GPIO as GPIO
@@ -50,16 +75,85 @@ setlist = []
 idx = 0
 lock = threading.Lock()
 
-# Global variables for title scrolling
-scroll_offset = 0
-last_song_change = time.time()
-scroll_start_time = None
+# Title animation; positions are derived from the monotonic song-change time
+MARQUEE_SPEED = 3.0       # Pixels per second
+MARQUEE_DELAY = 2.0       # Seconds the start of a long title stays put before each pass
+MARQUEE_GAP = 20          # Extra pixels scrolled past the end of the title
+TRANSITION = "wipe"       # Song change effect: "wipe", "fade" or None
+TRANSITION_TIME = 0.15
+TITLE_RGB = (255, 0, 0)
+KEY_RGB = (255, 128, 0)
+song_changed_at = time.monotonic()
+timeline = animation.Timeline()
+marquee = animation.Track()
+transition = animation.Track()
+_marquee_title = None
+_shown_change = None
+_outgoing = None          # Pixels on the panel when the song changed
+
+# Beat marker for songs with a "bpm": count-in digit, then a pulse in the corner
+beat = None               # tempo.BeatGrid for the song on screen, if it has a tempo
+_beat_key = None
+_beat_shown = -1          # Last beat number whose onset reached the panel
+DOWNBEAT_RGB = (255, 255, 255)
+
+# Chord/lyric pages: 0 is the title screen, 1.. are pages of the song's content file
+page = 0
+pages = None              # song_pages.SongPages, set up in main()
+COMMENT_RGB = (0, 96, 255)
+
+# Title screen layers (compositor.py): each redraws only when what it shows changes
+STATUS_FONT_FILE = "4x6.bdf"
+COUNTER_RGB = (160, 64, 0)
+STATUS_RGB = (0, 160, 64)
+LOW_BATTERY_RGB = (255, 0, 0)
+BATTERY_POLL = 30.0       # Seconds between reads of the pedal's battery level
+set_started_at = time.monotonic()   # Set timer; restarts on SET
+_screen = None            # compositor.Compositor, built on the first frame
+_view = None              # (song, index, song count, beat mark) for the frame being drawn
+
+# Render loop state; only the render thread draws to the canvas
+RENDER_FPS = 30           # Upper bound; static frames are not redrawn at all
+RENDER_STATS_INTERVAL = 0.5   # Seconds between frame counter updates for the --split-io input process
+redraw_requested = threading.Event()
+_last_frame = None
+_last_pixels = None       # RGB bytes of the title screen on the panel
 
 BTN_NEXT_PIN = 17
 BTN_PREV_PIN = 27
+BTN_DEBOUNCE_MS = 30      # Starting per-pin debounce window; it then adapts to each switch
+BTN_LONG_PRESS_MS = 800   # Holding PREV this long jumps back to the first song
+
+# Called with (idx, setlist) after every song change, e.g. to multicast it
+state_listeners = []
+# Called with the new setlist after an UPLOAD or SET swaps it in
+setlist_listeners = []
+
+current_set = None   # Name of the setlists/ set on the panel; None for setlist.json
+_set_positions = {}  # Set name -> song we were on when we switched away from it
+DEFAULT_SET = "default"   # SET name for setlist.json
+_default_setlist = None   # setlist.json as last loaded or uploaded, for SET default
+
+serial_ports = None  # serial_input.SerialInput once the listener thread is up
+midi_ports = None    # midi_input.MidiInput once the listener is up
+osc_server = None    # osc_input.OscServer unless --osc-port 0
+state_hub = None     # state_push.StateHub: SUBSCRIBE and WebSocket subscribers
+query = setlist_query.SetlistQuery()
+
+# With --reactor, one event loop owns every input (and the render timer unless --split-io)
+event_loop = None
+_render_on_loop = False
+_render_timer = None
+_render_scheduled = False
+
+# With --split-io, the input process publishes the display state here for the render process
+shared = None
+
+# Threads sampled by PROFILE START when no names are given
+PROFILED_THREADS = ("MainThread", "tcp_server", "serial_listener", "midi_listener", "osc_server", "state_push", "keyboard_listener", "gpio_buttons")
 
 def load_setlist():
-    global setlist
+    global setlist, _default_setlist
     try:
         print("DEBUG: SETLIST_PATH =", SETLIST_PATH)
         with open(SETLIST_PATH, "r", encoding="utf-8") as f:
@@ -77,6 +171,24 @@ def load_setlist():
             print("Wrote default setlist to", SETLIST_PATH)
         except Exception as e2:
             print("Failed to write default setlist:", repr(e2))
+    _default_setlist = setlist
+
+def resume_position():
+    """Start on the set, song and page the journal last saw"""
+    global setlist, idx, page, current_set
+    last = position_journal.recent(1)
+    if not last:
+        return
+    _, last_idx, last_page, set_hash = last[-1]
+    if set_hash != display_sync.setlist_hash(setlist):
+        found = setlists.find(set_hash)
+        if found is None:
+            return  # The set was edited or removed since; start from the top
+        current_set, setlist = found
+    if last_idx < len(setlist):
+        idx, page = last_idx, last_page
+        print(f"📓 Resuming {current_set or 'setlist.json'} at song {idx} "
+              f"({setlist[idx].get('title', '')}), page {page}")
 
 
 def _text_size(draw, text, font):
@@ -91,145 +203,685 @@ def _text_size(draw, text, font):
     except Exception:
         return (len(text) * 6, 10)
 
-def draw_screen():
-    global canvas, idx, scroll_offset, last_song_change, scroll_start_time
+def _key_capo_text(song):
+    # Simple format: "G 3" or "G" or "3"
+    parts = []
+    if song.get("key", ""):
+        parts.append(song["key"])
+    if song.get("capo", 0):
+        parts.append(str(song["capo"]))
+    return " ".join(parts)
+
+def _update_animations(title, title_width, changed_at, now):
+    """Point the marquee and transition tracks at the current song"""
+    global _marquee_title, _shown_change
+    if changed_at != _shown_change:
+        # New song (or a follower re-anchoring): restart from the change time
+        _shown_change = changed_at
+        _marquee_title = None
+        if TRANSITION and _outgoing is not None and now - changed_at < TRANSITION_TIME:
+            transition.configure(0, 1, TRANSITION_TIME, easing=animation.ease_in_out)
+            timeline.play(transition, changed_at)
+        else:
+            timeline.stop(transition)
+    if title != _marquee_title:
+        _marquee_title = title
+        overflow = title_width - (options.cols - 2)
+        if overflow > 0:
+            # Scroll past the end by a gap, then jump back and pause at the start
+            distance = overflow + MARQUEE_GAP
+            marquee.configure(0, distance, distance / MARQUEE_SPEED, delay=MARQUEE_DELAY,
+                              mode=animation.LOOP, repeat_delay=MARQUEE_DELAY)
+            timeline.play(marquee, changed_at)
+        else:
+            timeline.stop(marquee)
+    timeline.update(now)
+
+def _update_beat(song, changed_at):
+    """Rebuild the beat grid when the song, its tempo or its anchor changes"""
+    global beat, _beat_key, _beat_shown
+    song_tempo = tempo.song_tempo(song)
+    key = (song_tempo, changed_at)
+    if key != _beat_key:
+        _beat_key = key
+        _beat_shown = -1
+        beat = tempo.BeatGrid(song_tempo[0], song_tempo[1], changed_at) if song_tempo else None
+
+class _BeatLayer(compositor.Layer):
+    """Count-in digit in the bottom-right corner, then a 3x3 pulse on each beat"""
+
+    def __init__(self, font):
+        top = 25 - font.ascent
+        super().__init__("beat", options.cols - 6, top, 6, options.rows - top)
+        self.font = font
+
+    def content(self, now):
+        mark = _view[3]
+        if mark is None or not (mark[2] or mark[3]):
+            return None
+        return mark[1:]
+
+    def render(self, buf, width, height, content):
+        in_bar, counting_in, lit = content
+        color = DOWNBEAT_RGB if in_bar == 0 else KEY_RGB
+        if counting_in:
+            level = 1.0 if lit else 0.3
+            self.font.draw(buf, width, height, 0, self.font.ascent, str(in_bar + 1),
+                           tuple(int(c * level) for c in color))
+            return
+        for y in range(options.rows - 4 - self.y, options.rows - 1 - self.y):
+            for x in range(2, 5):
+                i = (y * width + x) * 3
+                buf[i:i + 3] = bytes(color)
+
+class _BatteryLayer(compositor.Layer):
+    """Pedal battery as an outline with up to five bars; hidden when the level is unknown"""
+
+    def __init__(self, x, y):
+        super().__init__("battery", x, y, 8, 5)
+        self._checked_at = None
+        self._level = None
+
+    def content(self, now):
+        if self._checked_at is None or now >= self._checked_at + BATTERY_POLL:
+            self._checked_at = now
+            self._level = evdev_input.pedal_battery()
+        return None if self._level is None else min(5, (self._level + 10) // 20)
+
+    def render(self, buf, width, height, bars):
+        color = bytes(LOW_BATTERY_RGB if bars <= 1 else STATUS_RGB)
+        for x in range(7):
+            for y in (0, 4):
+                buf[(y * width + x) * 3:(y * width + x) * 3 + 3] = color
+        for y in range(1, 4):
+            for x in [0, 6] + list(range(1, 1 + bars)):
+                buf[(y * width + x) * 3:(y * width + x) * 3 + 3] = color
+        buf[(2 * width + 7) * 3:(2 * width + 7) * 3 + 3] = color   # Terminal nub
+
+def _set_timer_text(now):
+    elapsed = int(now - set_started_at)
+    if elapsed < 3600:
+        return f"{elapsed // 60}:{elapsed % 60:02d}"
+    return f"{elapsed // 3600}h{elapsed % 3600 // 60:02d}"
+
+def _build_screen():
+    """The title screen as layers, in the positions the DrawText layout used"""
+    large = BdfFont.load_or_placeholder(BDF_FONT_DIR + LARGE_FONT_FILE)
+    small = BdfFont.load_or_placeholder(BDF_FONT_DIR + SMALL_FONT_FILE)
+    status = BdfFont.load_or_placeholder(BDF_FONT_DIR + STATUS_FONT_FILE, 4, 6)
+    cols, rows = options.cols, options.rows
+    status_y = rows - status.height
+    return compositor.Compositor(cols, rows, [
+        compositor.MarqueeLayer("title", 0, 12 - large.ascent, cols, large.height, large,
+                                lambda now: _view[0].get("title", "Untitled"), TITLE_RGB,
+                                lambda now: (marquee.pixel if marquee.active else 0) - 1),
+        # key_capo and counter share a row; _fit_counter sizes them for the set length
+        compositor.TextLayer("key_capo", 1, 25 - small.ascent, cols - 1, small.height, small,
+                             lambda now: _key_capo_text(_view[0]), KEY_RGB),
+        compositor.TextLayer("counter", cols - 7, 25 - small.ascent, 0, small.height, small,
+                             lambda now: f"{_view[1] + 1}/{_view[2]}", COUNTER_RGB, align="right"),
+        compositor.TextLayer("clock", 1, status_y, 20, status.height, status,
+                             lambda now: time.strftime("%H:%M"), STATUS_RGB, interval=60.0),
+        compositor.TextLayer("set_timer", 23, status_y, 20, status.height, status,
+                             _set_timer_text, STATUS_RGB, interval=1.0, origin=lambda: set_started_at),
+        _BatteryLayer(46, rows - 5),
+        _BeatLayer(small),
+    ])
+
+def _fit_counter(count):
+    """Widen the counter to fit "count/count"; key/capo gets the rest of the row"""
+    counter = _screen.layer("counter")
+    key_capo = _screen.layer("key_capo")
+    right = counter.x + counter.width    # Right edge stays put, next to the beat marker
+    width = counter.font.text_width(f"{count}/{count}")
+    counter.move(right - width, counter.y, width, counter.height)
+    key_capo.move(key_capo.x, key_capo.y, max(0, right - width - 1 - key_capo.x), key_capo.height)
+
+def _fade_table(level):
+    return bytes(int(v * level) for v in range(256))
+
+def _transition_pixels(outgoing, incoming, step):
+    """Song change effect between two composed frames"""
+    if TRANSITION == "wipe":
+        # Outgoing song slides up while the new one slides in from below
+        split = step * options.cols * 3
+        return outgoing[split:] + incoming[:split]
+    if transition.value < 0.5:
+        # Fade: dim the outgoing song to black, then bring the new one up
+        return outgoing.translate(_fade_table(1.0 - 2.0 * transition.value))
+    return incoming.translate(_fade_table(2.0 * transition.value - 1.0))
+
+def draw_screen(force=True, now=None):
+    """Draw the current song; returns (drawn, next_frame_at)
+
+    Unless `force` is set, a frame identical to the one already on the panel
+    is skipped. `next_frame_at` is the monotonic time something on screen next
+    moves, or None when the frame is static until the next song change.
+    """
+    global canvas, _last_frame, _last_pixels, _screen, _view
+    if now is None:
+        now = time.monotonic()
     with lock:
         song = setlist[idx]
+        index = idx
+        count = len(setlist)
+        changed_at = song_changed_at
+        song_page = page
     
-    title = song.get("title", "Untitled")
-    key = song.get("key", "")
-    capo = song.get("capo", 0)
-    
-    try:
-        # Load BDF fonts optimized for LED matrices
-        font_large = graphics.Font()
-        font_large.LoadFont(BDF_FONT_DIR + LARGE_FONT_FILE)
-        
-        font_small = graphics.Font()  
-        font_small.LoadFont(BDF_FONT_DIR + SMALL_FONT_FILE)
-        
-        # Create colors
-        red = graphics.Color(255, 0, 0)
-        orange = graphics.Color(255, 128, 0)
-        
-    except Exception as e:
-        print(f"❌ Font loading failed: {e}")
-        return
-    
-    # Calculate actual title width for scrolling using temporary canvas
-    temp_canvas = matrix.CreateFrameCanvas()
-    title_width = graphics.DrawText(temp_canvas, font_large, 0, 12, red, title)
-    max_title_width = options.cols - 2
-    
-    current_time = time.time()
+    if song_page and pages is not None:
+        return _draw_page(song, song_page, force)
     
-    # Handle scrolling for long titles
-    if title_width > max_title_width:
-        # Start scrolling after 2 second delay from when song was last changed
-        if scroll_start_time is None:
-            if current_time - last_song_change >= 2.0:
-                scroll_start_time = current_time
-                scroll_offset = 0
-        
-        if scroll_start_time is not None:
-            # Scroll slower - 3 pixels per second for smoother appearance
-            scroll_duration = current_time - scroll_start_time
-            scroll_offset = int(scroll_duration * 3)
-            
-            # Reset scroll when we've gone too far
-            if scroll_offset > title_width - max_title_width + 20:
-                scroll_offset = 0  # Start over
-                scroll_start_time = current_time
-    else:
-        scroll_offset = 0
-    
-    # Clear canvas for this frame
-    canvas.Clear()
+    if _screen is None:
+        _screen = _build_screen()
+    _fit_counter(count)
+    title = song.get("title", "Untitled")
+    _update_animations(title, _screen.layers[0].font.text_width(title), changed_at, now)
+    _update_beat(song, changed_at)
     
-    # Draw title with BDF font - much cleaner on LED matrix
-    title_x = 1 - scroll_offset
-    graphics.DrawText(canvas, font_large, title_x, 12, red, title)
+    mark = beat.mark(now) if beat is not None else None
+    _view = (song, index, count, mark)
+    pixels = _screen.compose(now)
+    step = animation.quantize(transition.value * options.rows) if transition.active else -1
+    frame = (_screen.version, step)
+    next_frame_at = timeline.next_change(now, 1.0 / RENDER_FPS)
+    layers_at = _screen.next_change(now)
+    if layers_at is not None and (next_frame_at is None or layers_at < next_frame_at):
+        next_frame_at = layers_at
+    if not force and frame == _last_frame:
+        return False, next_frame_at
     
-    # Draw key and capo info - simplified format
-    if key or capo:
-        # Simple format: "G 3" or "G" or "3"
-        parts = []
-        if key:
-            parts.append(key)
-        if capo:
-            parts.append(str(capo))
-        key_capo_text = " ".join(parts)
-        
-        graphics.DrawText(canvas, font_small, 1, 25, orange, key_capo_text)
+    if step >= 0 and _outgoing is not None:
+        pixels = _transition_pixels(_outgoing, pixels, step)
+    canvas.SetImage(Image.frombuffer("RGB", (options.cols, options.rows), pixels, "raw", "RGB", 0, 1))
     
     # Use double-buffering to eliminate flashing
-    # SwapOnVSync waits for vertical sync before displaying, preventing flicker
-    matrix.SwapOnVSync(canvas)
-    print(f"📺 Flicker-free Display: '{title}' at ({title_x}, 12)")
+    # SwapOnVSync waits for vertical sync and hands back the old front buffer to draw into next
+    canvas = matrix.SwapOnVSync(canvas)
+    frame_capture.note(pixels)
+    _last_frame = frame
+    _last_pixels = pixels
+    _record_beat(mark)
+    ringlog.debug("📺 Flicker-free Display: '%s' at (%d, 12)", title, -_screen.layers[0].scroll(now))
+    return True, next_frame_at
+
+def _draw_page(song, song_page, force):
+    """Show a pre-rendered content page; page turns are a cache lookup"""
+    global canvas, _last_frame
+    frame = (song.get("title", ""), "page", song_page)
+    if not force and frame == _last_frame:
+        return False, None
+    image = pages.page_image(song, song_page)
+    canvas.Clear()
+    if image is not None:
+        canvas.SetImage(image, 0, 0)
+    canvas = matrix.SwapOnVSync(canvas)
+    frame_capture.note(image)
+    _last_frame = frame
+    ringlog.debug("📄 Page %d of '%s'", song_page, frame[0])
+    return True, None
+
+def _record_beat(mark):
+    """How late a beat onset reached the panel, against its absolute beat time"""
+    global _beat_shown
+    if mark is None or not mark[3] or mark[0] == _beat_shown:
+        return
+    _beat_shown = mark[0]
+    metrics.beat_timer.record(beat.beat_time(mark[0]), time.monotonic())
+
+def request_redraw():
+    """Ask the render loop for a fresh frame; safe to call from any thread"""
+    global _render_scheduled
+    redraw_requested.set()
+    if _render_on_loop and not _render_scheduled:
+        _render_scheduled = True
+        event_loop.call_soon_threadsafe(_render_tick)
+
+def render_frame(forced):
+    """Draw one frame if anything changed; returns when the next one is due, or None"""
+    started = time.monotonic()
+    drawn, next_frame_at = draw_screen(force=forced, now=started)
+    if next_frame_at is not None:
+        next_frame_at = max(next_frame_at, started + 1.0 / RENDER_FPS)
+    if beat is not None and not page:
+        # Beats are not held back by the frame cap; they are due at an absolute time
+        beat_at = beat.next_change(time.monotonic())
+        if next_frame_at is None or beat_at < next_frame_at:
+            next_frame_at = beat_at
+    if drawn:
+        metrics.frames.inc()
+        metrics.frame_timer.record(started, time.monotonic())
+    else:
+        metrics.frames_elided.inc()
+    return next_frame_at
+
+def render_loop():
+    """Own the panel: draw on request and whenever an animation moves a pixel"""
+    rt_sched.apply_current("render")
+    next_frame_at = None
+    while True:
+        if next_frame_at is None:
+            redraw_requested.wait()
+        else:
+            redraw_requested.wait(max(0.0, next_frame_at - time.monotonic()))
+        forced = redraw_requested.is_set()
+        redraw_requested.clear()
+        next_frame_at = render_frame(forced)
+
+def _render_tick():
+    """Render timer on the event loop: the reactor version of render_loop"""
+    global _render_timer, _render_scheduled
+    _render_scheduled = False
+    forced = redraw_requested.is_set()
+    redraw_requested.clear()
+    event_loop.cancel(_render_timer)
+    next_frame_at = render_frame(forced)
+    _render_timer = event_loop.call_at(next_frame_at, _render_tick) if next_frame_at is not None else None
+
+def share_render_stats():
+    """--split-io render side: keep the input process's STATS frame figures current"""
+    split_state.publish_render(*metrics.render_snapshot())
+    if event_loop is not None:
+        event_loop.call_later(RENDER_STATS_INTERVAL, share_render_stats)
+
+def _share_render_stats_thread():
+    while True:
+        share_render_stats()
+        time.sleep(RENDER_STATS_INTERVAL)
 
 def show_current():
     """Display current song"""
-    print(f"📺 Showing song {idx + 1}: {setlist[idx]['title']}")
-    draw_screen()
+    ringlog.info("📺 Showing song %d: %s", idx + 1, setlist[idx]['title'])
+    request_redraw()
+
+def _song_changed(with_setlist=False):
+    global song_changed_at, _outgoing, page
+    _outgoing = _last_pixels if not page else None  # What the transition animates away from
+    song_changed_at = time.monotonic()
+    page = 0
+    if pages is not None:
+        pages.focus(setlist, idx)
+    show_current()
+    _notify_state_listeners()
+    _publish_state(with_setlist)
+
+def _notify_state_listeners():
+    """Song changes from every source (commands, sync leader, input process) reach the same listeners"""
+    for listener in state_listeners:
+        listener(idx, setlist)
 
 def next_song():
-    global idx, last_song_change, scroll_offset, scroll_start_time
+    global idx
     with lock:
         idx = (idx + 1) % len(setlist)
-    last_song_change = time.time()
-    scroll_offset = 0  # Reset scrolling for new song
-    scroll_start_time = None
-    show_current()
+    _song_changed()
 
 def prev_song():
-    global idx, last_song_change, scroll_offset, scroll_start_time
+    global idx
     with lock:
         idx = (idx - 1 + len(setlist)) % len(setlist)
-    last_song_change = time.time()
-    scroll_offset = 0  # Reset scrolling for new song
-    scroll_start_time = None
-    show_current()
+    _song_changed()
 
 def goto_song(n):
-    global idx, last_song_change, scroll_offset, scroll_start_time
+    global idx
     with lock:
         if 0 <= n < len(setlist):
             idx = n
-    last_song_change = time.time()
-    scroll_offset = 0  # Reset scrolling for new song
-    scroll_start_time = None
+    _song_changed()
+
+def skip_songs(n):
+    """Move n songs on (or back, if negative), wrapping like NEXT/PREV"""
+    global idx
+    with lock:
+        idx = (idx + n) % len(setlist)
+    _song_changed()
+
+def turn_page(delta=None, number=None):
+    """Step through the current song's content pages; page 0 is the title"""
+    global page
+    with lock:
+        song = setlist[idx]
+    # Counting pages may read and parse the chart; not while holding the render loop's lock
+    count = pages.page_count(song) if pages is not None else 0
+    with lock:
+        if setlist[idx] is not song:
+            return   # The song changed meanwhile; its turn_page does not apply to the new one
+        target = page + delta if number is None else number
+        page = max(0, min(target, count))
+        shown = page
+    ringlog.info("📄 Page %d/%d of %s", shown, count, song.get("title", ""))
+    request_redraw()
+    _publish_state()
+
+def apply_synced_state(new_setlist, new_idx, phase):
+    """Mirror a leader panel: switch song and line up the scroll phase"""
+    global setlist, idx, song_changed_at, _outgoing, page
+    refused = _unshareable(new_setlist) if new_setlist is not None else None
+    if refused:
+        raise ValueError(refused)   # The follower keeps its own setlist and tries again
+    with lock:
+        if new_setlist is not None:
+            setlist = new_setlist
+        changed = new_setlist is not None or new_idx != idx
+        if 0 <= new_idx < len(setlist):
+            idx = new_idx
+    anchor = time.monotonic() - phase
+    if not changed:
+        # Heartbeat for the song we already show: only correct real drift
+        if abs(anchor - song_changed_at) > display_sync.ANCHOR_TOLERANCE:
+            song_changed_at = anchor
+            request_redraw()
+            _publish_state()
+        return
+    if new_setlist is not None:
+        input_recorder.snapshot(new_idx, new_setlist)
+    _outgoing = _last_pixels if not page else None
+    song_changed_at = anchor
+    page = 0
+    if pages is not None:
+        pages.focus(setlist, idx)
     show_current()
+    _notify_state_listeners()
+    _publish_state(with_setlist=new_setlist is not None)
+
+def _publish_state(with_setlist=False):
+    """Journal the new position and, with --split-io, hand it to the render process"""
+    position_journal.note(idx, page, setlist)
+    if shared is not None:
+        shared.publish(idx, page, song_changed_at, set_started_at, setlist if with_setlist else None)
 
-def tcp_server(port=6789):
+def apply_shared_state(new_setlist, new_idx, new_page, changed_at, set_started):
+    """Render process: show what the input process published"""
+    global setlist, idx, page, song_changed_at, _outgoing, set_started_at
+    set_started_at = set_started   # SET restarts the set timer in the input process
+    with lock:
+        if new_setlist is not None:
+            setlist = new_setlist
+        song_changed = changed_at != song_changed_at
+        if song_changed:
+            _outgoing = _last_pixels if not page else None
+        if 0 <= new_idx < len(setlist):
+            idx = new_idx
+        page = new_page
+        song_changed_at = changed_at
+    if (song_changed or new_setlist is not None) and pages is not None:
+        pages.focus(setlist, idx)
+    request_redraw()
+    if song_changed or new_setlist is not None:
+        _notify_state_listeners()
+
+def _unshareable(new_setlist):
+    """--split-io input process: an ERROR reply if the render process could not be sent `new_setlist`"""
+    if shared is not None and not shared.fits(new_setlist):
+        return f"ERROR setlist too large to share with the render process (over {shared.capacity // 1024} KB)"
+    return None
+
+def install_setlist(new_setlist):
+    """Swap in an uploaded setlist, staying on the current song if it is still in the set"""
+    global setlist, idx, page, current_set, _default_setlist
+    refused = _unshareable(new_setlist)
+    if refused:
+        return refused
+    with lock:
+        title = setlist[idx].get("title") if 0 <= idx < len(setlist) else None
+        matches = [i for i, song in enumerate(new_setlist) if song.get("title") == title]
+        if matches:
+            new_idx = min(matches, key=lambda i: abs(i - idx))   # Nearest one if a title repeats
+        else:
+            new_idx = min(idx, len(new_setlist) - 1)
+        same_song = title is not None and new_setlist[new_idx].get("title") == title
+        setlist = new_setlist
+        idx = new_idx
+        current_set = None   # setlist.json is what was replaced
+        _default_setlist = new_setlist
+    print(f"📋 Uploaded setlist installed: {len(setlist)} songs")
+    input_recorder.snapshot(idx, setlist)
+    for listener in setlist_listeners:
+        listener(setlist)
+    if same_song:
+        # Same song on the panel: no transition, the scroll keeps its phase
+        if pages is not None:
+            pages.focus(setlist, idx)
+            if page >= pages.page_count(setlist[idx]):
+                page = 0
+        request_redraw()
+        _publish_state(with_setlist=True)
+    else:
+        _song_changed(with_setlist=True)
+    return f"OK {len(setlist)} songs"
+
+def switch_set(name):
+    """SET <name>: show another setlist from setlists/, back on the song we left it at
+
+    SET default goes back to setlist.json.
+    """
+    global setlist, idx, current_set, set_started_at
+    if name.lower() == DEFAULT_SET:
+        name, new_setlist = None, _default_setlist
+    else:
+        try:
+            name, new_setlist = setlists.load(name)
+        except ValueError as e:
+            return f"ERROR {e}"
+    refused = _unshareable(new_setlist)
+    if refused:
+        return refused
+    with lock:
+        _set_positions[current_set] = idx
+        setlist = new_setlist
+        idx = min(_set_positions.get(name, 0), len(setlist) - 1)
+        current_set = name
+    name = name or DEFAULT_SET
+    set_started_at = time.monotonic()
+    print(f"📋 Switched to set {name}: {len(setlist)} songs")
+    input_recorder.snapshot(idx, setlist)
+    for listener in setlist_listeners:
+        listener(setlist)
+    _song_changed(with_setlist=True)
+    return f"OK {name} {len(setlist)} songs"
+
+def list_sets():
+    """SETS: one line per setlist, the current one starred"""
+    lines = [f"{'*' if current_set is None else ' '} {DEFAULT_SET} (setlist.json, {len(_default_setlist)} songs)"]
+    for name in setlists.names():
+        if name.lower() == DEFAULT_SET:
+            lines.append(f"  {name} (hidden by setlist.json; rename it)")
+            continue
+        try:
+            songs = len(setlists.load(name)[1])
+        except ValueError as e:
+            lines.append(f"  {name} (unusable, see LOG)")
+            ringlog.warning("❌ Setlist %s", e)
+            continue
+        lines.append(f"{'*' if name == current_set else ' '} {name} ({songs} songs)")
+    return "\n".join(lines)
+
+def receive_upload(conn, data):
+    """Threaded server: take an UPLOAD on its own thread so other commands keep flowing"""
+    with conn:
+        try:
+            session = setlist_upload.UploadSession(SETLIST_PATH)
+            reply = install_setlist(setlist_upload.receive(conn, session, data))
+        except (setlist_upload.UploadError, OSError) as e:
+            ringlog.warning("📋 Upload rejected: %s", e)
+            reply = f"ERROR {e}"
+        try:
+            conn.sendall(reply.encode() + b"\n")
+        except OSError:
+            pass
+
+def setup_pages(prefetch=True):
+    """Chord/lyric pages rasterized with the panel's own BDF font"""
+    global pages
+    font = BdfFont.load_or_placeholder(BDF_FONT_DIR + SMALL_FONT_FILE)
+    colors = {song_pages.CHORD: KEY_RGB, song_pages.LYRIC: TITLE_RGB, song_pages.COMMENT: COMMENT_RGB}
+    # One budget for both caches: a quarter for parsed setlists, the rest for rendered pages
+    budget = int(os.environ.get("SETLIST_CACHE_KB", song_pages.PAGE_CACHE_BYTES // 1024)) * 1024
+    setlists.set_budget(budget // 4)
+    pages = song_pages.SongPages(os.path.dirname(SETLIST_PATH), font, options.cols, options.rows, colors,
+                                 cache_bytes=budget - budget // 4)
+    if prefetch:
+        pages.start()
+    pages.focus(setlist, idx)
+
+def start_sync(role):
+    """Start leader multicast or follower mirroring of the display state"""
+    if role == "leader":
+        leader = display_sync.SyncLeader()
+        leader.set_setlist(setlist)
+        leader.publish(idx)
+        state_listeners.append(lambda i, s: leader.publish(i, song_changed_at))
+        setlist_listeners.append(leader.set_setlist)
+        leader.start()
+        print(f"📡 Sync leader multicasting on {display_sync.MCAST_GROUP}:{display_sync.MCAST_PORT}")
+    elif role == "follower":
+        apply = apply_synced_state
+        if event_loop is not None:
+            # The follower thread only receives; the state change runs on the event loop
+            apply = lambda *state: event_loop.call_soon_threadsafe(apply_synced_state, *state)
+        display_sync.SyncFollower(apply, display_sync.setlist_hash(setlist)).start()
+        print(f"👂 Sync follower listening on {display_sync.MCAST_GROUP}:{display_sync.MCAST_PORT}")
+
+COMMAND_PORT = 6789
+LISTEN_BACKLOG = 64   # Connect-per-command clients arrive in bursts; a short queue turns them into SYN retries
+
+def tcp_server(port=COMMAND_PORT):
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     srv.bind(("0.0.0.0", port))
-    srv.listen(1)
+    srv.listen(LISTEN_BACKLOG)
     while True:
         conn, addr = srv.accept()
+        try:
+            data = conn.recv(256)
+        except OSError:
+            conn.close()
+            continue
+        upload = setlist_upload.upload_data(data)
+        if upload is not None:
+            threading.Thread(target=receive_upload, args=(conn, upload),
+                             name="setlist_upload", daemon=True).start()
+            continue
+        if data.strip().upper() == b"SUBSCRIBE" and state_hub is not None:
+            state_hub.adopt(conn)   # Stays open for change events
+            continue
         with conn:
-            data = conn.recv(256).decode().strip()
+            data = data.decode("utf-8", "replace").strip()
             if not data:
                 continue
-            handle_command(data)
-            conn.sendall(b"OK\n")
+            try:
+                reply = handle_command(data, source="tcp")
+            except Exception as e:
+                # A failing command must not take the command port down with it
+                ringlog.error("❌ Command %r failed: %r", data, e)
+                reply = f"ERROR {e!r}"
+            try:
+                conn.sendall((reply or "OK").encode() + b"\n")
+            except OSError:
+                pass   # Client went away before the reply
 
-def serial_listener(port="/dev/ttyUSB0", baud=115200):
-    if serial is None:
-        return
+def serial_listener(patterns=serial_input.DEFAULT_PATTERNS, baud=serial_input.DEFAULT_BAUD):
+    """Dispatch commands from every USB serial adapter, re-opening them on hotplug"""
+    global serial_ports
+    serial_ports = serial_input.SerialInput(lambda line, path: handle_command(line, source="serial"),
+                                            patterns=patterns, baud=baud)
+    serial_ports.run()
+
+def _midi_record(text):
+    input_recorder.record("midi", text)
+    metrics.commands.inc("midi")
+
+def make_midi_input(fifo=None):
+    """MIDI ports wired straight to the song functions, no command parsing on the way"""
+    actions = {
+        "next": next_song,
+        "prev": prev_song,
+        "goto": goto_song,
+        "page_next": lambda: turn_page(1),
+        "page_prev": lambda: turn_page(-1),
+        "page_title": lambda: turn_page(number=0),
+    }
+    ports = midi_input.MidiInput(actions, record=_midi_record)
+    if fifo:
+        ports.add_pattern(fifo)
+    return ports
+
+def midi_listener(fifo=None):
+    global midi_ports
+    midi_ports = make_midi_input(fifo)
+    midi_ports.run()
+
+def _osc_record(text):
+    input_recorder.record("osc", text)
+    metrics.commands.inc("osc")
+
+def _osc_state():
+    with lock:
+        return idx, setlist[idx].get("title", ""), len(setlist)
+
+def make_osc_server(args):
+    """OSC endpoint calling the song functions directly; None if disabled or the port is taken"""
+    global osc_server
+    if not args.osc_port:
+        return None
+    actions = {"next": next_song, "prev": prev_song, "goto": goto_song, "set": switch_set}
     try:
-        ser = serial.Serial(port, baud, timeout=0.5)
-    except Exception:
-        return
-    while True:
+        targets = [osc_input.parse_target(t) for t in args.osc_reply]
+        osc_server = osc_input.OscServer(actions, _osc_state, port=args.osc_port,
+                                         targets=targets, record=_osc_record)
+    except (OSError, ValueError) as e:
+        print(f"❌ OSC endpoint unavailable: {e}")
+        return None
+    if targets:
+        state_listeners.append(lambda new_idx, new_setlist: osc_server.send_state())
+    return osc_server
+
+def make_state_hub(args):
+    """Push song changes to SUBSCRIBE connections and WebSocket clients"""
+    global state_hub
+    try:
+        state_hub = state_push.StateHub(port=args.ws_port)
+    except OSError as e:
+        print(f"❌ WebSocket port unavailable, SUBSCRIBE only: {e}")
+        state_hub = state_push.StateHub(port=0)
+    state_listeners.append(state_hub.update)
+    setlist_listeners.append(lambda new_setlist: state_hub.update(idx, new_setlist))
+    state_hub.update(idx, setlist)
+    metrics.add_gauge("setlist_subscribers", "Controllers subscribed to song changes", state_hub.count)
+    return state_hub
+
+def _gpio_press(command):
+    if event_loop is not None:
+        event_loop.call_soon_threadsafe(handle_command, command, "gpio")
+    else:
+        handle_command(command, source="gpio")
+
+def setup_gpiod_buttons(provider=None):
+    """Edge-event buttons on the GPIO character device; returns False if unavailable"""
+    if provider is None:
+        if gpio_buttons.gpiod is None or not os.path.exists(gpio_buttons.GPIO_CHIP):
+            return False
         try:
-            line = ser.readline().decode().strip()
-            if line:
-                handle_command(line)
-        except Exception:
-            time.sleep(0.1)
+            provider = gpio_buttons.GpiodLineProvider((BTN_NEXT_PIN, BTN_PREV_PIN))
+        except Exception as e:
+            ringlog.warning("🔘 gpiod buttons unavailable: %r", e)
+            return False
+    buttons = [
+        gpio_buttons.Button(BTN_NEXT_PIN, lambda: _gpio_press("NEXT"),
+                            debounce_ms=BTN_DEBOUNCE_MS, long_press_ms=BTN_LONG_PRESS_MS),
+        gpio_buttons.Button(BTN_PREV_PIN, lambda: _gpio_press("PREV"),
+                            on_long_press=lambda: _gpio_press("GOTO 0"),
+                            debounce_ms=BTN_DEBOUNCE_MS, long_press_ms=BTN_LONG_PRESS_MS),
+    ]
+    reader = gpio_buttons.ButtonInput(buttons, provider)
+    if event_loop is not None:
+        event_loop.attach(reader, "gpio")
+    else:
+        threading.Thread(target=reader.run, name="gpio_buttons", daemon=True).start()
+    return True
 
 def setup_buttons():
+    if setup_gpiod_buttons():
+        return
     if GPIO is None:
         return
     GPIO.setwarnings(False)
@@ -244,8 +896,8 @@ def setup_buttons():
         except Exception:
             pass
     try:
-        GPIO.add_event_detect(BTN_NEXT_PIN, GPIO.FALLING, callback=lambda ch: next_song(), bouncetime=200)
-        GPIO.add_event_detect(BTN_PREV_PIN, GPIO.FALLING, callback=lambda ch: prev_song(), bouncetime=200)
+        GPIO.add_event_detect(BTN_NEXT_PIN, GPIO.FALLING, callback=lambda ch: _gpio_press("NEXT"), bouncetime=200)
+        GPIO.add_event_detect(BTN_PREV_PIN, GPIO.FALLING, callback=lambda ch: _gpio_press("PREV"), bouncetime=200)
         return
     except Exception:
         def _poll_buttons():
@@ -262,24 +914,30 @@ def setup_buttons():
                 except Exception:
                     continue
                 if last_next == 1 and cur_next == 0:
-                    next_song()
+                    _gpio_press("NEXT")
                 if last_prev == 1 and cur_prev == 0:
-                    prev_song()
+                    _gpio_press("PREV")
                 last_next, last_prev = cur_next, cur_prev
-        t = threading.Thread(target=_poll_buttons, daemon=True)
+        t = threading.Thread(target=_poll_buttons, name="poll_buttons", daemon=True)
         t.start()
 
-def handle_command(cmd):
+def handle_command(cmd, source="tcp"):
+    """Run one command; returns reply text for the client, or None for plain OK"""
     cmd_original = cmd.strip()
     cmd = cmd_original.upper()
+    pedal_code = "40(" in cmd_original or "38&" in cmd_original
+    input_recorder.record("evdev" if pedal_code else source, cmd_original)
     
     # Handle Bluetooth pedal inputs (check original case-sensitive command)
     if "40(" in cmd_original:  # Down/Next button
+        metrics.commands.inc("pedal")
         next_song()
         return
     elif "38&" in cmd_original:  # Up/Previous button  
+        metrics.commands.inc("pedal")
         prev_song()
         return
+    metrics.commands.inc(source)
     
     # Handle text commands
     if cmd == "NEXT":
@@ -292,11 +950,89 @@ def handle_command(cmd):
             goto_song(n)
         except Exception:
             pass
-    elif cmd == "LIST":
-        for i, s in enumerate(setlist):
-            print(i, s.get("title", ""))
+    elif cmd.startswith("SKIP "):
+        # Relative move, e.g. from the pedal's double-tap
+        try:
+            skip_songs(int(cmd.split()[1]))
+        except ValueError:
+            ringlog.warning("Bad skip command: %s", cmd)
+    elif cmd in ("PAGE", "PAGE NEXT"):
+        turn_page(1)
+    elif cmd in ("PAGE PREV", "PAGE BACK"):
+        turn_page(-1)
+    elif cmd.startswith("PAGE "):
+        try:
+            turn_page(number=int(cmd.split()[1]))
+        except ValueError:
+            ringlog.warning("Bad page command: %s", cmd)
+    elif cmd.startswith("SET "):
+        return switch_set(cmd_original.split(None, 1)[1].strip())
+    elif cmd == "SETS":
+        return list_sets()
+    elif cmd == "LIST" or cmd.startswith("LIST "):
+        # Paged JSON, e.g. "LIST 0 50", or "LIST 0 50 <version>" for NOT MODIFIED
+        return query.reply(setlist, cmd_original.split()[1:])
+    elif cmd == "QUERY":
+        return query.stats_line()
+    elif cmd == "LOG" or cmd.startswith("LOG "):
+        # Dump the recent in-memory log, e.g. "LOG 200"
+        try:
+            count = int(cmd.split()[1]) if " " in cmd else 50
+        except ValueError:
+            count = 50
+        if count < 1:
+            return "ERROR usage: LOG [n], n at least 1"
+        return "\n".join(ringlog.recent(count))
+    elif cmd == "STATS":
+        # The input process of --split-io draws nothing; show the render process's frames
+        return metrics.stats_line(shared.read_render() if shared is not None else None)
+    elif cmd == "CAPTURE":
+        return frame_capture.capture.stats_line() if frame_capture.capture else "not capturing (start with --capture)"
+    elif cmd == "LAYERS":
+        # How often each title screen layer has been redrawn
+        return _screen.stats() if _screen else "title screen not drawn in this process"
+    elif cmd == "PAGES":
+        # Both halves of the SETLIST_CACHE_KB budget
+        return f"{pages.stats() if pages else 'pages not loaded'}; {setlists.stats()}"
+    elif cmd == "SERIAL":
+        return serial_ports.stats_line() if serial_ports else "serial listener not running"
+    elif cmd == "SUBS":
+        return state_hub.stats_line() if state_hub else "no subscriptions in this process"
+    elif cmd == "OSC":
+        return osc_server.stats_line() if osc_server else "OSC endpoint not running"
+    elif cmd == "MIDI":
+        return midi_ports.stats_line() if midi_ports else "MIDI listener not running"
+    elif cmd == "PROFILE START" or cmd.startswith("PROFILE START "):
+        # Optional comma-separated thread names, e.g. "PROFILE START MainThread,tcp_server"
+        names = cmd_original.split(None, 2)[2].split(",") if len(cmd.split()) > 2 else PROFILED_THREADS
+        return profiler.start(names)
+    elif cmd == "PROFILE STOP":
+        return profiler.stop()
+    elif cmd == "JOURNAL":
+        # Writer counters, then the last positions on disk
+        lines = [position_journal.journal.stats_line() if position_journal.journal else "journal not running"]
+        for wall, song, song_page, _ in position_journal.recent():
+            lines.append(f"{time.strftime('%H:%M:%S', time.localtime(wall))} song {song} page {song_page}")
+        return "\n".join(lines)
+    elif cmd == "REACTOR":
+        return event_loop.stats_line() if event_loop else "event loop not in use (start with --reactor)"
+    elif cmd == "SCHED":
+        return rt_sched.describe()
+    elif cmd == "SCHED PROBE" or cmd.startswith("SCHED PROBE "):
+        # Wake-up jitter under the default and each configured setting, e.g. "SCHED PROBE 1"
+        try:
+            seconds = min(float(cmd.split()[2]), 10.0) if len(cmd.split()) > 2 else rt_sched.PROBE_SECONDS
+        except ValueError:
+            seconds = rt_sched.PROBE_SECONDS
+        # Seconds per setting: never on the command server or event loop thread
+        expected = rt_sched.start_sweep(seconds)
+        if expected is None:
+            return "probe already running"
+        return f"probe started, about {expected:g}s; SCHED RESULT shows it"
+    elif cmd == "SCHED RESULT":
+        return rt_sched.sweep_result()
     else:
-        print("Unknown:", cmd)
+        ringlog.warning("Unknown: %s", cmd)
 
 def keyboard_listener():
     """Placeholder keyboard listener for Bluetooth pedal"""
@@ -312,29 +1048,210 @@ def keyboard_listener():
     except KeyboardInterrupt:
         pass
 
+def start_inputs(args):
+    """Journal, recorder, buttons, command server, change events, serial, MIDI, OSC, keyboard and panel sync"""
+    if not args.no_journal:
+        try:
+            position_journal.start()
+        except OSError as e:
+            print(f"❌ Position journal unavailable: {e}")
+    if not args.no_record:
+        try:
+            recorder = input_recorder.start(os.path.join(os.path.dirname(__file__), input_recorder.RECORD_DIR))
+            input_recorder.snapshot(idx, setlist)
+            print(f"🎙️  Recording input to {recorder.path}")
+        except OSError as e:
+            print(f"❌ Input recording unavailable: {e}")
+    setup_buttons()
+    print("🔘 Buttons configured")
+    if event_loop is not None:
+        start_reactor_inputs(args)
+    else:
+        make_state_hub(args)
+        threading.Thread(target=tcp_server, args=(args.port,), name="tcp_server", daemon=True).start()
+        print(f"🌐 TCP server started on port {args.port}")
+        threading.Thread(target=state_hub.run, name="state_push", daemon=True).start()
+        if state_hub.sock is not None:
+            print(f"📣 Change events on SUBSCRIBE and WebSocket port {args.ws_port}")
+        threading.Thread(target=serial_listener, name="serial_listener", daemon=True).start()
+        print("📡 Serial listener started")
+        threading.Thread(target=midi_listener, args=(args.midi_fifo,), name="midi_listener", daemon=True).start()
+        print("🎹 MIDI listener started")
+        if make_osc_server(args):
+            threading.Thread(target=osc_server.run, name="osc_server", daemon=True).start()
+            print(f"🎚️  OSC on UDP port {args.osc_port}")
+        threading.Thread(target=keyboard_listener, name="keyboard_listener", daemon=True).start()
+        print("⌨️  Bluetooth pedal listener started")
+    if args.leader:
+        start_sync("leader")
+    elif args.follower:
+        start_sync("follower")
+    rt_sched.apply_threads()
+
+def start_reactor_inputs(args):
+    """Change events, command server, serial and MIDI ports, OSC and the evdev pedal as event loop sources"""
+    global serial_ports, midi_ports
+    event_loop.attach(make_state_hub(args), "push")
+    try:
+        reactor.CommandServer(event_loop, lambda line: handle_command(line, source="tcp"),
+                              new_upload=lambda: setlist_upload.UploadSession(SETLIST_PATH),
+                              install_upload=install_setlist, subscribe=state_hub.adopt, port=args.port)
+        print(f"🌐 TCP server on port {args.port}, on the event loop")
+    except OSError as e:
+        print(f"❌ TCP server unavailable: {e}")
+    serial_ports = serial_input.SerialInput(lambda line, path: handle_command(line, source="serial"))
+    event_loop.attach(serial_ports, "serial")
+    print("📡 Serial ports on the event loop")
+    midi_ports = make_midi_input(args.midi_fifo)
+    event_loop.attach(midi_ports, "midi")
+    print("🎹 MIDI ports on the event loop")
+    if make_osc_server(args):
+        event_loop.attach(osc_server, "osc")
+        print(f"🎚️  OSC on UDP port {args.osc_port}, on the event loop")
+    if evdev_input.evdev is not None:
+        event_loop.attach(evdev_input.PedalInput(lambda command: handle_command(command, source="evdev")), "evdev")
+        print("🦶 Pedal (evdev) on the event loop")
+
+def run_input_process(args, parent_pid):
+    """Forked child for --split-io: every input, no drawing"""
+    global shared, event_loop
+    signal.signal(signal.SIGTERM, signal.default_int_handler)   # Clean up GPIO on shutdown
+    if args.reactor:
+        event_loop = reactor.Reactor()
+    ringlog.start()
+    load_setlist()
+    if not args.no_journal:
+        resume_position()
+    setup_pages(prefetch=False)   # Only page counts are needed here
+    shared = split_state
+    _publish_state(with_setlist=True)
+    start_inputs(args)
+    print(f"🔀 Input process {os.getpid()} running")
+    try:
+        if event_loop is not None:
+            def watch_parent():
+                if os.getppid() != parent_pid:
+                    event_loop.stop()
+                event_loop.call_later(1.0, watch_parent)
+            watch_parent()
+            event_loop.run()
+        else:
+            while os.getppid() == parent_pid:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if GPIO:
+            GPIO.cleanup()
+        position_journal.stop()
+        input_recorder.stop()
+        ringlog.stop()
+    os._exit(0)
+
+split_state = None
+
 def main():
+    parser = argparse.ArgumentParser(description="Setlist LED matrix display")
+    role = parser.add_mutually_exclusive_group()
+    role.add_argument("--leader", action="store_true", help="multicast song changes to follower panels")
+    role.add_argument("--follower", action="store_true", help="mirror the song shown by a leader panel")
+    parser.add_argument("--port", type=int, default=COMMAND_PORT, help="TCP command server port")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="neither resume from nor write state/position.journal (test and benchmark runs)")
+    parser.add_argument("--no-record", action="store_true",
+                        help="do not write the inbound command log to recordings/")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                        help="localhost port for Prometheus metrics (0 disables)")
+    parser.add_argument("--split-io", action="store_true",
+                        help="handle input in a separate process so I/O bursts cannot starve rendering")
+    parser.add_argument("--reactor", action="store_true",
+                        help="run every input and the render timer on one event loop instead of threads")
+    parser.add_argument("--midi-fifo", metavar="PATH",
+                        help="also read MIDI bytes from this FIFO (for testing without a controller)")
+    parser.add_argument("--capture", nargs="?", const="", metavar="PATH",
+                        help="record every frame shown (default captures/capture-<time>.slfc)")
+    parser.add_argument("--ws-port", type=int, default=state_push.WS_PORT,
+                        help="port for WebSocket change events (0: SUBSCRIBE on the command server only)")
+    parser.add_argument("--osc-port", type=int, default=osc_input.OSC_PORT,
+                        help="UDP port for OSC control (0 disables)")
+    parser.add_argument("--osc-reply", metavar="HOST:PORT", action="append", default=[],
+                        help="send /setlist/state here on every song change (repeatable; broadcast addresses work)")
+    args = parser.parse_args()
+
+    rt_sched.load_config()
+    global split_state, event_loop, _render_on_loop
+    input_pid = None
+    if args.split_io:
+        # Fork before any of our threads exist; the child only ever handles input
+        split_state = shared_state.SharedState()
+        parent_pid = os.getpid()
+        input_pid = os.fork()
+        if input_pid == 0:
+            run_input_process(args, parent_pid)
+    if args.reactor:
+        # Created after the fork: an epoll instance must not be shared between processes
+        event_loop = reactor.Reactor()
+
+    ringlog.start()
     print("🚀 Starting setlist application...")
     load_setlist()
     print("📋 Setlist loaded")
-    setup_buttons()
-    print("🔘 Buttons configured")
+    print(f"📚 {setlists.preload()} named setlists in {setlists.SETLISTS_DIR}")
+    if not args.no_journal:
+        resume_position()
+    setup_pages()
+    if args.capture is not None:
+        try:
+            capture = frame_capture.start(options.cols, options.rows, args.capture,
+                                          os.path.join(os.path.dirname(__file__), frame_capture.CAPTURE_DIR))
+            print(f"🎥 Capturing frames to {capture.path}")
+        except OSError as e:
+            print(f"❌ Frame capture unavailable: {e}")
     show_current()
     print("📺 Initial display should be shown")
-    threading.Thread(target=tcp_server, daemon=True).start()
-    print("🌐 TCP server started")
-    threading.Thread(target=serial_listener, daemon=True).start()
-    print("📡 Serial listener started")
-    threading.Thread(target=keyboard_listener, daemon=True).start()
-    print("⌨️  Bluetooth pedal listener started")
+    if input_pid is None:
+        start_inputs(args)
+    elif event_loop is not None:
+        event_loop.add_reader(split_state.wake_r, lambda: split_state.receive(apply_shared_state), "state")
+        share_render_stats()
+        print(f"🔀 Rendering only; input handled by process {input_pid}")
+    else:
+        threading.Thread(target=split_state.follow, args=(apply_shared_state,),
+                         name="state_reader", daemon=True).start()
+        threading.Thread(target=_share_render_stats_thread, name="render_stats", daemon=True).start()
+        print(f"🔀 Rendering only; input handled by process {input_pid}")
+    if args.metrics_port:
+        try:
+            metrics.start_http(args.metrics_port)
+            print(f"📊 Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"❌ Metrics endpoint failed: {e}")
+    metrics.add_gauge("setlist_log_pending", "Log records not yet flushed to stdout", ringlog.pending)
+    metrics.add_gauge("setlist_redraw_pending", "Redraw requested but not yet rendered",
+                      lambda: int(redraw_requested.is_set()))
     print("✅ Application running - press Ctrl+C to exit")
     try:
-        while True:
-            time.sleep(1)
+        if event_loop is not None:
+            _render_on_loop = True
+            rt_sched.apply_current("render")
+            request_redraw()
+            event_loop.run()
+        else:
+            render_loop()
     except KeyboardInterrupt:
         pass
     finally:
-        if GPIO:
+        if input_pid:
+            try:
+                os.kill(input_pid, signal.SIGTERM)
+            except OSError:
+                pass
+        if GPIO and not input_pid:
             GPIO.cleanup()
+        position_journal.stop()
+        input_recorder.stop()
+        frame_capture.stop()
+        ringlog.stop()
 
 if __name__ == "__main__":
     main()
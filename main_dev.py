@@ -14,6 +14,10 @@ import os
 import sys
 from PIL import Image, ImageDraw, ImageFont
 
+import ringlog
+from bdf_font import BdfFont
+from term_render import TerminalRenderer
+
 # Development mode flag - set to True when running without hardware
 DEVELOPMENT_MODE = True
 
@@ -48,6 +52,9 @@ FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
 LARGE_FONT_SIZE = 10  # Reduced from 12 for better fit
 SMALL_FONT_SIZE = 8   # Reduced from 10 for better fit
 
+# BDF font for the terminal view, so it matches the panel pixel for pixel
+DEV_BDF_FONT = os.environ.get("SETLIST_BDF_FONT", "/home/tjone/rpi-rgb-led-matrix/fonts/6x10.bdf")
+
 # Matrix configuration
 MATRIX_WIDTH = 64
 MATRIX_HEIGHT = 32
@@ -59,54 +66,33 @@ lock = threading.Lock()
 
 # Development mode display
 class DevelopmentDisplay:
-    """Simulates the RGB matrix display in the console"""
+    """Shows the panel's actual pixels in the terminal (see term_render.py)"""
     
     def __init__(self):
         self.width = MATRIX_WIDTH
         self.height = MATRIX_HEIGHT
+        self.font = BdfFont.load_or_placeholder(DEV_BDF_FONT)
+        self.pixels = bytearray(self.width * self.height * 3)
+        self.terminal = TerminalRenderer(self.width, self.height)
+        self.draw_lock = threading.Lock()
         
     def show_screen(self, title, key, capo, next_title=None):
-        """Display the current screen in console format"""
-        os.system('clear' if os.name == 'posix' else 'cls')
-        
-        # Create display frame
-        print("┌" + "─" * (self.width - 2) + "┐")
-        
-        # Title line (simulating bright red text) - full width for title
-        title_line = f" 🔴 {title}"
-        # Truncate or show scrolling indicator if too long
-        if len(title_line) > self.width - 2:
-            title_display = title_line[:self.width - 5] + "..."
-        else:
-            title_display = title_line.ljust(self.width - 2)
-        print(f"│{title_display}│")
-        
-        # Key and capo line (simulating orange-red text)
-        if key or capo:
-            key_capo_text = f" 🟠 Key: {key}" if key else " 🟠 "
-            if capo:
-                if key:
-                    key_capo_text += f"  Capo: {capo}"
-                else:
-                    key_capo_text += f"Capo: {capo}"
-            key_capo_display = key_capo_text.ljust(self.width - 2)
-            print(f"│{key_capo_display}│")
-        else:
-            print("│" + " " * (self.width - 2) + "│")
-        
-        # Empty lines (no more NEXT song display)
-        for _ in range(self.height - 5):
-            print("│" + " " * (self.width - 2) + "│")
-            
-        print("└" + "─" * (self.width - 2) + "┘")
-        
-        # Control info
-        print("\n📱 Controls:")
-        print("  [↓] or [n] - Next song")
-        print("  [↑] or [p] - Previous song") 
-        print("  [q] - Quit")
-        print("  [l] - List all songs")
-        print(f"\n🎵 Song {idx + 1} of {len(setlist)}")
+        """Draw the song the way the panel does; only changed cells are sent"""
+        key_capo_text = " ".join(p for p in (key, str(capo) if capo else "") if p)
+        with self.draw_lock:
+            self.pixels[:] = bytes(len(self.pixels))
+            # Same layout and colours as main.py: title on top, key and capo below
+            self.font.draw(self.pixels, self.width, self.height, 1, 12, title, (255, 0, 0))
+            if key_capo_text:
+                self.font.draw(self.pixels, self.width, self.height, 1, 25, key_capo_text, (255, 128, 0))
+            first = self.terminal.frames == 0
+            self.terminal.draw(self.pixels)
+        if first:
+            print("📱 Controls: [↓]/[n] next  [↑]/[p] previous  [l] list  [q] quit")
+        print(f"🎵 Song {idx + 1} of {len(setlist)}: {title}")
+
+    def close(self):
+        self.terminal.close()
 
 # Initialize display
 if DEVELOPMENT_MODE or RGBMatrix is None:
@@ -216,7 +202,7 @@ def draw_screen():
             canvas.SetImage(img, 0, 0)
             matrix.SwapOnVSync(canvas)
         except Exception as e:
-            print(f"❌ Matrix display error: {repr(e)}")
+            ringlog.error("❌ Matrix display error: %r", e)
 
 def show_current():
     """Display current song"""
@@ -227,7 +213,7 @@ def next_song():
     global idx
     with lock:
         idx = (idx + 1) % len(setlist)
-    print(f"⏭️  Next song")
+    ringlog.info("⏭️  Next song")
     show_current()
 
 def prev_song():
@@ -235,7 +221,7 @@ def prev_song():
     global idx
     with lock:
         idx = (idx - 1 + len(setlist)) % len(setlist)
-    print(f"⏮️  Previous song")
+    ringlog.info("⏮️  Previous song")
     show_current()
 
 def goto_song(n):
@@ -244,7 +230,7 @@ def goto_song(n):
     with lock:
         if 0 <= n < len(setlist):
             idx = n
-    print(f"🎯 Going to song {n + 1}")
+    ringlog.info("🎯 Going to song %d", n + 1)
     show_current()
 
 def list_songs():
@@ -285,6 +271,8 @@ def keyboard_listener():
         while True:
             char = get_char().lower()
             if char == 'q':
+                if display:
+                    display.close()
                 print("\n👋 Goodbye!")
                 os._exit(0)
             elif char in ['n', '\x1b[B']:  # n or down arrow
@@ -332,9 +320,9 @@ def tcp_server(port=6789):
                 data = conn.recv(256).decode().strip()
                 if not data:
                     continue
-                print(f"📡 TCP command from {addr}: {data}")
-                handle_command(data)
-                conn.sendall(b"OK\n")
+                ringlog.info("📡 TCP command from %s: %s", addr, data)
+                reply = handle_command(data)
+                conn.sendall((reply or "OK").encode() + b"\n")
     except Exception as e:
         print(f"❌ TCP server error: {e}")
 
@@ -349,7 +337,7 @@ def serial_listener(port="/dev/ttyUSB0", baud=115200):
             try:
                 line = ser.readline().decode().strip()
                 if line:
-                    print(f"📻 Serial command: {line}")
+                    ringlog.info("📻 Serial command: %s", line)
                     handle_command(line)
             except Exception:
                 time.sleep(0.1)
@@ -405,7 +393,10 @@ def setup_buttons():
         print("✅ Button polling started")
 
 def handle_command(cmd):
-    """Handle commands from various sources"""
+    """Handle commands from various sources
+
+    Returns reply text for the client, or None for a plain OK.
+    """
     cmd = cmd.strip().upper()
     
     # Handle Bluetooth pedal inputs
@@ -426,16 +417,24 @@ def handle_command(cmd):
             n = int(cmd.split()[1])
             goto_song(n - 1)  # Convert to 0-based index
         except Exception:
-            print(f"❌ Invalid goto command: {cmd}")
+            ringlog.warning("❌ Invalid goto command: %s", cmd)
     elif cmd == "LIST":
         list_songs()
+    elif cmd == "LOG" or cmd.startswith("LOG "):
+        # Dump the recent in-memory log, e.g. "LOG 200"
+        try:
+            count = int(cmd.split()[1]) if " " in cmd else 50
+        except ValueError:
+            count = 50
+        return "\n".join(ringlog.recent(count))
     else:
-        print(f"❓ Unknown command: {cmd}")
+        ringlog.warning("❓ Unknown command: %s", cmd)
 
 def main():
     """Main application entry point"""
     print("🎵 Setlist Display Application")
     print("=" * 50)
+    ringlog.start()
     
     # Load data
     load_setlist()
@@ -464,6 +463,9 @@ def main():
     finally:
         if GPIO and not DEVELOPMENT_MODE:
             GPIO.cleanup()
+        if display:
+            display.close()
+        ringlog.stop()
         print("👋 Application stopped")
 
 if __name__ == "__main__":
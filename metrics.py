@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Runtime metrics for the setlist display
+
+Counters and frame timings are updated from the render and input threads with
+a few cheap operations; the STATS command and a localhost Prometheus endpoint
+read them on demand.
+"""
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = 9105          # Prometheus text endpoint, bound to localhost only
+RATE_WINDOW = 10.0           # Seconds of history behind the per-second rates
+FRAME_SAMPLES = 512          # Recent frame times kept for percentiles
+
+COMMAND_SOURCES = ("tcp", "serial", "gpio", "pedal", "evdev", "midi", "osc")
+
+
+class Counter:
+    """Monotonic counter, optionally split by one label (e.g. source)"""
+
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()  # Uncontended acquire is ~50 ns
+        self._recent = {}
+
+    def inc(self, key=None, amount=1):
+        second = int(time.monotonic())
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            # Per-second totals for rate(): bounded memory whatever the event rate
+            buckets = self._recent.get(key)
+            if buckets is None:
+                buckets = self._recent[key] = deque(maxlen=int(RATE_WINDOW) + 2)
+            if buckets and buckets[-1][0] == second:
+                buckets[-1][1] += amount
+            else:
+                buckets.append([second, amount])
+
+    def value(self, key=None):
+        return self._values.get(key, 0)
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def rate(self, key=None, window=RATE_WINDOW):
+        """Amount per second over the last `window` seconds (whole seconds, up to RATE_WINDOW)"""
+        with self._lock:
+            buckets = [tuple(b) for b in self._recent.get(key, ())]
+        if not buckets:
+            return 0.0
+        now = time.monotonic()
+        first = int(now - window)
+        return sum(amount for second, amount in buckets if second >= first) / (now - first)
+
+
+class Gauge:
+    """Value read from a callback at scrape time, e.g. a queue depth"""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def value(self):
+        try:
+            return self.read()
+        except Exception:
+            return 0
+
+
+class FrameTimer:
+    """Render frame durations and timestamps for FPS and percentiles"""
+
+    def __init__(self, samples=FRAME_SAMPLES):
+        # deque.append is atomic, so the render loop records without locking
+        self._durations = deque(maxlen=samples)
+        self._stamps = deque(maxlen=samples)
+
+    def record(self, started, finished):
+        self._durations.append(finished - started)
+        self._stamps.append(finished)
+
+    def fps(self, window=1.0):
+        cutoff = time.monotonic() - window
+        return sum(1 for t in list(self._stamps) if t >= cutoff) / window
+
+    def percentile(self, pct):
+        durations = sorted(self._durations)
+        if not durations:
+            return 0.0
+        return durations[min(len(durations) - 1, int(len(durations) * pct / 100))]
+
+
+counters = []
+gauges = []
+
+
+def counter(name, help_text, label=None):
+    """Create a counter that is included in the Prometheus output"""
+    c = Counter(name, help_text, label)
+    counters.append(c)
+    return c
+
+
+frames = counter("setlist_frames_rendered_total", "Frames drawn and swapped to the panel")
+frames_elided = counter("setlist_frames_elided_total", "Frame ticks skipped because nothing changed")
+commands = counter("setlist_commands_total", "Commands handled", label="source")
+reconnects = counter("setlist_reconnects_total", "Input device or connection re-opens", label="source")
+frame_timer = FrameTimer()
+beat_timer = FrameTimer()   # Beat time -> swap time: how late each beat onset was shown
+
+
+def add_gauge(name, help_text, read):
+    """Register a gauge such as a queue depth; `read` must be cheap and thread-safe"""
+    gauges.append(Gauge(name, help_text, read))
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def render_snapshot():
+    """(frames, elided, fps, frame p50, frame p99) of this process"""
+    return (frames.value(), frames_elided.value(), frame_timer.fps(),
+            frame_timer.percentile(50), frame_timer.percentile(99))
+
+
+def stats_line(render=None):
+    """Compact one-line snapshot for the STATS command
+
+    `render` replaces this process's frame figures with another's
+    render_snapshot(), e.g. the render process's under --split-io.
+    """
+    frame_count, elided, fps, p50, p99 = render or render_snapshot()
+    parts = [
+        f"fps={fps:.1f}",
+        f"frame_p50={p50 * 1000:.2f}ms",
+        f"frame_p99={p99 * 1000:.2f}ms",
+        f"frames={frame_count}",
+        f"elided={elided}",
+    ]
+    if beat_timer.percentile(100):
+        parts.append(f"beat_late_p50={beat_timer.percentile(50) * 1000:.2f}ms "
+                     f"beat_late_p99={beat_timer.percentile(99) * 1000:.2f}ms")
+    parts.append("cmd/s " + " ".join(f"{s}={commands.rate(s):.2f}" for s in COMMAND_SOURCES))
+    if gauges:
+        parts.append("queues " + " ".join(f"{g.name}={g.value()}" for g in gauges))
+    parts.append("reconnects " + (" ".join(f"{k}={v}" for k, v in reconnects.items()) or "0"))
+    parts.append(f"rss={rss_bytes() / (1024 * 1024):.1f}MB")
+    return " ".join(parts)
+
+
+def _counter_lines(counter):
+    lines = [f"# HELP {counter.name} {counter.help}", f"# TYPE {counter.name} counter"]
+    items = counter.items()
+    if counter.label is None:
+        lines.append(f"{counter.name} {counter.value()}")
+    else:
+        for key, value in sorted(items, key=lambda kv: str(kv[0])):
+            lines.append(f'{counter.name}{{{counter.label}="{key}"}} {value}')
+    return lines
+
+
+def prometheus_text():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for c in counters:
+        lines.extend(_counter_lines(c))
+    lines += [
+        "# HELP setlist_render_fps Frames drawn over the last second",
+        "# TYPE setlist_render_fps gauge",
+        f"setlist_render_fps {frame_timer.fps():.2f}",
+        "# HELP setlist_frame_seconds Recent render frame duration percentiles",
+        "# TYPE setlist_frame_seconds summary",
+        f'setlist_frame_seconds{{quantile="0.5"}} {frame_timer.percentile(50):.6f}',
+        f'setlist_frame_seconds{{quantile="0.99"}} {frame_timer.percentile(99):.6f}',
+    ]
+    lines += [
+        "# HELP setlist_beat_lateness_seconds Time from each beat to the frame showing it",
+        "# TYPE setlist_beat_lateness_seconds summary",
+        f'setlist_beat_lateness_seconds{{quantile="0.5"}} {beat_timer.percentile(50):.6f}',
+        f'setlist_beat_lateness_seconds{{quantile="0.99"}} {beat_timer.percentile(99):.6f}',
+    ]
+    for gauge in gauges:
+        lines += [f"# HELP {gauge.name} {gauge.help}", f"# TYPE {gauge.name} gauge",
+                  f"{gauge.name} {gauge.value()}"]
+    lines += [
+        "# HELP process_resident_memory_bytes Resident set size",
+        "# TYPE process_resident_memory_bytes gauge",
+        f"process_resident_memory_bytes {rss_bytes()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would otherwise flood stdout
+
+
+def start_http(port=METRICS_PORT, host="127.0.0.1"):
+    """Serve /metrics on localhost from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics_http", daemon=True).start()
+    return server
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+MIDI foot-controller input
+
+Reads raw MIDI bytes from ALSA rawmidi devices (/dev/snd/midiC*D*, which is
+also how sequencer clients show up through the snd-virmidi module) or from
+a FIFO for testing, and parses them incrementally: running status,
+real-time bytes in the middle of a message and SysEx are all handled, and a
+message split across reads is completed by the next one.
+
+Messages are mapped through midi.json (next to main.py, optional):
+
+    {
+      "channel": null,                 # 1-16, or null for every channel
+      "program_change": "goto",        # Program n shows song n (0-based)
+      "control_change": {"80": "next", "81": "prev", "82": "page_next"}
+    }
+
+and call the action functions main.py hands in directly, without building
+a command string for handle_command. A controller fires when its value
+crosses 64 upwards (footswitch pressed), not again while it stays down.
+
+Try it without hardware:
+    mkfifo /tmp/midi && python3 main.py --midi-fifo /tmp/midi
+    printf '\\xc0\\x03' > /tmp/midi                       # GOTO 3
+    printf '\\xb0\\x50\\x7f\\x50\\x00\\x50\\x7f' > /tmp/midi   # NEXT twice (running status)
+"""
+import glob
+import json
+import os
+import select
+import stat
+import time
+
+import metrics
+import ringlog
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "midi.json")
+DEFAULT_PATTERNS = ("/dev/snd/midiC*D*",)
+DEFAULT_MAPPING = {
+    "channel": None,
+    "program_change": "goto",
+    "control_change": {"80": "next", "81": "prev"},
+}
+READ_SIZE = 1024
+RESCAN_INTERVAL = 2.0
+CC_ON = 64
+
+NOTE_OFF, NOTE_ON, POLY_PRESSURE, CONTROL_CHANGE, PROGRAM_CHANGE, CHANNEL_PRESSURE, PITCH_BEND = range(0x80, 0xF0, 0x10)
+
+# Command text for each action, for the input recording and LOG
+ACTION_COMMANDS = {
+    "next": "NEXT",
+    "prev": "PREV",
+    "goto": "GOTO {}",
+    "page_next": "PAGE NEXT",
+    "page_prev": "PAGE PREV",
+    "page_title": "PAGE 0",
+}
+
+midi_messages = metrics.counter("setlist_midi_messages_total", "MIDI channel messages parsed", label="port")
+
+
+def _data_length(status):
+    return 1 if status & 0xF0 in (PROGRAM_CHANGE, CHANNEL_PRESSURE) else 2
+
+
+class MidiParser:
+    """Byte stream -> (status, data1, data2) channel messages"""
+
+    def __init__(self):
+        self.running = None     # Status byte that data bytes belong to
+        self.data = []
+        self.in_sysex = False
+
+    def feed(self, data):
+        out = []
+        for byte in data:
+            if byte >= 0xF8:
+                continue  # Real-time (clock, start, stop...): may sit inside any message
+            if byte >= 0x80:
+                self.data = []
+                if byte == 0xF0:
+                    self.in_sysex, self.running = True, None
+                elif byte >= 0xF0:
+                    # End of SysEx or system common: neither is ours, and both cancel running status
+                    self.in_sysex, self.running = False, None
+                else:
+                    self.in_sysex, self.running = False, byte
+                continue
+            if self.in_sysex or self.running is None:
+                continue
+            self.data.append(byte)
+            if len(self.data) == _data_length(self.running):
+                data1 = self.data[0]
+                data2 = self.data[1] if len(self.data) > 1 else 0
+                out.append((self.running, data1, data2))
+                self.data = []    # Running status: the next data bytes start a new message
+        return out
+
+
+def load_mapping(path=CONFIG_PATH):
+    """midi.json merged over the defaults; a missing file means the defaults"""
+    mapping = dict(DEFAULT_MAPPING)
+    if not os.path.exists(path):
+        return mapping
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            mapping.update(json.load(f))
+    except (OSError, ValueError) as e:
+        ringlog.error("❌ Could not read %s: %r", path, e)
+    return mapping
+
+
+class MidiPort:
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.parser = MidiParser()
+        self.messages = 0
+
+    def open(self):
+        # O_RDWR keeps a FIFO from reporting end-of-file whenever the writer goes away
+        flags = os.O_RDWR if _is_fifo(self.path) else os.O_RDONLY
+        self.fd = os.open(self.path, flags | os.O_NONBLOCK | os.O_NOCTTY)
+        self.parser = MidiParser()
+
+    def close(self):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+
+def _is_fifo(path):
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+class MidiInput:
+    """Every matching MIDI device on one epoll set; also a reactor source
+
+    `actions` maps action names ("next", "prev", "goto", ...) to callables;
+    "goto" gets the program number. `record(text)` is called before each
+    action with the equivalent command text, for the input recording.
+    """
+
+    def __init__(self, actions, mapping=None, patterns=DEFAULT_PATTERNS, record=None):
+        self.actions = actions
+        self.mapping = mapping if mapping is not None else load_mapping()
+        self.patterns = list(patterns)
+        self.record = record
+        self.ports = {}        # path -> MidiPort
+        self._by_fd = {}
+        self._epoll = select.epoll()
+        self._cc_down = set()  # (channel, controller) currently past CC_ON
+        self.scan_at = time.monotonic()
+        self.dispatched = 0
+        self.ignored = 0
+
+    def add_pattern(self, pattern):
+        self.patterns.append(pattern)
+        self.scan_at = time.monotonic()
+
+    def fileno(self):
+        return self._epoll.fileno()
+
+    def next_deadline(self):
+        return self.scan_at
+
+    def _scan(self):
+        self.scan_at = time.monotonic() + RESCAN_INTERVAL
+        for pattern in self.patterns:
+            for path in sorted(glob.glob(pattern)):
+                port = self.ports.setdefault(path, MidiPort(path))
+                if port.fd is not None:
+                    continue
+                try:
+                    port.open()
+                except OSError as e:
+                    ringlog.debug("🎹 %s not readable: %r", path, e)
+                    continue
+                self._by_fd[port.fd] = port
+                self._epoll.register(port.fd, select.EPOLLIN | select.EPOLLERR | select.EPOLLHUP)
+                ringlog.info("🎹 MIDI input on %s", path)
+
+    def _drop(self, port, reason):
+        ringlog.warning("🎹 MIDI port %s closed: %s", port.path, reason)
+        self._by_fd.pop(port.fd, None)
+        try:
+            self._epoll.unregister(port.fd)
+        except (OSError, ValueError):
+            pass
+        port.close()
+
+    def _read(self, port):
+        try:
+            data = os.read(port.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._drop(port, e)
+            return
+        if not data:
+            self._drop(port, "end of file")
+            return
+        for message in port.parser.feed(data):
+            port.messages += 1
+            midi_messages.inc(port.path)
+            self.dispatch(*message)
+
+    def dispatch(self, status, data1, data2):
+        """Run the action mapped to one channel message, if any"""
+        kind, channel = status & 0xF0, (status & 0x0F) + 1
+        wanted = self.mapping.get("channel")
+        if wanted and channel != wanted:
+            return
+        action, arg = None, ()
+        if kind == PROGRAM_CHANGE:
+            action, arg = self.mapping.get("program_change"), (data1,)
+        elif kind == CONTROL_CHANGE:
+            key = (channel, data1)
+            if data2 < CC_ON:
+                self._cc_down.discard(key)
+                return
+            if key in self._cc_down:
+                return  # Still held; fire once per press
+            self._cc_down.add(key)
+            action = self.mapping.get("control_change", {}).get(str(data1))
+        func = self.actions.get(action) if action else None
+        if func is None:
+            self.ignored += 1
+            return
+        if self.record is not None:
+            self.record(ACTION_COMMANDS.get(action, action.upper()).format(*arg))
+        try:
+            func(*arg)
+        except Exception as e:
+            ringlog.error("❌ MIDI action %s failed: %r", action, e)
+            return
+        self.dispatched += 1
+
+    def step(self, timeout=0):
+        """Handle whatever MIDI is ready, waiting up to `timeout` seconds (None: forever)"""
+        for fd, _ in self._epoll.poll(-1 if timeout is None else timeout):
+            port = self._by_fd.get(fd)
+            if port is not None:
+                self._read(port)
+        if time.monotonic() >= self.scan_at:
+            self._scan()
+
+    def run(self):
+        while True:
+            self.step(max(0.0, self.scan_at - time.monotonic()))
+
+    def stats_line(self):
+        ports = ", ".join(f"{p.path} {'open' if p.fd is not None else 'closed'} messages={p.messages}"
+                          for p in self.ports.values()) or "no ports"
+        return f"{ports}; dispatched={self.dispatched} ignored={self.ignored}"
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+OSC control over UDP for lighting desks and DAWs
+
+One datagram is one command; there is no connection to set up, so a cue
+can fire it and forget. Messages (plain or inside #bundle packets):
+
+    /setlist/next [seq]
+    /setlist/prev [seq]
+    /setlist/goto i [seq]      song index from 0 (a float is rounded)
+    /setlist/set s [seq]       named set from setlists/
+    /setlist/state             ask for a /setlist/state reply
+
+Desks that resend a cue to beat packet loss can add a trailing int
+sequence number; a sequence already seen from the same host in the last
+DEDUPE_SECONDS is dropped, so a retransmitted NEXT moves one song, not
+two. Packets are parsed in place in a reused receive buffer with
+struct.unpack_from; only string arguments are copied out.
+
+Replies are /setlist/state i s i (index, title, song count). They go to
+a sender that asks, and, with reply targets (--osc-reply HOST:PORT,
+broadcast addresses allowed), to every target on each song change.
+
+Send one from a shell:
+    python3 osc_input.py 192.168.1.206 goto 3
+    python3 osc_input.py 192.168.1.206 next --seq 17
+"""
+import argparse
+import collections
+import math
+import select
+import socket
+import struct
+import time
+
+import metrics
+import ringlog
+
+OSC_PORT = 6792
+MAX_PACKET = 8192
+DEDUPE_SECONDS = 5.0     # Retransmits arrive within milliseconds; a restarted desk may reuse numbers after this
+DEDUPE_WINDOW = 64       # Sequence numbers remembered per host
+BURST = 64               # Datagrams handled per step before returning to the event loop
+
+_int32 = struct.Struct(">i")
+_int64 = struct.Struct(">q")
+_float32 = struct.Struct(">f")
+
+# Address -> (action, argument type tags it takes)
+ADDRESSES = {
+    b"/setlist/next": ("next", ""),
+    b"/setlist/prev": ("prev", ""),
+    b"/setlist/goto": ("goto", "i"),
+    b"/setlist/set": ("set", "s"),
+    b"/setlist/state": ("state", ""),
+}
+
+# Command text for each action, for the input recording
+ACTION_COMMANDS = {"next": "NEXT", "prev": "PREV", "goto": "GOTO {}", "set": "SET {}"}
+
+osc_packets = metrics.counter("setlist_osc_packets_total", "OSC datagrams received", label="result")
+
+
+class OscError(ValueError):
+    pass
+
+
+def _string_end(buf, offset, end):
+    """Offset past a NUL-terminated, 4-byte padded OSC string"""
+    nul = buf.find(b"\0", offset, end)
+    if nul < 0:
+        raise OscError("unterminated string")
+    return (nul + 4) & ~3
+
+
+def parse_message(buf, offset, end):
+    """(address bytes, [arguments]) of the message in buf[offset:end]"""
+    tags_at = _string_end(buf, offset, end)
+    address = bytes(buf[offset:buf.find(b"\0", offset, end)])
+    if tags_at >= end or buf[tags_at] != ord(","):
+        return address, []   # Old senders leave out the type tags; we take no arguments then
+    pos = _string_end(buf, tags_at, end)
+    args = []
+    for tag in buf[tags_at + 1:buf.find(b"\0", tags_at, end)]:
+        if tag == ord("i"):
+            if pos + 4 > end:
+                raise OscError("truncated int")
+            args.append(_int32.unpack_from(buf, pos)[0])
+            pos += 4
+        elif tag == ord("f"):
+            if pos + 4 > end:
+                raise OscError("truncated float")
+            args.append(_float32.unpack_from(buf, pos)[0])
+            pos += 4
+        elif tag == ord("h"):
+            if pos + 8 > end:
+                raise OscError("truncated int64")
+            args.append(_int64.unpack_from(buf, pos)[0])
+            pos += 8
+        elif tag == ord("s"):
+            next_pos = _string_end(buf, pos, end)
+            args.append(bytes(buf[pos:buf.find(b"\0", pos, end)]).decode("utf-8", "replace"))
+            pos = next_pos
+        elif tag in b"TFN":
+            args.append({ord("T"): True, ord("F"): False, ord("N"): None}[tag])
+        else:
+            raise OscError(f"unsupported type tag {chr(tag)!r}")
+    return address, args
+
+
+def parse_packet(buf, offset, end, out):
+    """Append every message in a packet (bundles flattened, time tags ignored) to out"""
+    if buf.startswith(b"#bundle\0", offset, end):
+        pos = offset + 16   # "#bundle\0" + 8-byte time tag: cues are for now
+        while pos + 4 <= end:
+            (size,) = _int32.unpack_from(buf, pos)
+            pos += 4
+            if size <= 0 or size % 4 or pos + size > end:
+                raise OscError("bad bundle element")
+            parse_packet(buf, pos, pos + size, out)
+            pos += size
+    elif end > offset and buf[offset] == ord("/"):
+        out.append(parse_message(buf, offset, end))
+    else:
+        raise OscError("not an OSC packet")
+    return out
+
+
+def _pad(data):
+    return data + b"\0" * (4 - len(data) % 4)
+
+
+def message(address, *args):
+    """Encode an OSC message; ints, floats and strings"""
+    tags = ","
+    body = b""
+    for arg in args:
+        if isinstance(arg, int):
+            tags += "i"
+            body += _int32.pack(arg)
+        elif isinstance(arg, float):
+            tags += "f"
+            body += _float32.pack(arg)
+        else:
+            tags += "s"
+            body += _pad(str(arg).encode("utf-8"))
+    return _pad(address.encode("ascii")) + _pad(tags.encode("ascii")) + body
+
+
+def parse_target(text):
+    host, _, port = text.rpartition(":")
+    return (host or "255.255.255.255", int(port))
+
+
+class OscServer:
+    """UDP endpoint; a thread with run() or a reactor source
+
+    `actions` maps "next", "prev", "goto" and "set" to callables ("goto"
+    gets the index, "set" the name) and `state()` returns (index, title,
+    count) for replies. `record(text)` sees each command's text first.
+    """
+
+    def __init__(self, actions, state, port=OSC_PORT, host="0.0.0.0", targets=(), record=None):
+        self.actions = actions
+        self.state = state
+        self.targets = list(targets)
+        self.record = record
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self._buf = bytearray(MAX_PACKET)
+        self._seen = {}   # host -> OrderedDict(seq -> monotonic time)
+        self.counts = collections.Counter()
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def next_deadline(self):
+        return None
+
+    def _duplicate(self, host, seq, now):
+        seen = self._seen.setdefault(host, collections.OrderedDict())
+        while seen and (len(seen) >= DEDUPE_WINDOW or next(iter(seen.values())) < now - DEDUPE_SECONDS):
+            seen.popitem(last=False)
+        if seq in seen:
+            return True
+        seen[seq] = now
+        return False
+
+    def handle(self, buf, size, sender):
+        """Run every command in one datagram"""
+        try:
+            messages = parse_packet(buf, 0, size, [])
+        except (OscError, struct.error) as e:
+            self.counts["malformed"] += 1
+            osc_packets.inc("malformed")
+            ringlog.debug("🎚️ Bad OSC packet from %s: %s", sender[0], e)
+            return
+        osc_packets.inc("accepted")
+        now = time.monotonic()
+        for address, args in messages:
+            known = ADDRESSES.get(address)
+            if known is None:
+                self.counts["unknown"] += 1
+                continue
+            action, tags = known
+            if len(args) > len(tags):
+                seq = args[len(tags)]
+                if isinstance(seq, int) and self._duplicate(sender[0], seq, now):
+                    self.counts["duplicate"] += 1
+                    osc_packets.inc("duplicate")
+                    continue
+            if len(args) < len(tags):
+                self.counts["malformed"] += 1
+                continue
+            self._dispatch(action, args[:len(tags)], sender)
+
+    def _dispatch(self, action, args, sender):
+        if action == "state":
+            self.send_state(sender)
+            return
+        if action == "goto":
+            value = args[0]
+            # NaN and inf arrive as float32 too; they cannot be a song index
+            number = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+            args = [int(round(value))] if number else []
+        elif action == "set":
+            args = [str(args[0])]
+        if not args and action in ("goto", "set"):
+            self.counts["malformed"] += 1
+            return
+        if self.record is not None:
+            self.record(ACTION_COMMANDS[action].format(*args))
+        try:
+            result = self.actions[action](*args)
+        except Exception as e:
+            ringlog.error("❌ OSC %s failed: %r", action, e)
+            return
+        if isinstance(result, str) and result.startswith("ERROR"):
+            ringlog.warning("🎚️ OSC %s: %s", action, result)
+        self.counts["dispatched"] += 1
+
+    def send_state(self, to=None):
+        """Send /setlist/state to `to`, or to every reply target"""
+        targets = [to] if to is not None else self.targets
+        if not targets:
+            return
+        packet = message("/setlist/state", *self.state())
+        for target in targets:
+            try:
+                self.sock.sendto(packet, target)
+                self.counts["replies"] += 1
+            except OSError as e:
+                ringlog.debug("🎚️ OSC reply to %s failed: %r", target, e)
+
+    def step(self, timeout=0):
+        """Handle every datagram that is waiting, waiting up to `timeout` seconds (None: forever)"""
+        if timeout != 0 and not select.select([self.sock], [], [], timeout)[0]:
+            return
+        for _ in range(BURST):
+            try:
+                size, sender = self.sock.recvfrom_into(self._buf)
+            except (BlockingIOError, InterruptedError):
+                return
+            self.counts["packets"] += 1
+            self.handle(self._buf, size, sender)
+
+    def run(self):
+        while True:
+            try:
+                self.step(None)
+            except Exception as e:
+                ringlog.error("❌ OSC receive failed: %r", e)
+
+    def stats_line(self):
+        counts = " ".join(f"{k}={self.counts[k]}" for k in
+                          ("packets", "dispatched", "duplicate", "malformed", "unknown", "replies"))
+        targets = ",".join(f"{h}:{p}" for h, p in self.targets) or "none"
+        return f"port {self.sock.getsockname()[1]} {counts} reply targets {targets}"
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Send one OSC command to a setlist panel")
+    parser.add_argument("host")
+    parser.add_argument("action", choices=("next", "prev", "goto", "set", "state"))
+    parser.add_argument("value", nargs="?", help="song index for goto, set name for set")
+    parser.add_argument("--port", type=int, default=OSC_PORT)
+    parser.add_argument("--seq", type=int, help="sequence number for retransmit de-duplication")
+    args = parser.parse_args()
+    values = []
+    if args.action in ("goto", "set"):
+        if args.value is None:
+            parser.error(f"{args.action} needs a value")
+        values.append(int(args.value) if args.action == "goto" else args.value)
+    if args.seq is not None:
+        values.append(args.seq)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.sendto(message(f"/setlist/{args.action}", *values), (args.host, args.port))
+    if args.action == "state":
+        sock.settimeout(1.0)
+        try:
+            data = sock.recv(MAX_PACKET)
+        except socket.timeout:
+            print("no reply")
+            return
+        print(*parse_packet(data, 0, len(data), [])[0][1])
+
+
+if __name__ == "__main__":
+    _main()
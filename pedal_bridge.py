@@ -10,6 +10,14 @@ import socket
 import time
 import os
 
+from evdev_input import set_monotonic_clock
+from pedal_gestures import GestureRecognizer
+
+# Raw key codes: Down arrow = Next, Up arrow = Previous
+KEY_COMMANDS = {108: "NEXT", 103: "PREV"}
+# Plain taps keep the legacy pedal codes the app counts as pedal input
+TAP_CODES = {"NEXT": "40(", "PREV": "38&"}
+
 def send_tcp_command(command):
     """Send command to main app via TCP"""
     try:
@@ -42,27 +50,34 @@ def main():
     print(f"📡 Listening on {input_device}")
     print("🎵 Press pedal buttons to test...")
     
+    def emit(command, gesture):
+        print(f"🎵 {command} ({gesture})")
+        if send_tcp_command(TAP_CODES.get(command, command) if gesture == "tap" else command):
+            print("✅ Command sent")
+    gestures = GestureRecognizer(emit)
+    
     try:
         with open(input_device, 'rb') as f:
+            monotonic = set_monotonic_clock(f.fileno())
             while True:
-                # Check if data is available
-                ready, _, _ = select.select([f], [], [], 0.1)
+                # Wait for data, or for the next long-press / scroll step
+                deadline = gestures.next_deadline()
+                timeout = 0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))
+                ready, _, _ = select.select([f], [], [], timeout)
                 if ready:
                     data = f.read(24)
                     if len(data) == 24:
                         # Unpack input event
                         sec, usec, type_, code, value = struct.unpack('llHHi', data)
-                        if type_ == 1 and value == 1:  # Key press
-                            if code == 108:  # Down arrow - Next
-                                print("🎵 Next song")
-                                if send_tcp_command("40("):
-                                    print("✅ Command sent")
-                            elif code == 103:  # Up arrow - Previous
-                                print("🎵 Previous song") 
-                                if send_tcp_command("38&"):
-                                    print("✅ Command sent")
+                        timestamp = sec + usec / 1e6 if monotonic else time.monotonic()
+                        if type_ == 1 and value == 0:  # Key release
+                            gestures.key_up(code, timestamp)
+                        elif type_ == 1 and value == 1:  # Key press (2 is autorepeat)
+                            if code in KEY_COMMANDS:
+                                gestures.key_down(code, KEY_COMMANDS[code], timestamp)
                             else:
                                 print(f"🎵 Unknown key: {code}")
+                gestures.poll(time.monotonic())
                 
     except KeyboardInterrupt:
         print("\n👋 Pedal bridge stopped")
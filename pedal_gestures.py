@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tap, double-tap, long-press and hold-to-scroll on pedal keys
+
+Driven by key-down / key-up events with their kernel timestamps. A tap acts
+on key-down, before anything is known about what follows, so the common
+NEXT press is as fast as ever; richer gestures correct it afterwards:
+
+    double-tap  the second tap sends the "double" command instead of the tap
+                (right pedal: NEXT, then SKIP 2, so it lands three songs on)
+    long-press  held for LONG_PRESS seconds sends "long" once
+                (left pedal: PREV, then GOTO 0 puts the first song up)
+    hold        held for LONG_PRESS seconds sends "hold" every REPEAT seconds
+                until released (right pedal: scroll through the set)
+
+Gestures are bound to the tap command, so every key mapped to NEXT behaves
+alike. The recognizer does no I/O: feed it key events, and call poll() at
+next_deadline() for long presses and scrolling.
+"""
+import ringlog
+
+DOUBLE_TAP = 0.30     # Seconds from release to the next press that still count as a double-tap
+LONG_PRESS = 0.70     # Seconds held before a long-press or scrolling starts
+REPEAT = 0.25         # Seconds between scroll steps
+
+GESTURES = {
+    "PREV": {"long": "GOTO 0"},
+    "NEXT": {"double": "SKIP 2", "hold": "NEXT"},
+}
+
+
+class _KeyState:
+    __slots__ = ("command", "down", "up_at", "taps", "deadline")
+
+    def __init__(self, command):
+        self.command = command
+        self.down = False
+        self.up_at = None
+        self.taps = 0
+        self.deadline = None
+
+
+class GestureRecognizer:
+    """emit(command, gesture) for each recognized gesture; gesture is tap/double/long/hold"""
+
+    def __init__(self, emit, gestures=GESTURES, double_tap=DOUBLE_TAP, long_press=LONG_PRESS, repeat=REPEAT):
+        self.emit = emit
+        self.gestures = gestures
+        self.double_tap = double_tap
+        self.long_press = long_press
+        self.repeat = repeat
+        self.keys = {}
+        self.counts = {"tap": 0, "double": 0, "long": 0, "hold": 0}
+
+    def _emit(self, command, gesture):
+        self.counts[gesture] += 1
+        try:
+            self.emit(command, gesture)
+        except Exception as e:
+            ringlog.error("❌ Pedal %s %s failed: %r", gesture, command, e)
+
+    def key_down(self, key, command, timestamp):
+        """A key went down at `timestamp` (monotonic seconds); `command` is its tap command"""
+        state = self.keys.get(key)
+        if state is None or state.command != command:
+            state = self.keys[key] = _KeyState(command)
+        if state.down:
+            return  # Missed the release; do not count it twice
+        gestures = self.gestures.get(command, {})
+        if ("double" in gestures and state.taps == 1 and state.up_at is not None
+                and timestamp - state.up_at <= self.double_tap):
+            state.taps = 2
+            self._emit(gestures["double"], "double")
+        else:
+            state.taps = 1
+            self._emit(command, "tap")
+        state.down = True
+        if "long" in gestures or "hold" in gestures:
+            state.deadline = timestamp + self.long_press
+
+    def key_up(self, key, timestamp):
+        state = self.keys.get(key)
+        if state is None or not state.down:
+            return
+        state.down = False
+        state.up_at = timestamp
+        state.deadline = None
+
+    def reset(self):
+        """Forget held keys, e.g. when the device goes away mid-press"""
+        self.keys.clear()
+
+    def next_deadline(self):
+        deadlines = [s.deadline for s in self.keys.values() if s.deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def poll(self, now):
+        """Fire long presses and scroll steps that are due at `now`"""
+        for state in self.keys.values():
+            if state.deadline is None or state.deadline > now:
+                continue
+            state.taps = 0   # A held key does not start a double-tap
+            gestures = self.gestures.get(state.command, {})
+            if "long" in gestures:
+                state.deadline = None
+                self._emit(gestures["long"], "long")
+            else:
+                # Scroll steps keep their schedule, but a late poll does not fire a burst
+                state.deadline += self.repeat
+                if state.deadline <= now:
+                    state.deadline = now + self.repeat
+                self._emit(gestures["hold"], "hold")
+
+    def stats_line(self):
+        return " ".join(f"{gesture}={count}" for gesture, count in self.counts.items())
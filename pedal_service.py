@@ -5,35 +5,15 @@ Sends commands to main application via socket
 """
 
 import evdev
+import select
 import socket
 import time
 import sys
 from threading import Thread
 
-def find_pedal_device():
-    """Find the DBM-20 or other page turner pedal device"""
-    devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
-    
-    # Common page turner device names - DBM-20 shows up as "Bluetooth Music Pedal"
-    pedal_keywords = ['compx', '2.4g', 'dbm', 'donner', 'page turner', 'bluetooth music pedal', 'music pedal', 'receiver']
-    
-    for device in devices:
-        device_name = device.name.lower()
-        for keyword in pedal_keywords:
-            if keyword in device_name:
-                print(f"✅ Found pedal device: {device.name} at {device.path}")
-                return device
-    
-    # If no obvious pedal found, list all keyboard-like devices
-    print("❌ No obvious pedal device found. Available input devices:")
-    for device in devices:
-        capabilities = device.capabilities()
-        # Look for devices that can send keyboard events
-        if evdev.ecodes.EV_KEY in capabilities:
-            print(f"  - {device.name} ({device.path}) - keyboard capable")
-        else:
-            print(f"  - {device.name} ({device.path})")
-    return None
+# Device discovery and key mapping are shared with the in-process reactor input
+from evdev_input import command_for, find_pedal_device, set_monotonic_clock
+from pedal_gestures import GestureRecognizer
 
 def send_command(command):
     """Send command to main application"""
@@ -56,39 +36,39 @@ def pedal_listener():
     
     print(f"🎵 Listening for pedal input on {device.name}...")
     
+    # Taps are sent on key-down; double-tap, long-press and hold follow (pedal_gestures.GESTURES)
+    def emit(command, gesture):
+        send_command(command)
+        print(f"🎵 {command} ({gesture})")
+    gestures = GestureRecognizer(emit)
+    monotonic = set_monotonic_clock(device.fd)
+    
     try:
-        for event in device.read_loop():
-            if event.type == evdev.ecodes.EV_KEY:
+        while True:
+            deadline = gestures.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([device.fd], [], [], timeout)
+            for event in (device.read() if ready else ()):
+                if event.type != evdev.ecodes.EV_KEY:
+                    continue
                 key_event = evdev.categorize(event)
-                if key_event.keystate == evdev.KeyEvent.key_down:
+                timestamp = event.timestamp() if monotonic else time.monotonic()
+                if key_event.keystate == evdev.KeyEvent.key_up:
+                    gestures.key_up(event.code, timestamp)
+                elif key_event.keystate == evdev.KeyEvent.key_down:
                     keycode = key_event.keycode
                     print(f"🔘 Pedal button pressed: {keycode}")
                     
-                    # DBM-20 specific key mappings based on testing:
-                    # Left button sends: ^[[A (Up Arrow) = KEY_UP  
-                    # Right button sends: ^[[B (Down Arrow) = KEY_DOWN
-                    
-                    if keycode == 'KEY_UP':
-                        send_command('PREV')
-                        print(f"⬅️  Previous song (DBM-20 left button: {keycode})")
-                    elif keycode == 'KEY_DOWN':
-                        send_command('NEXT')
-                        print(f"➡️  Next song (DBM-20 right button: {keycode})")
-                    elif keycode in ['KEY_LEFT', 'KEY_RIGHT', 'KEY_PAGEUP', 'KEY_PAGEDOWN']:
-                        # Fallback for other common page turner keys
-                        if keycode in ['KEY_LEFT', 'KEY_PAGEUP']:
-                            send_command('PREV')
-                            print(f"⬅️  Previous song (fallback: {keycode})")
-                        else:
-                            send_command('NEXT')
-                            print(f"➡️  Next song (fallback: {keycode})")
-                    elif keycode in ['KEY_ENTER', 'KEY_ESC', 'KEY_SPACE']:
-                        send_command('LIST')
-                        print(f"📋 Show list (triggered by {keycode})")
+                    # DBM-20: left button KEY_UP = PREV, right button KEY_DOWN = NEXT
+                    # (full mapping in evdev_input.KEY_COMMANDS)
+                    command = command_for(keycode)
+                    if command:
+                        gestures.key_down(event.code, command, timestamp)
                     else:
                         # Log unknown keys to help with mapping
                         print(f"❓ Unknown key {keycode} - ignoring")
-                        print(f"   If this is a pedal button, add it to the mapping above")
+                        print(f"   If this is a pedal button, add it to evdev_input.KEY_COMMANDS")
+            gestures.poll(time.monotonic())
                         
     except KeyboardInterrupt:
         print("👋 Pedal service stopped")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Crash-safe journal of the setlist position
+
+After a reboot mid-set main.py picks up on the song (and chart page) it was
+showing. Every position change is appended to state/position.journal, but
+not written straight away: a writer thread collects the changes and writes
+them in one append and one fdatasync at most every FLUSH_INTERVAL. A burst
+of pedal presses costs one flash write, and the position on disk is never
+more than FLUSH_INTERVAL behind. When the file reaches COMPACT_RECORDS it is
+rewritten with only the most recent KEEP_RECORDS (temp file, fsync, rename).
+
+    header:  "SLPJ" u8 version
+    record:  f64 wall-clock time, u16 song index, u16 page,
+             8-byte setlist hash (display_sync.setlist_hash), u32 CRC32
+
+A record torn by power loss fails its CRC and ends the journal, so the last
+whole record wins. Dump a journal with:
+    python3 position_journal.py state/position.journal
+"""
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import display_sync
+import ringlog
+
+MAGIC = b"SLPJ"
+VERSION = 1
+HEADER = struct.Struct("<4sB")
+BODY = struct.Struct("<dHH8s")
+CRC = struct.Struct("<I")
+RECORD_SIZE = BODY.size + CRC.size
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state", "position.journal")
+FLUSH_INTERVAL = 0.5      # Longest a change waits for the disk; resume is at most this far behind
+COMPACT_RECORDS = 4096    # ~100 KB, then the file is rewritten
+KEEP_RECORDS = 64         # Recent navigation kept through a compaction
+
+
+def pack_record(wall, index, page, set_hash):
+    body = BODY.pack(wall, min(index, 0xFFFF), min(page, 0xFFFF), set_hash)
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def read_journal(path=JOURNAL_PATH):
+    """[(wall, index, page, set_hash)] oldest first; [] if the file is missing or not ours"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    if len(data) < HEADER.size or HEADER.unpack_from(data, 0) != (MAGIC, VERSION):
+        ringlog.warning("📓 %s is not a version %d position journal", path, VERSION)
+        return []
+    records = []
+    for offset in range(HEADER.size, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        body = data[offset:offset + BODY.size]
+        (crc,) = CRC.unpack_from(data, offset + BODY.size)
+        if zlib.crc32(body) != crc:
+            break  # Torn write; anything after it is not trusted
+        records.append(BODY.unpack(body))
+    return records
+
+
+class Journal:
+    """Coalescing writer; note() is cheap and safe to call from any thread"""
+
+    def __init__(self, path=JOURNAL_PATH, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = len(read_journal(path))
+        self.fd = None
+        self._open()
+        self._pending = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._hashed = (None, None)   # (setlist object, its hash): setlists are replaced, never mutated
+        self.writes = 0
+        self.compactions = 0
+        self.thread = threading.Thread(target=self._run, name="position_journal", daemon=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        valid = HEADER.size + self.records * RECORD_SIZE
+        if os.pread(self.fd, HEADER.size, 0) != HEADER.pack(MAGIC, VERSION):
+            os.ftruncate(self.fd, 0)
+            os.write(self.fd, HEADER.pack(MAGIC, VERSION))
+            self.records = 0
+        elif os.fstat(self.fd).st_size != valid:
+            os.ftruncate(self.fd, valid)   # Drop a torn tail so new records follow the last whole one
+
+    def note(self, index, page, setlist):
+        if self._hashed[0] is not setlist:
+            self._hashed = (setlist, display_sync.setlist_hash(setlist))
+        record = pack_record(time.time(), index, page, self._hashed[1])
+        with self._cond:
+            self._pending.append(record)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped and not self._pending:
+                    return
+            # Let the rest of a burst arrive, then write it all at once
+            if not self._stopped:
+                time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._cond:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            if self.records + len(batch) > COMPACT_RECORDS:
+                self._compact(batch)
+            else:
+                os.write(self.fd, b"".join(batch))
+                os.fdatasync(self.fd)
+                self.records += len(batch)
+            self.writes += 1
+        except OSError as e:
+            ringlog.error("❌ Position journal write failed: %r", e)
+
+    def _compact(self, batch):
+        records = [pack_record(*r) for r in read_journal(self.path)] + batch
+        records = records[-KEEP_RECORDS:]
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION) + b"".join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        os.close(self.fd)
+        self.records = len(records)
+        self._open()
+        self.compactions += 1
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        else:
+            self.flush()
+        os.close(self.fd)
+
+    def stats_line(self):
+        return (f"records={self.records} writes={self.writes} compactions={self.compactions} "
+                f"pending={len(self._pending)}")
+
+
+journal = None
+
+
+def recent(count=10, path=JOURNAL_PATH):
+    """The last `count` positions on disk, newest last"""
+    return read_journal(path)[-count:]
+
+
+def start(path=JOURNAL_PATH):
+    global journal
+    journal = Journal(path)
+    journal.start()
+    return journal
+
+
+def note(index, page, setlist):
+    """Journal a position change; a no-op until start()"""
+    if journal is not None:
+        journal.note(index, page, setlist)
+
+
+def stop():
+    global journal
+    if journal is not None:
+        journal.close()
+        journal = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print(__doc__)
+        sys.exit(1)
+    for wall, index, page, set_hash in read_journal(*sys.argv[1:]):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall))}  song {index:3}  page {page:2}  set {set_hash.hex()}")
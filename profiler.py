@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+On-demand statistical profiler for the running display
+
+A sampler thread snapshots the stacks of the render and input threads with
+sys._current_frames() and writes collapsed stacks (for flamegraph.pl or
+speedscope) plus a pstats file when stopped. The sampling interval stretches
+automatically so the sampler never uses more than MAX_OVERHEAD of one core.
+
+    echo "PROFILE START" | nc <pi> 6789
+    echo "PROFILE STOP"  | nc <pi> 6789
+    python3 -m pstats profiles/profile-<stamp>.pstats
+"""
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+SAMPLE_INTERVAL = 0.005   # Target seconds between samples (200 Hz)
+MAX_OVERHEAD = 0.02       # Fraction of one core the sampler may use
+MAX_DEPTH = 64            # Deeper stacks are truncated at the root end
+MAX_DURATION = 600        # Stop automatically after this many seconds
+
+
+class Sampler:
+    """Samples thread stacks until stopped; results stay in memory until written"""
+
+    def __init__(self, thread_names=None, interval=SAMPLE_INTERVAL, max_overhead=MAX_OVERHEAD):
+        self.thread_names = set(thread_names) if thread_names else None
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.stacks = Counter()     # (thread name, frames root->leaf) -> seconds
+        self.hits = Counter()       # Same keys -> number of samples
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self.busy = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _targets(self):
+        me = threading.get_ident()
+        names = {}
+        for thread in threading.enumerate():
+            if thread.ident == me:
+                continue
+            if self.thread_names is None or thread.name in self.thread_names:
+                names[thread.ident] = thread.name
+        return names
+
+    def _sample(self, weight, names):
+        frames = sys._current_frames()
+        for ident, name in names.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+            key = (name, tuple(stack))
+            self.stacks[key] += weight
+            self.hits[key] += 1
+        self.samples += 1
+
+    def _run(self):
+        interval = self.interval
+        names = self._targets()
+        last = time.monotonic()
+        next_refresh = last + 1.0
+        while not self._stop.wait(interval):
+            now = time.monotonic()
+            if now >= next_refresh:
+                names = self._targets()  # Pick up threads started after PROFILE START
+                next_refresh = now + 1.0
+            self._sample(now - last, names)
+            cost = time.monotonic() - now
+            self.busy += cost
+            # Keep cost / (interval + cost) under the overhead budget
+            interval = max(self.interval, cost / self.max_overhead)
+            last = now
+            if now - self.started > MAX_DURATION:
+                break
+        self.elapsed = time.monotonic() - self.started
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def collapsed_lines(self):
+        """Brendan Gregg collapsed format: 'thread;file:func;... <microseconds>'"""
+        for (name, stack), seconds in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+            frames = ";".join(f"{os.path.basename(f)}:{func}" for f, _, func in stack)
+            yield f"{name};{frames} {int(seconds * 1e6)}"
+
+    def pstats_dict(self):
+        """Sampled times in the structure pstats.Stats loads from a marshal file"""
+        stats = {}
+
+        def entry(func):
+            if func not in stats:
+                stats[func] = [0, 0, 0.0, 0.0, {}]
+            return stats[func]
+
+        for key, seconds in self.stacks.items():
+            stack = key[1]
+            hits = self.hits[key]
+            if not stack:
+                continue
+            leaf = entry(stack[-1])
+            leaf[2] += seconds
+            seen = set()
+            for i, func in enumerate(stack):
+                e = entry(func)
+                if func not in seen:
+                    # Count each function once per sample so recursion is not double counted
+                    seen.add(func)
+                    e[0] += hits
+                    e[1] += hits
+                    e[3] += seconds
+                if i:
+                    caller = stack[i - 1]
+                    nc, cc, tt, ct = e[4].get(caller, (0, 0, 0.0, 0.0))
+                    self_time = seconds if i == len(stack) - 1 else 0.0
+                    e[4][caller] = (nc + hits, cc + hits, tt + self_time, ct + seconds)
+        return {func: (cc, nc, tt, ct, callers) for func, (cc, nc, tt, ct, callers) in stats.items()}
+
+    def write(self, directory=PROFILE_DIR):
+        """Write <stamp>.collapsed and <stamp>.pstats; returns both paths"""
+        os.makedirs(directory, exist_ok=True)
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+        base = os.path.join(directory, f"profile-{stamp}")
+        n = 1
+        while os.path.exists(base + ".pstats"):   # Two stops in the same millisecond
+            n += 1
+            base = os.path.join(directory, f"profile-{stamp}-{n}")
+        collapsed_path = base + ".collapsed"
+        pstats_path = base + ".pstats"
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for line in self.collapsed_lines():
+                f.write(line + "\n")
+        with open(pstats_path, "wb") as f:
+            marshal.dump(self.pstats_dict(), f)
+        return collapsed_path, pstats_path
+
+    def summary(self):
+        overhead = self.busy / self.elapsed * 100 if self.elapsed else 0.0
+        return f"{self.samples} samples over {self.elapsed:.1f}s, sampler overhead {overhead:.2f}%"
+
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def start(thread_names=None):
+    """Start profiling unless already running; returns a status line"""
+    global _active
+    with _active_lock:
+        if _active is not None and _active.running:
+            return "profiler already running"
+        _active = Sampler(thread_names).start()
+    who = ", ".join(sorted(thread_names)) if thread_names else "all threads"
+    return f"profiling {who}"
+
+
+def stop(directory=PROFILE_DIR):
+    """Stop profiling and write the results; returns a status line"""
+    global _active
+    with _active_lock:
+        sampler, _active = _active, None
+    if sampler is None:
+        return "profiler not running"
+    sampler.stop()
+    try:
+        collapsed_path, pstats_path = sampler.write(directory)
+    except OSError as e:
+        # Read-only root or a full card: keep the samples for another PROFILE STOP
+        with _active_lock:
+            if _active is None:
+                _active = sampler
+        return f"ERROR could not write {directory}: {e.strerror or e}; PROFILE STOP retries"
+    return f"{sampler.summary()}; wrote {collapsed_path} {pstats_path}"
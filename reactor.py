@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Single-threaded event loop for every input and the render timer
+
+One thread waits in epoll on the command server's sockets, the serial and
+GPIO event fds, the pedal's evdev fd and a wakeup pipe, and runs timers for
+rendering, retries and long presses. Every command runs on that thread, so
+it is the only owner of the app state: no lock contention and no thread
+hand-offs between an input arriving and the frame that shows it.
+
+Input subsystems plug in as sources: objects with fileno() (may change or
+be None while a device is away), next_deadline() (monotonic time or None)
+and step(0), which handles whatever is ready without blocking. Threads that
+remain (panel sync, metrics) hand work over with call_soon_threadsafe().
+Time spent per source is tracked; REACTOR shows it.
+"""
+import heapq
+import itertools
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+import ringlog
+import setlist_upload
+
+MAX_COMMAND = 256
+
+
+class Timer:
+    __slots__ = ("when", "seq", "callback", "args", "cancelled")
+
+    def __init__(self, when, seq, callback, args):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+class _SourceStats:
+    __slots__ = ("calls", "busy", "worst")
+
+    def __init__(self):
+        self.calls = 0
+        self.busy = 0.0
+        self.worst = 0.0
+
+
+class Reactor:
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self._timers = []
+        self._seq = itertools.count()
+        self._ready = deque()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, (self._drain_wakeups, None, "wakeup"))
+        self._sources = {}        # source -> (registered fd, timer, label)
+        self.stats = {}
+        self.thread_id = None
+        self._stopped = False
+
+    # fds ------------------------------------------------------------------
+
+    def _update(self, fd, reader, writer, label):
+        events = (selectors.EVENT_READ if reader else 0) | (selectors.EVENT_WRITE if writer else 0)
+        try:
+            key = self.selector.get_key(fd)
+        except KeyError:
+            key = None
+        if not events:
+            if key is not None:
+                self.selector.unregister(fd)
+        elif key is None:
+            self.selector.register(fd, events, (reader, writer, label))
+        else:
+            self.selector.modify(fd, events, (reader, writer, label))
+
+    def add_reader(self, fd, callback, label="io"):
+        writer = self._callbacks(fd)[1]
+        self._update(fd, callback, writer, label)
+
+    def remove_reader(self, fd):
+        _, writer, label = self._callbacks(fd)
+        self._update(fd, None, writer, label)
+
+    def add_writer(self, fd, callback, label="io"):
+        reader = self._callbacks(fd)[0]
+        self._update(fd, reader, callback, label)
+
+    def remove_writer(self, fd):
+        reader, _, label = self._callbacks(fd)
+        self._update(fd, reader, None, label)
+
+    def _callbacks(self, fd):
+        try:
+            return self.selector.get_key(fd).data
+        except (KeyError, ValueError):
+            return None, None, "io"
+
+    # timers ---------------------------------------------------------------
+
+    def call_at(self, when, callback, *args):
+        timer = Timer(when, next(self._seq), callback, args)
+        heapq.heappush(self._timers, timer)
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancelled = True
+
+    def call_soon_threadsafe(self, callback, *args):
+        """Run `callback` on the reactor thread; callable from any thread"""
+        self._ready.append((callback, args))
+        if threading.get_ident() != self.thread_id:
+            self.wakeup()
+
+    def wakeup(self):
+        try:
+            os.write(self._wake_w, b"w")
+        except BlockingIOError:
+            pass  # Already pending
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    # sources --------------------------------------------------------------
+
+    def attach(self, source, label):
+        """Drive a pollable input subsystem (see module docstring)"""
+        self._sources[source] = (None, None, label)
+        self._sync_source(source)
+
+    def _step_source(self, source):
+        if source not in self._sources:
+            return
+        try:
+            source.step(0)
+        except Exception as e:
+            ringlog.error("❌ %s failed: %r", self._sources[source][2], e)
+        self._sync_source(source)
+
+    def _sync_source(self, source):
+        fd, timer, label = self._sources[source]
+        new_fd = source.fileno()
+        if new_fd != fd:
+            if fd is not None:
+                try:
+                    self.remove_reader(fd)
+                except (OSError, ValueError):
+                    pass
+            if new_fd is not None:
+                self.add_reader(new_fd, lambda: self._step_source(source), label)
+        self.cancel(timer)
+        deadline = source.next_deadline()
+        timer = self.call_at(deadline, self._step_source, source) if deadline is not None else None
+        self._sources[source] = (new_fd, timer, label)
+
+    # loop -----------------------------------------------------------------
+
+    def _run(self, label, callback, *args):
+        started = time.perf_counter()
+        try:
+            callback(*args)
+        except Exception as e:
+            ringlog.error("❌ %s callback failed: %r", label, e)
+        spent = time.perf_counter() - started
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = _SourceStats()
+        stats.calls += 1
+        stats.busy += spent
+        stats.worst = max(stats.worst, spent)
+
+    def run(self):
+        self.thread_id = threading.get_ident()
+        timers = self._timers
+        while not self._stopped:
+            while timers and timers[0].cancelled:
+                heapq.heappop(timers)
+            if self._ready:
+                timeout = 0
+            elif timers:
+                timeout = max(0.0, timers[0].when - time.monotonic())
+            else:
+                timeout = None
+            for key, events in self.selector.select(timeout):
+                reader, writer, label = key.data
+                if events & selectors.EVENT_READ and reader:
+                    self._run(label, reader)
+                if events & selectors.EVENT_WRITE and writer:
+                    self._run(label, writer)
+            while self._ready:
+                callback, args = self._ready.popleft()
+                self._run(getattr(callback, "__name__", "call"), callback, *args)
+            now = time.monotonic()
+            while timers and (timers[0].cancelled or timers[0].when <= now):
+                timer = heapq.heappop(timers)
+                if not timer.cancelled:
+                    self._run(getattr(timer.callback, "__name__", "timer"), timer.callback, *timer.args)
+
+    def stop(self):
+        self._stopped = True
+        self.wakeup()
+
+    def stats_line(self):
+        parts = []
+        for label, s in sorted(self.stats.items()):
+            avg = s.busy / s.calls if s.calls else 0.0
+            parts.append(f"{label}: calls={s.calls} avg={avg * 1e6:.0f}us worst={s.worst * 1e6:.0f}us")
+        return "; ".join(parts) or "idle"
+
+
+class CommandServer:
+    """The port 6789 protocol on the reactor: one command per connection, then a reply
+
+    Like the threaded server, the command is whatever the first read brings
+    (clients send one line, with or without a newline). With `new_upload`
+    (returns a setlist_upload.UploadSession) an UPLOAD stream is received
+    here, committed to disk on a helper thread and handed to
+    install_upload(setlist), whose return value is the reply. With
+    `subscribe`, a SUBSCRIBE connection is handed to it and left open.
+    """
+
+    def __init__(self, reactor, handle, port=6789, host="0.0.0.0", new_upload=None, install_upload=None,
+                 subscribe=None):
+        self.reactor = reactor
+        self.handle = handle
+        self.subscribe = subscribe
+        self.new_upload = new_upload
+        self.install_upload = install_upload
+        self._uploads = {}        # conn -> (session, timeout timer) while an upload is arriving
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(64)
+        self.sock.setblocking(False)
+        reactor.add_reader(self.sock.fileno(), self._accept, "tcp")
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                ringlog.warning("🌐 accept failed: %r", e)
+                return
+            conn.setblocking(False)
+            self.reactor.add_reader(conn.fileno(), lambda c=conn: self._read(c), "tcp")
+
+    def _close(self, conn):
+        fd = conn.fileno()
+        if fd >= 0:
+            self.reactor.remove_reader(fd)
+            self.reactor.remove_writer(fd)
+        conn.close()
+
+    def _read(self, conn):
+        try:
+            data = conn.recv(MAX_COMMAND)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(conn)
+            return
+        upload = setlist_upload.upload_data(data) if self.new_upload is not None else None
+        if upload is not None:
+            session = self.new_upload()
+            timer = self.reactor.call_later(setlist_upload.RECEIVE_TIMEOUT, self._upload_timeout, conn)
+            self._uploads[conn] = (session, timer)
+            self._upload(conn, session, upload)
+            return
+        line = data.decode("utf-8", "replace").strip()
+        if not line:
+            self._close(conn)
+            return
+        if self.subscribe is not None and line.upper() == "SUBSCRIBE":
+            self.reactor.remove_reader(conn.fileno())
+            self.subscribe(conn)
+            return
+        try:
+            reply = self.handle(line)
+        except Exception as e:
+            ringlog.error("❌ Command %r failed: %r", line, e)
+            reply = f"ERROR {e!r}"
+        self._reply(conn, reply)
+
+    def _reply(self, conn, reply):
+        self.reactor.remove_reader(conn.fileno())
+        self._send(conn, memoryview((reply or "OK").encode() + b"\n"))
+
+    def _upload(self, conn, session, data):
+        try:
+            done = session.feed(data)
+        except setlist_upload.UploadError as e:
+            ringlog.warning("📋 Upload rejected: %s", e)
+            self._forget_upload(conn)
+            self._reply(conn, f"ERROR {e}")
+            return
+        if not done:
+            self.reactor.add_reader(conn.fileno(), lambda: self._upload_read(conn, session), "upload")
+            return
+        self.reactor.remove_reader(conn.fileno())
+        self._forget_upload(conn)
+        # fsync can stall for a long time on an SD card; keep it off the loop
+        threading.Thread(target=self._commit, args=(conn, session), name="setlist_upload", daemon=True).start()
+
+    def _upload_read(self, conn, session):
+        try:
+            data = conn.recv(setlist_upload.MAX_CHUNK)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            session.abort()
+            self._forget_upload(conn)
+            self._close(conn)
+            return
+        self._upload(conn, session, data)
+
+    def _forget_upload(self, conn):
+        _, timer = self._uploads.pop(conn, (None, None))
+        self.reactor.cancel(timer)
+
+    def _upload_timeout(self, conn):
+        session, _ = self._uploads.pop(conn, (None, None))
+        if session is not None:
+            ringlog.warning("📋 Upload timed out")
+            session.abort()
+            self._close(conn)
+
+    def _commit(self, conn, session):
+        try:
+            result = session.commit()
+        except setlist_upload.UploadError as e:
+            result = e
+        self.reactor.call_soon_threadsafe(self._committed, conn, result)
+
+    def _committed(self, conn, result):
+        if isinstance(result, Exception):
+            ringlog.warning("📋 Upload rejected: %s", result)
+            self._reply(conn, f"ERROR {result}")
+        else:
+            self._reply(conn, self.install_upload(result))
+
+    def _send(self, conn, pending):
+        try:
+            sent = conn.send(pending)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(conn)
+            return
+        pending = pending[sent:]
+        if pending:
+            self.reactor.add_writer(conn.fileno(), lambda: self._send(conn, pending), "tcp")
+        else:
+            self._close(conn)
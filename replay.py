@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Replay an input recording against a headless display
+
+Feeds every recorded command back into handle_command, with the original
+timing (optionally sped up) or as fast as possible, while the render loop
+draws into memory. Prints each song change as it happens, so "it skipped
+two songs" can be watched step by step, and ends with command latency and
+render stats so real gig traces double as benchmarks.
+
+    python3 replay.py recordings/input-20250101-200000-000.slrec
+    python3 replay.py --speed 4 recordings/input-...slrec
+    python3 replay.py --fast --quiet recordings/input-...slrec
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("SETLIST_HEADLESS", "1")
+
+import input_recorder
+import main as app
+import metrics
+import ringlog
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def replay(path, fast=False, speed=1.0, quiet=False):
+    wall, started_ns, events = input_recorder.read_log(path)
+    commands = [e for e in events if e[1] != "state"]
+    print(f"🎙️  {path}: {len(commands)} commands recorded "
+          f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(wall))}")
+
+    # The position journal is never started here (and the journal is not resumed
+    # from), so replayed moves cannot become where the next real start resumes
+    app.load_setlist()
+    app.setup_pages()
+    threading.Thread(target=app.render_loop, name="render", daemon=True).start()
+    app.state_listeners.append(
+        lambda i, s: quiet or print(f"   → song {i}: {s[i].get('title', '')}"))
+
+    latencies = []
+    first_ns = events[0][0] if events else started_ns
+    began = time.monotonic()
+    for ts, source, payload in events:
+        if not fast:
+            due = began + (ts - first_ns) / 1e9 / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        text = payload.decode("utf-8", "replace")
+        if source == "state":
+            state = json.loads(text)
+            app.apply_synced_state(state["setlist"], state["idx"], 0.0)
+            if not quiet:
+                print(f"{(ts - started_ns) / 1e9:9.3f}s  state    idx={state['idx']}")
+            continue
+        if not quiet:
+            print(f"{(ts - started_ns) / 1e9:9.3f}s  {source:8} {text!r}")
+        t0 = time.perf_counter()
+        app.handle_command(text, source="tcp" if source == "evdev" else source)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.monotonic() - began
+    time.sleep(0.1)  # Let the render loop draw the last change
+
+    song = app.setlist[app.idx] if app.setlist else {}
+    print(f"🏁 Ended on song {app.idx}: {song.get('title', '')}")
+    rate = len(latencies) / elapsed if elapsed else 0.0
+    print(f"📊 {len(latencies)} commands in {elapsed:.3f}s ({rate:.0f}/s), "
+          f"handle p50={_percentile(latencies, 50) * 1e6:.0f}us "
+          f"p99={_percentile(latencies, 99) * 1e6:.0f}us max={max(latencies, default=0) * 1e6:.0f}us")
+    print(f"📊 {metrics.stats_line()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an input recording headlessly")
+    parser.add_argument("log", help="recording written by main.py (recordings/*.slrec)")
+    parser.add_argument("--fast", action="store_true", help="ignore recorded timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale for real-time replay")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+    ringlog.start(open(os.devnull, "w") if args.quiet else sys.stdout)
+    try:
+        replay(args.log, fast=args.fast, speed=args.speed, quiet=args.quiet)
+    finally:
+        ringlog.stop()
+
+
+if __name__ == "__main__":
+    main()
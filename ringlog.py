@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Non-blocking logging for the frame and input paths
+
+Logging a line only appends a tuple to an in-memory ring; formatting and the
+write to stdout happen in a background flusher that rate-limits each level, so
+journald and the SD card never see per-frame traffic. The most recent lines
+stay in the ring and can be dumped on demand with the LOG command.
+"""
+import itertools
+import sys
+import threading
+import time
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", ERROR: "ERROR"}
+
+RING_SIZE = 2048          # Records kept in memory for LOG dumps
+FLUSH_INTERVAL = 0.25     # Seconds between background writes
+# Lines per second each level may write to stdout; None means unlimited
+RATE_LIMITS = {DEBUG: 2, INFO: 20, WARNING: 50, ERROR: None}
+
+# deque.append and next(count) are atomic under the GIL, so writers never lock
+_ring = deque(maxlen=RING_SIZE)
+_seq = itertools.count(1)
+_flusher = None
+
+
+def log(level, msg, *args):
+    """Record a line; `msg % args` is only formatted when it is written out"""
+    _ring.append((next(_seq), time.time(), level, msg, args))
+
+
+def debug(msg, *args):
+    log(DEBUG, msg, *args)
+
+
+def info(msg, *args):
+    log(INFO, msg, *args)
+
+
+def warning(msg, *args):
+    log(WARNING, msg, *args)
+
+
+def error(msg, *args):
+    log(ERROR, msg, *args)
+
+
+def format_record(record):
+    seq, stamp, level, msg, args = record
+    if args:
+        try:
+            msg = msg % args
+        except (TypeError, ValueError):
+            msg = f"{msg} {args!r}"
+    clock = time.strftime("%H:%M:%S", time.localtime(stamp))
+    return f"{clock}.{int(stamp * 1000) % 1000:03d} {LEVEL_NAMES.get(level, level)} {msg}"
+
+
+def recent(count=50, min_level=DEBUG):
+    """Formatted lines for the newest `count` (at least 1) records at or above `min_level`"""
+    records = [r for r in list(_ring) if r[2] >= min_level]
+    return [format_record(r) for r in records[-max(1, count):]]
+
+
+def pending():
+    """Records appended since the last flush"""
+    if _flusher is None or not _ring:
+        return 0
+    return max(0, _ring[-1][0] - _flusher.last_seq)
+
+
+class Flusher:
+    """Writes new ring records to a stream, rate-limited per level"""
+
+    def __init__(self, stream=None, interval=FLUSH_INTERVAL, rate_limits=None):
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.rate_limits = RATE_LIMITS if rate_limits is None else rate_limits
+        self.last_seq = 0
+        self.dropped = 0
+        self.suppressed = {}
+        self._tokens = {}
+        self._last_refill = time.monotonic()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()  # Only the flusher and stop() contend
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        for level, rate in self.rate_limits.items():
+            if rate is not None:
+                self._tokens[level] = min(rate, self._tokens.get(level, rate) + rate * elapsed)
+
+    def _allow(self, level):
+        if self.rate_limits.get(level) is None:
+            return True
+        tokens = self._tokens.get(level, 0)
+        if tokens < 1:
+            self.suppressed[level] = self.suppressed.get(level, 0) + 1
+            return False
+        self._tokens[level] = tokens - 1
+        return True
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        self._refill()
+        snapshot = list(_ring)
+        lines = []
+        if snapshot and snapshot[0][0] > self.last_seq + 1 and self.last_seq:
+            self.dropped += snapshot[0][0] - self.last_seq - 1
+            lines.append(f"... {snapshot[0][0] - self.last_seq - 1} log lines overwritten before flush")
+        for record in snapshot:
+            if record[0] <= self.last_seq:
+                continue
+            if self._allow(record[2]):
+                lines.append(format_record(record))
+        if snapshot:
+            self.last_seq = max(self.last_seq, snapshot[-1][0])
+        for level, count in self.suppressed.items():
+            if count:
+                lines.append(f"... {count} {LEVEL_NAMES.get(level, level)} lines rate-limited (see LOG)")
+        self.suppressed.clear()
+        if lines:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        self._stop.set()
+
+
+def start(stream=None):
+    """Start the background flusher once; later calls return the same one"""
+    global _flusher
+    if _flusher is None:
+        _flusher = Flusher(stream)
+        threading.Thread(target=_flusher.run, name="log_flusher", daemon=True).start()
+    return _flusher
+
+
+def stop():
+    """Write out whatever is still pending, e.g. on shutdown"""
+    if _flusher is not None:
+        _flusher.stop()
+        _flusher.flush()
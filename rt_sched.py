@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Per-thread CPU affinity and scheduling policy, plus a wake-up jitter probe
+
+rgbmatrix pins its refresh thread to the last core of a multi-core Pi; the
+panel is steadiest when nothing else runs there. sched.json (next to
+main.py) says where each named app thread may run and how it is scheduled:
+
+    {
+      "render":          {"cpus": [2], "policy": "fifo", "priority": 10},
+      "tcp_server":      {"cpus": [0, 1], "nice": 5},
+      "serial_listener": {"cpus": [0, 1]},
+      "*":               {"cpus": [0, 1, 2]}
+    }
+
+"render" is the render loop, "*" any thread without its own entry. Policies:
+other, batch, idle, fifo, rr (fifo/rr need a priority and CAP_SYS_NICE or
+root). Settings are applied per thread by kernel thread id.
+
+The probe sleeps to absolute deadlines and measures how late it wakes up.
+The SCHED PROBE command runs a sweep on its own thread, since it takes
+seconds per setting; SCHED RESULT shows the last one. From a shell:
+    python3 rt_sched.py probe --cpus 2 --policy fifo --priority 10
+    python3 rt_sched.py sweep                # every setting in sched.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import ringlog
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sched.json")
+PROBE_INTERVAL = 0.001
+PROBE_SECONDS = 2.0
+
+POLICIES = {
+    "other": getattr(os, "SCHED_OTHER", 0),
+    "batch": getattr(os, "SCHED_BATCH", 3),
+    "idle": getattr(os, "SCHED_IDLE", 5),
+    "fifo": getattr(os, "SCHED_FIFO", 1),
+    "rr": getattr(os, "SCHED_RR", 2),
+}
+_policy_names = {v: k for k, v in POLICIES.items()}
+
+config = {}
+last_sweep = None          # Text of the last finished background sweep
+_sweep_running = False
+_sweep_lock = threading.Lock()
+
+
+def load_config(path=CONFIG_PATH):
+    """Read sched.json; a missing file means leave everything to the kernel"""
+    global config
+    if not os.path.exists(path):
+        config = {}
+        return config
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        ringlog.error("❌ Could not read %s: %r", path, e)
+        config = {}
+    return config
+
+
+def setting_for(name):
+    return config.get(name, config.get("*"))
+
+
+def apply(tid, setting, name=""):
+    """Apply one setting to a kernel thread id; returns a list of problems"""
+    problems = []
+    if not setting:
+        return problems
+    cpus = setting.get("cpus")
+    if cpus:
+        try:
+            os.sched_setaffinity(tid, set(cpus))
+        except OSError as e:
+            problems.append(f"affinity {cpus}: {e.strerror}")
+        except (TypeError, ValueError):
+            problems.append(f"affinity {cpus!r}: expected a list of CPU numbers")
+    policy = setting.get("policy")
+    if policy:
+        try:
+            priority = int(setting.get("priority", 0)) if policy in ("fifo", "rr") else 0
+            os.sched_setscheduler(tid, POLICIES[policy], os.sched_param(priority))
+        except (KeyError, TypeError):
+            problems.append(f"unknown policy {policy!r}")
+        except ValueError:
+            problems.append(f"priority {setting.get('priority')!r}: expected a number")
+        except OSError as e:
+            problems.append(f"policy {policy}: {e.strerror}")
+    if "nice" in setting:
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, int(setting["nice"]))
+        except OSError as e:
+            problems.append(f"nice {setting['nice']}: {e.strerror}")
+        except (TypeError, ValueError):
+            problems.append(f"nice {setting['nice']!r}: expected a number")
+    for problem in problems:
+        ringlog.warning("⚙️  %s (%d): %s", name or "thread", tid, problem)
+    return problems
+
+
+def apply_current(name):
+    """Apply the setting for `name` to the calling thread"""
+    return apply(threading.get_native_id(), setting_for(name), name)
+
+
+def apply_threads():
+    """Apply settings to every running Python thread by name"""
+    for thread in threading.enumerate():
+        if thread.native_id is None or thread is threading.main_thread():
+            continue  # The main thread is the render loop; it applies "render" itself
+        apply(thread.native_id, setting_for(thread.name), thread.name)
+
+
+def describe():
+    """One line per thread: cpus, policy and priority as the kernel has them"""
+    lines = []
+    for thread in threading.enumerate():
+        tid = thread.native_id
+        if tid is None:
+            continue
+        try:
+            cpus = ",".join(str(c) for c in sorted(os.sched_getaffinity(tid)))
+            policy = _policy_names.get(os.sched_getscheduler(tid), "?")
+            priority = os.sched_getparam(tid).sched_priority
+            nice = os.getpriority(os.PRIO_PROCESS, tid)
+        except OSError:
+            continue
+        lines.append(f"{thread.name} tid={tid} cpus={cpus} policy={policy} prio={priority} nice={nice}")
+    return "\n".join(lines)
+
+
+def probe(setting=None, seconds=PROBE_SECONDS, interval=PROBE_INTERVAL):
+    """Wake-up lateness (seconds, sorted) of a thread running under `setting`"""
+    result = {}
+
+    def run():
+        result["problems"] = apply(threading.get_native_id(), setting, "jitter_probe")
+        lateness = []
+        deadline = time.monotonic() + interval
+        end = deadline + seconds
+        while deadline < end:
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lateness.append(time.monotonic() - deadline)
+            deadline += interval   # Absolute schedule: one late wake-up does not shift the rest
+        result["lateness"] = sorted(lateness)
+
+    thread = threading.Thread(target=run, name="jitter_probe")
+    thread.start()
+    thread.join()
+    return result["lateness"], result["problems"]
+
+
+def summarize(label, lateness, problems=()):
+    def pct(p):
+        return lateness[min(len(lateness) - 1, int(len(lateness) * p / 100))] * 1e6 if lateness else 0.0
+    text = (f"{label}: n={len(lateness)} p50={pct(50):.0f}us p99={pct(99):.0f}us "
+            f"p99.9={pct(99.9):.0f}us max={pct(100):.0f}us")
+    if problems:
+        text += " (" + "; ".join(problems) + ")"
+    return text
+
+
+def _distinct_settings():
+    seen = []
+    for name, setting in config.items():
+        if setting not in seen:
+            seen.append(setting)
+            yield name, setting
+
+
+def sweep(seconds=PROBE_SECONDS):
+    """Probe the kernel default and each distinct setting in the config"""
+    lines = [summarize("default", *probe(None, seconds))]
+    for name, setting in _distinct_settings():
+        lines.append(summarize(f"{name} {json.dumps(setting, sort_keys=True)}", *probe(setting, seconds)))
+    return "\n".join(lines)
+
+
+def start_sweep(seconds=PROBE_SECONDS):
+    """Run sweep() on its own thread; returns its expected length in seconds, or None if one is running"""
+    global _sweep_running
+    with _sweep_lock:
+        if _sweep_running:
+            return None
+        _sweep_running = True
+    threading.Thread(target=_run_sweep, args=(seconds,), name="sched_probe", daemon=True).start()
+    return seconds * (1 + len(list(_distinct_settings())))
+
+
+def _run_sweep(seconds):
+    global last_sweep, _sweep_running
+    try:
+        text = sweep(seconds)
+    except Exception as e:
+        text = f"ERROR probe failed: {e!r}"
+    for line in text.splitlines():
+        ringlog.info("⚙️  %s", line)
+    with _sweep_lock:
+        last_sweep = text
+        _sweep_running = False
+
+
+def sweep_result():
+    """Reply to SCHED RESULT"""
+    with _sweep_lock:
+        if _sweep_running:
+            return "probe running"
+        return last_sweep or "no probe run yet (SCHED PROBE [seconds])"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thread scheduling settings and wake-up jitter probe")
+    parser.add_argument("mode", choices=("probe", "sweep"))
+    parser.add_argument("--cpus", help="comma-separated CPU list, e.g. 2 or 0,1")
+    parser.add_argument("--policy", choices=sorted(POLICIES))
+    parser.add_argument("--priority", type=int, default=0)
+    parser.add_argument("--nice", type=int)
+    parser.add_argument("--seconds", type=float, default=PROBE_SECONDS)
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args()
+    ringlog.start()
+    try:
+        if args.mode == "sweep":
+            load_config(args.config)
+            print(sweep(args.seconds))
+            return
+        setting = {}
+        if args.cpus:
+            setting["cpus"] = [int(c) for c in args.cpus.split(",")]
+        if args.policy:
+            setting["policy"] = args.policy
+            setting["priority"] = args.priority
+        if args.nice is not None:
+            setting["nice"] = args.nice
+        print(summarize(json.dumps(setting, sort_keys=True) if setting else "default",
+                        *probe(setting or None, args.seconds)))
+    finally:
+        ringlog.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Event-driven serial command input
+
+Waits on every open USB serial adapter with epoll (no polling timeout),
+splits each read into newline/CR framed commands and dispatches them in order.
+Adapters are found by glob pattern and re-opened when the kernel announces a
+hotplug over the netlink uevent socket; a port that errors out is closed and
+retried with backoff instead of being given up on.
+
+Without hardware, try it against a pseudo-terminal stand-in:
+    python3 serial_input.py --pty
+"""
+import errno
+import glob
+import os
+import select
+import socket
+import sys
+import termios
+import threading
+import time
+
+import metrics
+import ringlog
+
+DEFAULT_PATTERNS = ("/dev/ttyUSB*", "/dev/ttyACM*")
+DEFAULT_BAUD = 115200
+MAX_FRAME = 256            # Longer lines are dropped and counted as errors
+READ_SIZE = 4096
+RETRY_DELAYS = (0.2, 0.5, 1.0, 2.0, 5.0)   # Backoff after a port fails to open
+RESCAN_INTERVAL = 2.0      # Only used when hotplug events are unavailable
+NETLINK_KOBJECT_UEVENT = 15
+
+serial_bytes = metrics.counter("setlist_serial_bytes_total", "Bytes read from serial ports", label="port")
+serial_errors = metrics.counter("setlist_serial_errors_total", "Serial read, open and framing errors", label="port")
+
+
+def configure_tty(fd, baud):
+    """Raw 8N1 at `baud`, non-canonical so reads return whatever has arrived"""
+    speed = getattr(termios, f"B{baud}")
+    iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(fd)
+    iflag = 0
+    oflag = 0
+    lflag = 0
+    cflag = (cflag & ~(termios.CSIZE | termios.PARENB | termios.CSTOPB)) | termios.CS8 | termios.CREAD | termios.CLOCAL
+    cc[termios.VMIN] = 1
+    cc[termios.VTIME] = 0
+    termios.tcsetattr(fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc])
+
+
+class SerialPort:
+    """One serial device: its fd, partial frame and counters"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        self.buf = bytearray()
+        self.discarding = False
+        self.bytes_in = 0
+        self.bytes_since_open = 0   # For the rate: bytes_in spans every reconnect
+        self.commands = 0
+        self.errors = 0
+        self.opens = 0
+        self.opened_at = None
+        self.failures = 0
+        self.retry_at = None
+
+    def open(self, baud):
+        fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            configure_tty(fd, baud)
+        except (termios.error, AttributeError):
+            pass  # Not every tty-like device accepts settings; read it anyway
+        self.fd = fd
+        self.buf.clear()
+        self.discarding = False
+        self.opens += 1
+        self.bytes_since_open = 0
+        self.opened_at = time.monotonic()
+        self.failures = 0
+        self.retry_at = None
+
+    def close(self):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+    def frames(self, data):
+        """Append `data` and return every complete command in it"""
+        self.bytes_in += len(data)
+        self.bytes_since_open += len(data)
+        self.buf += data
+        out = []
+        start = 0
+        buf = self.buf
+        for end in range(len(buf)):
+            if buf[end] not in (10, 13):
+                continue
+            if self.discarding:
+                self.discarding = False
+            elif end > start:
+                line = bytes(buf[start:end]).decode("utf-8", "replace").strip()
+                if line:
+                    out.append(line)
+            start = end + 1
+        del buf[:start]
+        if len(buf) > MAX_FRAME:
+            # No terminator in sight: drop it and the rest of this line
+            buf.clear()
+            self.discarding = True
+            self.errors += 1
+            serial_errors.inc(self.path)
+        self.commands += len(out)
+        return out
+
+    def stats(self):
+        up = time.monotonic() - self.opened_at if self.fd is not None and self.opened_at else 0.0
+        rate = self.bytes_since_open / up if up else 0.0
+        state = "open" if self.fd is not None else "closed"
+        return (f"{self.path} {state} bytes={self.bytes_in} ({rate:.1f}B/s) "
+                f"commands={self.commands} errors={self.errors} reconnects={max(0, self.opens - 1)}")
+
+
+class SerialInput:
+    """Reads commands from all matching serial ports on one thread
+
+    `on_command(line, path)` is called for each framed command, in arrival
+    order; several commands arriving in one read are dispatched back to back.
+    """
+
+    def __init__(self, on_command, patterns=DEFAULT_PATTERNS, baud=DEFAULT_BAUD):
+        self.on_command = on_command
+        self.patterns = list(patterns)
+        self.baud = baud
+        self.ports = {}        # path -> SerialPort
+        self._by_fd = {}       # fd -> SerialPort
+        self._lock = threading.Lock()
+        self._epoll = select.epoll()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._epoll.register(self._wake_r, select.EPOLLIN)
+        self._uevents = self._open_uevents()
+        self._rescan_pending = True
+        self._stopped = False
+
+    def _open_uevents(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))  # Multicast group 1: kernel uevents
+            sock.setblocking(False)
+        except (OSError, AttributeError) as e:
+            ringlog.warning("📡 No hotplug events (%s); rescanning serial ports every %.0fs", e, RESCAN_INTERVAL)
+            return None
+        self._epoll.register(sock.fileno(), select.EPOLLIN)
+        return sock
+
+    def add_pattern(self, pattern):
+        """Watch another path or glob, e.g. a pty stand-in; thread-safe"""
+        with self._lock:
+            self.patterns.append(pattern)
+        self.rescan()
+
+    def rescan(self):
+        """Ask the input thread to look for new ports; thread-safe"""
+        self._rescan_pending = True
+        try:
+            os.write(self._wake_w, b"r")
+        except OSError:
+            pass
+
+    def stop(self):
+        self._stopped = True
+        self.rescan()
+
+    def _scan(self):
+        self._rescan_pending = False
+        with self._lock:
+            patterns = list(self.patterns)
+        now = time.monotonic()
+        for pattern in patterns:
+            for path in sorted(glob.glob(pattern)):
+                port = self.ports.get(path)
+                if port is None:
+                    port = self.ports[path] = SerialPort(path)
+                if port.fd is None:
+                    # Hotplug means "try now", even if a backoff was pending
+                    port.retry_at = now
+        self._open_due(now)
+
+    def _open_due(self, now):
+        for port in self.ports.values():
+            if port.fd is not None or port.retry_at is None or port.retry_at > now:
+                continue
+            try:
+                port.open(self.baud)
+            except OSError as e:
+                port.failures += 1
+                if e.errno == errno.ENOENT:
+                    port.retry_at = None  # Unplugged: wait for the next hotplug event
+                else:
+                    # Typically EACCES while udev is still applying permissions
+                    delay = RETRY_DELAYS[min(port.failures, len(RETRY_DELAYS)) - 1]
+                    port.retry_at = now + delay
+                port.errors += 1
+                serial_errors.inc(port.path)
+                continue
+            self._by_fd[port.fd] = port
+            self._epoll.register(port.fd, select.EPOLLIN | select.EPOLLERR | select.EPOLLHUP)
+            if port.opens > 1:
+                metrics.reconnects.inc("serial")
+            ringlog.info("📻 Serial listener on %s", port.path)
+
+    def _drop(self, port, reason):
+        ringlog.warning("📻 Serial port %s closed: %s", port.path, reason)
+        self._by_fd.pop(port.fd, None)
+        try:
+            self._epoll.unregister(port.fd)
+        except (OSError, ValueError):
+            pass
+        port.close()
+        port.errors += 1
+        serial_errors.inc(port.path)
+        port.retry_at = time.monotonic() + RETRY_DELAYS[0]
+
+    def _read(self, port):
+        try:
+            data = os.read(port.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._drop(port, e)
+            return
+        if not data:
+            self._drop(port, "end of file")
+            return
+        serial_bytes.inc(port.path, len(data))
+        for line in port.frames(data):
+            try:
+                self.on_command(line, port.path)
+            except Exception as e:
+                ringlog.error("❌ Serial command %r failed: %r", line, e)
+
+    def _handle_uevents(self):
+        while True:
+            try:
+                msg = self._uevents.recv(8192)
+            except BlockingIOError:
+                return
+            except OSError:
+                return
+            if b"SUBSYSTEM=tty" in msg and (msg.startswith(b"add@") or msg.startswith(b"bind@")):
+                self._rescan_pending = True
+
+    def _timeout(self):
+        """Seconds until the next retry, or -1 to wait for events only"""
+        deadlines = [p.retry_at for p in self.ports.values() if p.fd is None and p.retry_at is not None]
+        if self._uevents is None:
+            deadlines.append(time.monotonic() + RESCAN_INTERVAL)
+        if not deadlines:
+            return -1
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def fileno(self):
+        """The epoll fd: readable whenever a port, hotplug event or wakeup is pending"""
+        return self._epoll.fileno()
+
+    def next_deadline(self):
+        """Monotonic time of the next retry or rescan, or None"""
+        timeout = self._timeout()
+        return None if timeout < 0 else time.monotonic() + timeout
+
+    def step(self, timeout=0):
+        """One pass: (re)open due ports, then handle whatever is ready within `timeout`"""
+        if self._rescan_pending or self._uevents is None:
+            self._scan()
+        else:
+            self._open_due(time.monotonic())
+        for fd, events in self._epoll.poll(timeout):
+            if fd == self._wake_r:
+                try:
+                    os.read(self._wake_r, 64)
+                except BlockingIOError:
+                    pass
+            elif self._uevents is not None and fd == self._uevents.fileno():
+                self._handle_uevents()
+            else:
+                port = self._by_fd.get(fd)
+                if port is None:
+                    continue
+                if events & select.EPOLLIN:
+                    self._read(port)
+                elif events & (select.EPOLLERR | select.EPOLLHUP):
+                    self._drop(port, "hangup")
+        if self._rescan_pending:
+            self._scan()
+
+    def run(self):
+        while not self._stopped:
+            self.step(self._timeout())
+        for port in self.ports.values():
+            port.close()
+
+    def stats_line(self):
+        ports = list(self.ports.values())
+        if not ports:
+            return "no serial ports found"
+        return "; ".join(p.stats() for p in ports)
+
+
+class PtyDevice:
+    """Pseudo-terminal standing in for a USB serial adapter
+
+    SerialInput opens `path` like a real device; bytes written here arrive on
+    it. Closing the device looks like an unplug to the reader.
+    """
+
+    def __init__(self, link=None):
+        self.master, slave = os.openpty()
+        self.slave_path = os.ttyname(slave)
+        os.close(slave)
+        self.path = self.slave_path
+        if link:
+            if os.path.lexists(link):
+                os.unlink(link)
+            os.symlink(self.slave_path, link)
+            self.path = link
+
+    def write(self, data):
+        os.write(self.master, data)
+
+    def close(self):
+        os.close(self.master)
+        if self.path != self.slave_path and os.path.lexists(self.path):
+            os.unlink(self.path)
+
+
+def _demo():
+    ringlog.start()
+    received = []
+    reader = SerialInput(lambda line, path: received.append(line) or print(f"📻 {path}: {line}"), patterns=())
+    threading.Thread(target=reader.run, name="serial_listener", daemon=True).start()
+
+    link = "/tmp/ttySETLIST0"
+    device = PtyDevice(link)
+    reader.add_pattern(link)
+    time.sleep(0.2)
+    device.write(b"NEXT\n")
+    device.write(b"PREV\r\nGOTO 3\nNE")   # Two commands and a partial one in one write
+    time.sleep(0.1)
+    device.write(b"XT\n")
+    time.sleep(0.2)
+
+    print("🔌 Unplugging and replugging the stand-in device")
+    device.close()
+    time.sleep(0.3)
+    device = PtyDevice(link)
+    reader.rescan()
+    time.sleep(0.5)
+    device.write(b"GOTO 1\n")
+    time.sleep(0.2)
+    print(f"📊 {reader.stats_line()}")
+    device.close()
+    reader.stop()
+    return received
+
+
+if __name__ == "__main__":
+    if "--pty" in sys.argv:
+        _demo()
+    else:
+        print(__doc__)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Paged setlist queries for controller apps
+
+    LIST [start [count]] [version]
+
+replies with one line of JSON for songs start .. start+count-1:
+
+    {"version":"5f0c9e1a2b3c4d5e","total":9,"start":0,"songs":[{"title":...},...]}
+
+`version` is the setlist hash (display_sync.setlist_hash, also in the
+SUBSCRIBE events), so it works as an ETag: a client that passes the version
+it already holds gets `NOT MODIFIED <version>` instead of the songs. A reply
+is serialized once per setlist version and range and kept in a small LRU;
+a new setlist makes the old replies unreachable and they are cleared.
+"""
+import collections
+import json
+import threading
+
+import display_sync
+
+DEFAULT_COUNT = 100
+MAX_COUNT = 500          # Songs per reply; a 10k-song library is browsed a page at a time
+CACHE_REPLIES = 64
+VERSION_LENGTH = 16      # Hex digits in a version
+
+
+class SetlistQuery:
+    def __init__(self, cache_replies=CACHE_REPLIES):
+        self.cache_replies = cache_replies
+        self._lock = threading.Lock()
+        self._hashed = (None, None)   # (setlist object, version): setlists are replaced, never mutated
+        self._replies = collections.OrderedDict()   # (start, count) -> reply for the current version
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def version(self, setlist):
+        with self._lock:
+            if self._hashed[0] is not setlist:
+                self._hashed = (setlist, display_sync.setlist_hash(setlist).hex())
+                self._replies.clear()
+            return self._hashed[1]
+
+    def reply(self, setlist, args):
+        """The reply to LIST with `args` (the words after LIST)"""
+        words = list(args)
+        numbers = []
+        while words and len(numbers) < 2 and words[0].isdigit() and len(words[0]) < VERSION_LENGTH:
+            numbers.append(int(words.pop(0)))
+        if len(words) > 1 or (words and len(words[0]) != VERSION_LENGTH):
+            return "ERROR usage: LIST [start [count]] [version]"
+        start = numbers[0] if numbers else 0
+        count = min(numbers[1], MAX_COUNT) if len(numbers) > 1 else DEFAULT_COUNT
+        version = self.version(setlist)
+        if words and words[0].lower() == version:
+            self.not_modified += 1
+            return f"NOT MODIFIED {version}"
+        key = (start, count)
+        with self._lock:
+            if self._hashed[0] is setlist and key in self._replies:
+                self._replies.move_to_end(key)
+                self.hits += 1
+                return self._replies[key]
+        text = json.dumps({"version": version, "total": len(setlist), "start": start,
+                           "songs": setlist[start:start + count]}, separators=(",", ":"))
+        with self._lock:
+            self.misses += 1
+            if self._hashed[0] is setlist:
+                self._replies[key] = text
+                while len(self._replies) > self.cache_replies:
+                    self._replies.popitem(last=False)
+        return text
+
+    def stats_line(self):
+        return (f"version={self._hashed[1]} cached={len(self._replies)} hits={self.hits} "
+                f"misses={self.misses} not_modified={self.not_modified}")
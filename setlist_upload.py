@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Streaming setlist upload over the command connection
+
+A client opens the usual command connection to port 6789 and sends
+
+    UPLOAD\n
+    u32 big-endian length, that many bytes of setlist JSON   (repeated)
+    u32 0                                                    (end of upload)
+
+and gets back "OK <n> songs" or "ERROR <reason>". The bytes are checked as
+they arrive (size limit, UTF-8, JSON structure: one top-level array) and
+written to a temporary file next to setlist.json, so a bad upload is turned
+away at the first bad chunk. Once the last chunk is in, the whole setlist is
+checked (every song an object with a title), fsynced once and renamed over
+setlist.json; the running app then swaps it in.
+
+UploadSession does no socket I/O itself, so the threaded server and the
+event loop (reactor.py) share it. Send a setlist from another machine with:
+    python3 setlist_upload.py new_setlist.json --host 192.168.1.206
+"""
+import argparse
+import codecs
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+
+COMMAND = b"UPLOAD"
+CHUNK_HEADER = struct.Struct(">I")
+CHUNK_BYTES = 16 * 1024       # What the client sends per chunk
+MAX_CHUNK = 64 * 1024
+MAX_UPLOAD = 1024 * 1024
+MAX_DEPTH = 8                 # A setlist is an array of flat song objects; leave room for lists in songs
+RECEIVE_TIMEOUT = 10.0
+
+
+def upload_data(data):
+    """The bytes after the command word if `data` starts an upload, else None
+
+    The word must stand alone: "UPLOADS" or "uploaded" are ordinary commands.
+    """
+    head = data[:len(COMMAND)]
+    if head.upper() != COMMAND or data[len(COMMAND):len(COMMAND) + 1] not in (b"", b" ", b"\r", b"\n"):
+        return None
+    return data[len(COMMAND):]
+
+
+class UploadError(ValueError):
+    pass
+
+
+class _JsonShape:
+    """Incremental check of JSON structure: one top-level array, balanced, bounded depth
+
+    Only tracks strings and brackets; full parsing happens once at the end.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.closed = False
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text):
+        for ch in text:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                elif ch < " ":
+                    raise UploadError("control character in a string")
+                continue
+            if ch in " \t\r\n":
+                continue
+            if self.closed:
+                raise UploadError("data after the end of the setlist")
+            if not self.started:
+                if ch != "[":
+                    raise UploadError("setlist must be a JSON array")
+                self.started = True
+            if ch in "[{":
+                self.depth += 1
+                if self.depth > MAX_DEPTH:
+                    raise UploadError("setlist nested too deeply")
+            elif ch in "]}":
+                self.depth -= 1
+                if self.depth < 0:
+                    raise UploadError("unbalanced brackets")
+                if self.depth == 0:
+                    self.closed = True
+            elif ch == '"':
+                self.in_string = True
+
+    def finish(self):
+        if not self.closed or self.in_string:
+            raise UploadError("setlist is incomplete")
+
+
+def validate_setlist(setlist):
+    """Raise UploadError unless this looks like a setlist main.py can show"""
+    if not isinstance(setlist, list) or not setlist:
+        raise UploadError("setlist must be a non-empty array")
+    for n, song in enumerate(setlist):
+        if not isinstance(song, dict):
+            raise UploadError(f"song {n} is not an object")
+        if not isinstance(song.get("title"), str) or not song["title"].strip():
+            raise UploadError(f"song {n} has no title")
+        content = song.get("content")
+        if content is not None and (not isinstance(content, str) or os.path.isabs(content)
+                                    or ".." in content.replace("\\", "/").split("/")):
+            raise UploadError(f"song {n} content must be a path inside the setlist directory")
+
+
+class UploadSession:
+    """One upload in progress: feed() received bytes, then commit()"""
+
+    def __init__(self, path, max_bytes=MAX_UPLOAD):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.done = False
+        self._buffer = b""
+        self._started = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._shape = _JsonShape()
+        fd, self.temp_path = tempfile.mkstemp(prefix=".setlist-", suffix=".tmp",
+                                              dir=os.path.dirname(os.path.abspath(path)))
+        os.fchmod(fd, 0o644)      # mkstemp makes it private; setlist.json is not
+        self._file = os.fdopen(fd, "wb")
+
+    def feed(self, data):
+        """Take bytes from the connection (after "UPLOAD"); True once the end-of-upload chunk is in
+
+        Raises UploadError (and removes the temporary file) on bad data.
+        """
+        try:
+            self._buffer += data
+            if not self._started:
+                # Rest of the command line; no valid chunk length starts with a space, CR or LF
+                self._buffer = self._buffer.lstrip(b" \r\n")
+                self._started = bool(self._buffer)
+            while not self.done and len(self._buffer) >= CHUNK_HEADER.size:
+                (length,) = CHUNK_HEADER.unpack_from(self._buffer)
+                if length > MAX_CHUNK:
+                    raise UploadError(f"chunk of {length} bytes is too large")
+                if length == 0:
+                    self.done = True
+                    self._buffer = self._buffer[CHUNK_HEADER.size:]
+                    break
+                if len(self._buffer) < CHUNK_HEADER.size + length:
+                    break
+                chunk = self._buffer[CHUNK_HEADER.size:CHUNK_HEADER.size + length]
+                self._buffer = self._buffer[CHUNK_HEADER.size + length:]
+                self._accept(chunk)
+            if self.done and self._buffer:
+                raise UploadError("data after the end of the upload")
+            return self.done
+        except (UploadError, UnicodeDecodeError, OSError) as e:
+            self.abort()
+            raise UploadError(str(e)) from e
+
+    def _accept(self, chunk):
+        self.received += len(chunk)
+        if self.received > self.max_bytes:
+            raise UploadError(f"setlist larger than {self.max_bytes} bytes")
+        self._shape.feed(self._decoder.decode(chunk))
+        self._file.write(chunk)
+
+    def commit(self):
+        """Check the whole setlist, fsync and rename it into place; returns the setlist
+
+        Blocks on the disk: call it off the render thread and event loop.
+        """
+        try:
+            if not self.done:
+                raise UploadError("upload not finished")
+            self._decoder.decode(b"", final=True)
+            self._shape.finish()
+            self._file.flush()
+            with open(self.temp_path, "r", encoding="utf-8") as f:
+                setlist = json.load(f)
+            validate_setlist(setlist)
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.temp_path, self.path)
+            return setlist
+        except (UploadError, UnicodeDecodeError, ValueError, OSError) as e:
+            self.abort()
+            raise UploadError(str(e)) from e
+
+    def abort(self):
+        """Drop the upload and its temporary file; safe to call twice"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def receive(conn, session, initial=b"", timeout=RECEIVE_TIMEOUT):
+    """Blocking receive of a whole upload on a connected socket; returns the setlist"""
+    conn.settimeout(timeout)
+    data = initial
+    try:
+        while not session.feed(data):
+            data = conn.recv(MAX_CHUNK)
+            if not data:
+                raise UploadError("connection closed mid-upload")
+    except (UploadError, OSError) as e:
+        session.abort()
+        raise UploadError(str(e)) from e
+    return session.commit()
+
+
+def encode(data, chunk_bytes=CHUNK_BYTES):
+    """The full upload stream for `data` (bytes), command line included"""
+    parts = [COMMAND + b"\n"]
+    for start in range(0, len(data), chunk_bytes):
+        chunk = data[start:start + chunk_bytes]
+        parts.append(CHUNK_HEADER.pack(len(chunk)) + chunk)
+    parts.append(CHUNK_HEADER.pack(0))
+    return b"".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a new setlist to a running setlist app")
+    parser.add_argument("path", help="setlist JSON file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6789)
+    parser.add_argument("--chunk", type=int, default=CHUNK_BYTES, help="bytes per chunk")
+    args = parser.parse_args()
+    with open(args.path, "rb") as f:
+        data = f.read()
+    with socket.create_connection((args.host, args.port), timeout=RECEIVE_TIMEOUT) as conn:
+        conn.sendall(encode(data, min(args.chunk, MAX_CHUNK)))
+        reply = conn.makefile("r", encoding="utf-8").readline().strip()
+    print(reply)
+    sys.exit(0 if reply.startswith("OK") else 1)
+
+
+if __name__ == "__main__":
+    main()
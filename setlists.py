@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Named setlists for different venues and sets
+
+Every setlists/<name>.json next to main.py is a setlist in the same format
+as setlist.json. All of them are read and checked at startup, and the most
+recently used stay parsed in an LRU bounded by their file sizes (cache_bytes,
+a share of SETLIST_CACHE_KB), so `SET <name>` to a recent set does not read
+or parse the file again; it only lists the directory and stats the file,
+and a file edited since it was read is read again. Names are the file names
+without .json, matched case-insensitively; "default" is taken by setlist.json.
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import display_sync
+import ringlog
+from setlist_upload import UploadError, validate_setlist
+
+SETLISTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "setlists")
+
+_name_re = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+CACHE_BYTES = 256 * 1024   # File bytes of parsed setlists kept; a few KB each, a 10k-song library ~1 MB
+
+cache_bytes = CACHE_BYTES
+_loaded = OrderedDict()    # lowercase name -> (mtime_ns, file size, setlist), least recently used first
+_loaded_bytes = 0
+_lock = threading.Lock()
+
+
+def names(directory=SETLISTS_DIR):
+    """Setlist names in the directory, sorted"""
+    try:
+        files = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted((f[:-5] for f in files if f.endswith(".json") and _name_re.match(f[:-5])), key=str.lower)
+
+
+def _path_for(name, directory):
+    if not _name_re.match(name):
+        raise ValueError(f"bad setlist name {name!r}")
+    for candidate in names(directory):
+        if candidate.lower() == name.lower():
+            return candidate, os.path.join(directory, candidate + ".json")
+    raise ValueError(f"no setlist named {name!r}")
+
+
+def load(name, directory=SETLISTS_DIR):
+    """(canonical name, setlist); raises ValueError for a missing or invalid set"""
+    name, path = _path_for(name, directory)
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        raise ValueError(f"{name}: {e.strerror}") from e
+    with _lock:
+        cached = _loaded.get(name.lower())
+        if cached and cached[0] == st.st_mtime_ns:
+            _loaded.move_to_end(name.lower())
+            return name, cached[2]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            setlist = json.load(f)
+        validate_setlist(setlist)
+    except (OSError, ValueError, UploadError) as e:
+        raise ValueError(f"{name}: {e}") from e
+    _remember(name.lower(), st.st_mtime_ns, st.st_size, setlist)
+    return name, setlist
+
+
+def _remember(key, mtime, size, setlist):
+    global _loaded_bytes
+    with _lock:
+        old = _loaded.pop(key, None)
+        if old is not None:
+            _loaded_bytes -= old[1]
+        _loaded[key] = (mtime, size, setlist)
+        _loaded_bytes += size
+        _evict()
+
+
+def _evict():
+    """Drop least recently used sets over the budget; the newest always stays"""
+    global _loaded_bytes
+    while _loaded_bytes > cache_bytes and len(_loaded) > 1:
+        _, (_, size, _) = _loaded.popitem(last=False)
+        _loaded_bytes -= size
+
+
+def set_budget(nbytes):
+    global cache_bytes
+    with _lock:
+        cache_bytes = nbytes
+        _evict()
+
+
+def stats():
+    with _lock:
+        return f"setlists cached={len(_loaded)} ({_loaded_bytes // 1024}/{cache_bytes // 1024} KB)"
+
+
+def preload(directory=SETLISTS_DIR):
+    """Read and check every setlist now; returns how many are usable"""
+    count = 0
+    for name in names(directory):
+        try:
+            load(name, directory)
+            count += 1
+        except ValueError as e:
+            ringlog.warning("❌ Setlist %s", e)
+    return count
+
+
+def find(set_hash, directory=SETLISTS_DIR):
+    """(name, setlist) of the set with this display_sync.setlist_hash, or None"""
+    for name in names(directory):
+        try:
+            name, setlist = load(name, directory)
+        except ValueError:
+            continue
+        if display_sync.setlist_hash(setlist) == set_hash:
+            return name, setlist
+    return None
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Display state shared between the input process and the render process
+
+With `main.py --split-io` the TCP, serial, GPIO, keyboard and sync inputs
+run in a forked child so their bursts cannot take the GIL or CPU away from
+drawing. The child owns the setlist position and publishes it into a small
+shared-memory block; the render process sleeps on a wakeup fd (eventfd,
+or a pipe where that is missing) and reads the block when it fires.
+
+Block layout, written by one process and read by the other under a seqlock
+(the sequence number is odd while a write is in progress):
+    u64 seq, i32 song index, i32 page, u64 setlist version,
+    f64 song change time and f64 set start time (CLOCK_MONOTONIC, valid in
+    both processes), u32 setlist length, then the setlist as JSON
+
+The render process writes its frame counters the other way, into a second
+seqlocked block at the end (u64 seq, u64 frames, u64 elided, f64 fps,
+f64 frame p50, f64 frame p99), so STATS answered by the input process
+shows the frames actually drawn.
+
+The input process refuses a setlist that does not fit (fits()) rather than
+show positions in a list the render process never got. A reader gives up
+after READ_TIMEOUT if the sequence stays odd, i.e. the writer died mid-write.
+"""
+import json
+import mmap
+import os
+import struct
+import time
+
+import ringlog
+
+HEADER = struct.Struct("<QiiQddI")
+# Room for the setlist JSON: a 10k-song library is about 1 MB. Anonymous shared
+# pages only take memory once written, so unused room costs nothing.
+SETLIST_BYTES = 8 * 1024 * 1024
+READ_TIMEOUT = 0.1            # Seconds a reader retries an odd (mid-write) sequence
+RENDER = struct.Struct("<QQQddd")
+_SEQ = struct.Struct("<Q")
+
+
+class SharedState:
+    """Create before forking; the child publishes, the parent follows"""
+
+    def __init__(self, setlist_bytes=SETLIST_BYTES):
+        self.buf = mmap.mmap(-1, HEADER.size + setlist_bytes + RENDER.size)   # MAP_SHARED | MAP_ANONYMOUS
+        self.capacity = setlist_bytes
+        self._render_at = HEADER.size + setlist_bytes
+        self._render_seq = 0
+        if hasattr(os, "eventfd"):
+            self.wake_r = self.wake_w = os.eventfd(0)
+        else:
+            self.wake_r, self.wake_w = os.pipe()
+        self.version = 0          # Writer side: last setlist version published
+        self.seq = 0
+        self._setlist_len = 0
+        self._seen_version = None  # Reader side: setlist version already applied
+
+    @staticmethod
+    def _encode(setlist):
+        return json.dumps(setlist, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def fits(self, setlist):
+        """Whether `setlist` can be published; check before switching to it"""
+        return len(self._encode(setlist)) <= self.capacity
+
+    def publish(self, index, page, changed_at, set_started_at, setlist=None):
+        """Write a new state; pass `setlist` only when it changed"""
+        data = None
+        if setlist is not None:
+            data = self._encode(setlist)
+            if len(data) > self.capacity:
+                ringlog.error("❌ Setlist too large to share (%d bytes); render process keeps the old one", len(data))
+                data = None
+        buf = self.buf
+        _SEQ.pack_into(buf, 0, self.seq + 1)
+        if data is not None:
+            self.version += 1
+            self._setlist_len = len(data)
+            buf[HEADER.size:HEADER.size + len(data)] = data
+        HEADER.pack_into(buf, 0, self.seq + 1, index, page, self.version, changed_at, set_started_at,
+                         self._setlist_len)
+        self.seq += 2
+        _SEQ.pack_into(buf, 0, self.seq)
+        if self.wake_r == self.wake_w:
+            os.eventfd_write(self.wake_w, 1)
+        else:
+            os.write(self.wake_w, b"s")
+
+    def read(self, want_setlist_after=None):
+        """(seq, index, page, version, changed_at, set_started_at, setlist JSON bytes or None)
+
+        The setlist bytes are only copied when its version differs from
+        `want_setlist_after`. None if no consistent state could be read.
+        """
+        buf = self.buf
+        give_up = time.monotonic() + READ_TIMEOUT
+        while time.monotonic() < give_up:
+            seq, index, page, version, changed_at, set_started_at, length = HEADER.unpack_from(buf, 0)
+            if seq & 1:
+                continue  # Writer is mid-update
+            data = bytes(buf[HEADER.size:HEADER.size + length]) if version != want_setlist_after else None
+            if _SEQ.unpack_from(buf, 0)[0] == seq:
+                return seq, index, page, version, changed_at, set_started_at, data
+        return None
+
+    def publish_render(self, frames, elided, fps, p50, p99):
+        """Render side: share the frame counters with the input process"""
+        at = self._render_at
+        _SEQ.pack_into(self.buf, at, self._render_seq + 1)
+        RENDER.pack_into(self.buf, at, self._render_seq + 1, frames, elided, fps, p50, p99)
+        self._render_seq += 2
+        _SEQ.pack_into(self.buf, at, self._render_seq)
+
+    def read_render(self):
+        """Input side: (frames, elided, fps, p50, p99) as last shared, or None before the first frame"""
+        at = self._render_at
+        give_up = time.monotonic() + READ_TIMEOUT
+        while time.monotonic() < give_up:
+            seq, frames, elided, fps, p50, p99 = RENDER.unpack_from(self.buf, at)
+            if seq & 1:
+                continue
+            if _SEQ.unpack_from(self.buf, at)[0] == seq:
+                return (frames, elided, fps, p50, p99) if seq else None
+        return None
+
+    def wait(self):
+        """Block until the writer has published something"""
+        if self.wake_r == self.wake_w:
+            os.eventfd_read(self.wake_r)
+        else:
+            os.read(self.wake_r, 4096)
+
+    def receive(self, apply_state):
+        """Render side: wait for a wakeup, then apply_state(setlist or None, index, page, changed_at, set_started_at)
+
+        Returns at once when called because the wakeup fd is readable, e.g.
+        from an event loop.
+        """
+        self.wait()
+        state = self.read(self._seen_version)
+        if state is None:
+            ringlog.error("❌ Shared state stuck mid-write; input process gone?")
+            return
+        seq, index, page, new_version, changed_at, set_started_at, data = state
+        new_setlist = None
+        if data is not None:
+            try:
+                new_setlist = json.loads(data)
+            except ValueError as e:
+                ringlog.error("❌ Bad shared setlist: %r", e)
+            self._seen_version = new_version
+        try:
+            apply_state(new_setlist, index, page, changed_at, set_started_at)
+        except Exception as e:
+            ringlog.error("❌ Applying shared state failed: %r", e)
+
+    def follow(self, apply_state):
+        """Render side thread: apply every published change"""
+        while True:
+            self.receive(apply_state)
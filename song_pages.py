@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Chord chart / lyric pages for the current song
+
+A song may point at a ChordPro file with a "content" field (relative to the
+setlist), or have one at songs/<slugified title>.cho. Content is only read
+for the current song and its neighbours; their pages are laid out to the
+panel's text grid and rasterized in the background into an LRU of
+ready-to-show images bounded in bytes, so a page turn is a cache lookup and
+memory does not grow with the size of the song library. The cache is keyed
+by file, not by setlist: after switching sets (SET), pages of a set played
+earlier in the night are still warm until the budget pushes them out.
+
+Supported ChordPro: [Chord] markers in lyrics, {comment:}/{c:}, {new_page}/{np},
+"#" comment lines; other directives are ignored.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+import ringlog
+
+PAGE_CACHE_BYTES = 1024 * 1024  # Rasterized pages kept: ~170 at 64x32 (6 KB each)
+CONTENT_DIR = "songs"
+CONTENT_EXTENSIONS = (".cho", ".chopro", ".crd", ".txt")
+
+CHORD = "chord"
+LYRIC = "lyric"
+COMMENT = "comment"
+
+_chord_re = re.compile(r"\[([^\]]*)\]")
+_directive_re = re.compile(r"^\{\s*([A-Za-z_]+)\s*(?::\s*(.*?))?\s*\}$")
+
+
+def slugify(title):
+    return re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")
+
+
+def parse_chordpro(text):
+    """Rows of (kind, text) with chords lifted onto their own row; None marks a page break"""
+    rows = []
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if line.startswith("#"):
+            continue
+        directive = _directive_re.match(line.strip())
+        if directive:
+            name, value = directive.group(1).lower(), directive.group(2) or ""
+            if name in ("comment", "c", "comment_italic", "ci", "comment_box", "cb"):
+                rows.append((COMMENT, value))
+            elif name in ("new_page", "np", "new_physical_page", "npp"):
+                rows.append(None)
+            continue
+        if not _chord_re.search(line):
+            rows.append((LYRIC, line))
+            continue
+        chords = []
+        lyric = []
+        for i, part in enumerate(_chord_re.split(line)):
+            if i % 2:
+                # Keep at least one space between neighbouring chords
+                col = max(len("".join(lyric)), len(chords[-1][1]) + chords[-1][0] + 1 if chords else 0)
+                chords.append((col, part))
+            else:
+                lyric.append(part)
+        chord_row = ""
+        for col, name in chords:
+            chord_row = chord_row.ljust(col) + name
+        rows.append((CHORD, chord_row))
+        lyric_text = "".join(lyric)
+        if lyric_text.strip():
+            rows.append((LYRIC, lyric_text))
+    return rows
+
+
+def _segments(text, cols):
+    """(start, end) slices of at most `cols` characters, broken at spaces where possible"""
+    segments = []
+    start = 0
+    while len(text) - start > cols:
+        end = text.rfind(" ", start + 1, start + cols + 1)
+        if end <= start:
+            end = start + cols
+        segments.append((start, end))
+        start = end
+        while start < len(text) and text[start] == " ":
+            start += 1
+    segments.append((start, len(text)))
+    return segments
+
+
+def layout_pages(rows, cols, rows_per_page):
+    """Wrap rows to `cols` characters and split them into pages"""
+    pages = [[]]
+
+    def place(group):
+        page = pages[-1]
+        if len(page) + len(group) > rows_per_page and page:
+            pages.append([])
+            page = pages[-1]
+        for row in group:
+            if len(page) == rows_per_page:
+                pages.append([])
+                page = pages[-1]
+            page.append(row)
+
+    i = 0
+    while i < len(rows):
+        row = rows[i]
+        if row is None:
+            if pages[-1]:
+                pages.append([])
+            i += 1
+            continue
+        kind, text = row
+        if kind == LYRIC and not text.strip():
+            # Blank line: a gap, but never at the top of a page
+            if pages[-1]:
+                place([row])
+            i += 1
+            continue
+        nxt = rows[i + 1] if i + 1 < len(rows) else None
+        lyric = nxt if kind == CHORD and nxt and nxt[0] == LYRIC and nxt[1].strip() else None
+        # Break where the lyric has spaces; chords stay above the lyric slice they belong to
+        guide = lyric[1].ljust(len(text)) if lyric else text
+        for start, end in _segments(guide, cols):
+            group = []
+            if text[start:end].strip():
+                group.append((kind, text[start:end][:cols]))
+            if lyric:
+                group.append((LYRIC, lyric[1][start:end]))
+            if group:
+                place(group)
+        i += 2 if lyric else 1
+    while pages and not pages[-1]:
+        pages.pop()
+    return pages
+
+
+class SongPages:
+    """Lazily loaded, pre-rendered content pages for the songs around the current one"""
+
+    def __init__(self, base_dir, font, width, height, colors, cache_bytes=PAGE_CACHE_BYTES):
+        self.base_dir = base_dir
+        self.font = font
+        self.width = width
+        self.height = height
+        self.colors = colors        # {CHORD: rgb, LYRIC: rgb, COMMENT: rgb}
+        self.cols = max(1, width // max(1, font.default_advance))
+        self.line_height = max(1, font.height)
+        self.rows_per_page = max(1, height // self.line_height)
+        self.cache_bytes = cache_bytes
+        self.page_bytes = width * height * 3
+        self.cached_bytes = 0
+        self.evictions = 0
+        self._layouts = {}           # path -> (mtime, pages); only the focus window
+        self._cache = OrderedDict()  # (path, mtime, page) -> Image
+        self._lock = threading.Lock()
+        self._focus = []
+        self._wake = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    def content_path(self, song):
+        name = song.get("content")
+        if name:
+            # Setlists arrive over the network (UPLOAD, followers): never read outside base_dir
+            base = os.path.realpath(self.base_dir)
+            path = os.path.realpath(os.path.join(base, str(name)))
+            if os.path.commonpath((base, path)) != base:
+                return None
+            return path if os.path.exists(path) else None
+        stem = os.path.join(self.base_dir, CONTENT_DIR, slugify(song.get("title", "")))
+        for ext in CONTENT_EXTENSIONS:
+            if os.path.exists(stem + ext):
+                return stem + ext
+        return None
+
+    def _layout(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None, []
+        with self._lock:
+            cached = self._layouts.get(path)
+        if cached and cached[0] == mtime:
+            return mtime, cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rows = parse_chordpro(f.read())
+        except (OSError, UnicodeDecodeError) as e:
+            ringlog.warning("❌ Could not read song content %s: %r", path, e)
+            return None, []
+        pages = layout_pages(rows, self.cols, self.rows_per_page)
+        with self._lock:
+            self._layouts[path] = (mtime, pages)
+        return mtime, pages
+
+    def page_count(self, song):
+        """Content pages for `song`; page 0 is always the title screen"""
+        path = self.content_path(song)
+        if path is None:
+            return 0
+        return len(self._layout(path)[1])
+
+    def _render(self, page_rows):
+        buf = bytearray(self.width * self.height * 3)
+        ascent = self.font.ascent
+        for i, (kind, text) in enumerate(page_rows):
+            self.font.draw(buf, self.width, self.height, 0, i * self.line_height + ascent,
+                           text, self.colors.get(kind, (255, 255, 255)))
+        return Image.frombytes("RGB", (self.width, self.height), bytes(buf))
+
+    def page_image(self, song, page):
+        """Image for content page `page` (1-based), rendering it now on a cache miss"""
+        path = self.content_path(song)
+        if path is None:
+            return None
+        mtime, pages = self._layout(path)
+        if not 1 <= page <= len(pages):
+            return None
+        key = (path, mtime, page)
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+        image = self._render(pages[page - 1])
+        with self._lock:
+            if key not in self._cache:
+                self.cached_bytes += self.page_bytes
+            self._cache[key] = image
+            while self.cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                self._cache.popitem(last=False)
+                self.cached_bytes -= self.page_bytes
+                self.evictions += 1
+        return image
+
+    def focus(self, setlist, index):
+        """The current song changed: prefetch it and its neighbours in the background"""
+        window = [setlist[index]]
+        if len(setlist) > 1:
+            window += [setlist[(index + 1) % len(setlist)], setlist[index - 1]]
+        with self._lock:
+            self._focus = window
+        self._wake.set()
+
+    def _prefetch(self):
+        with self._lock:
+            window = list(self._focus)
+        paths = set()
+        for n, song in enumerate(window):
+            path = self.content_path(song)
+            if path is None:
+                continue
+            paths.add(path)
+            pages = self._layout(path)[1]
+            # Every page of the current song, the first page of its neighbours
+            for page in range(1, (len(pages) if n == 0 else min(1, len(pages))) + 1):
+                self.page_image(song, page)
+        with self._lock:
+            for path in list(self._layouts):
+                if path not in paths:
+                    del self._layouts[path]
+
+    def _prefetch_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self._prefetch()
+            except Exception as e:
+                ringlog.error("❌ Page prefetch failed: %r", e)
+
+    def start(self):
+        threading.Thread(target=self._prefetch_loop, name="page_prefetch", daemon=True).start()
+        return self
+
+    def stats(self):
+        with self._lock:
+            return (f"pages cached={len(self._cache)} ({self.cached_bytes // 1024}/{self.cache_bytes // 1024} KB) "
+                    f"hits={self.hits} misses={self.misses} evictions={self.evictions}")
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Push the current song to subscribed controllers
+
+Tablets and phones learn about song changes the moment they happen instead
+of polling. Two ways in:
+
+    SUBSCRIBE on the command server (port 6789): the connection stays open
+        and gets one JSON line per change
+    a WebSocket on WS_PORT (any path): one JSON text message per change
+
+Either way the current state is sent first, then an event on every change:
+
+    {"idx":3,"count":9,"version":"5f0c9e1a2b3c4d5e","song":{"title":...}}
+
+`version` is the setlist hash (display_sync.setlist_hash), so a client
+knows when to fetch the list again. Each event is encoded once and queued
+on every subscriber. Sending never blocks the caller: a subscriber whose
+queue passes MAX_PENDING bytes, or that takes no data for STALL_SECONDS
+while some is waiting, is dropped, so a hung phone cannot hold up
+navigation or the other subscribers.
+
+Watch the events from a shell:
+    python3 state_push.py 192.168.1.206
+"""
+import base64
+import hashlib
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+import display_sync
+import metrics
+import ringlog
+
+WS_PORT = 6793
+MAX_PENDING = 32 * 1024     # Bytes queued for one subscriber before it is dropped
+STALL_SECONDS = 5.0         # Longest a subscriber may leave queued data unread
+HANDSHAKE_TIMEOUT = 5.0
+MAX_REQUEST = 4096          # WebSocket handshake, and unread client frames
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+dropped = metrics.counter("setlist_subscribers_dropped_total", "Subscribers disconnected by the server",
+                          label="reason")
+
+
+def ws_frame(payload, opcode=0x1):
+    """An unmasked, unfragmented server frame"""
+    size = len(payload)
+    if size < 126:
+        header = struct.pack("!BB", 0x80 | opcode, size)
+    elif size < 0x10000:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, size)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, size)
+    return header + payload
+
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1(key.strip() + WS_GUID).digest()).decode("ascii")
+
+
+def _read_frame(buf):
+    """(opcode, payload, bytes used) of the first whole client frame in buf, or None"""
+    if len(buf) < 2:
+        return None
+    opcode, size = buf[0] & 0x0F, buf[1] & 0x7F
+    masked = buf[1] & 0x80
+    pos = 2
+    if size == 126:
+        if len(buf) < 4:
+            return None
+        (size,) = struct.unpack_from("!H", buf, 2)
+        pos = 4
+    elif size == 127:
+        if len(buf) < 10:
+            return None
+        (size,) = struct.unpack_from("!Q", buf, 2)
+        pos = 10
+    mask = b""
+    if masked:
+        mask = bytes(buf[pos:pos + 4])
+        pos += 4
+    if len(buf) < pos + size:
+        return None
+    payload = bytes(buf[pos:pos + size])
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload, pos + size
+
+
+class Subscriber:
+    def __init__(self, conn, kind):
+        self.conn = conn
+        self.kind = kind            # "line", "ws", or "handshake" until the WebSocket upgrade is done
+        self.peer = _peer(conn)
+        self.pending = bytearray()
+        self.inbound = bytearray()
+        self.blocked_since = None   # Monotonic time data started waiting on a full socket
+        self.started = time.monotonic()
+        self.sent = 0
+
+
+def _peer(conn):
+    try:
+        name = conn.getpeername()
+    except OSError:
+        return "?"
+    return "%s:%d" % name[:2] if isinstance(name, tuple) else "local"
+
+
+class StateHub:
+    """Subscribers on one epoll set; a thread with run() or a reactor source
+
+    update(idx, setlist) is cheap and safe from any thread; the sending all
+    happens in step().
+    """
+
+    def __init__(self, port=WS_PORT, host="0.0.0.0"):
+        self._epoll = select.epoll()
+        self._lock = threading.Lock()
+        self._subs = {}             # fd -> Subscriber
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._epoll.register(self._wake_r, select.EPOLLIN)
+        self.sock = None
+        if port:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind((host, port))
+            self.sock.listen(16)
+            self.sock.setblocking(False)
+            self._epoll.register(self.sock.fileno(), select.EPOLLIN)
+        self._state = None          # (idx, version) of the last event
+        self._hashed = (None, None)
+        self._event = None          # Current state JSON, encoded once
+        self.events = 0
+
+    # -- Publishing (any thread) --
+
+    def update(self, idx, setlist):
+        """Queue an event for every subscriber if the song or setlist changed"""
+        if self._hashed[0] is not setlist:
+            self._hashed = (setlist, display_sync.setlist_hash(setlist).hex())
+        version = self._hashed[1]
+        with self._lock:
+            if self._state == (idx, version):
+                return
+            self._state = (idx, version)
+            song = setlist[idx] if 0 <= idx < len(setlist) else {}
+            self._event = json.dumps({"idx": idx, "count": len(setlist), "version": version, "song": song},
+                                     separators=(",", ":")).encode("utf-8")
+            self.events += 1
+            line, frame = self._event + b"\n", None
+            for sub in self._subs.values():
+                if sub.kind == "line":
+                    sub.pending += line
+                elif sub.kind == "ws":
+                    frame = frame or ws_frame(self._event)
+                    sub.pending += frame
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass   # A wakeup is already pending
+
+    def adopt(self, conn):
+        """Take over a command server connection that sent SUBSCRIBE"""
+        conn.setblocking(False)
+        self._add(conn, "line")
+        self._wakeup()
+
+    # -- Event loop side --
+
+    def _add(self, conn, kind):
+        sub = Subscriber(conn, kind)
+        with self._lock:
+            if kind == "line" and self._event is not None:
+                sub.pending += self._event + b"\n"
+            self._subs[conn.fileno()] = sub
+        self._epoll.register(conn.fileno(), select.EPOLLIN)
+        ringlog.info("📣 %s subscriber %s", "WebSocket" if kind == "handshake" else "Line", sub.peer)
+        return sub
+
+    def _drop(self, sub, reason):
+        fd = sub.conn.fileno()
+        if fd < 0:
+            return   # Already dropped
+        with self._lock:
+            self._subs.pop(fd, None)
+        try:
+            self._epoll.unregister(fd)
+        except (OSError, ValueError):
+            pass
+        sub.conn.close()
+        dropped.inc(reason)
+        if reason not in ("closed", "bye"):
+            ringlog.warning("📣 Dropped subscriber %s: %s", sub.peer, reason)
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                ringlog.warning("📣 accept failed: %r", e)
+                return
+            conn.setblocking(False)
+            self._add(conn, "handshake")
+
+    def _handshake(self, sub):
+        end = sub.inbound.find(b"\r\n\r\n")
+        if end < 0:
+            if len(sub.inbound) > MAX_REQUEST:
+                self._drop(sub, "bad handshake")
+            return
+        request, sub.inbound = bytes(sub.inbound[:end]), sub.inbound[end + 4:]
+        headers = {}
+        for line in request.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get(b"sec-websocket-key")
+        if b"websocket" not in headers.get(b"upgrade", b"").lower() or not key:
+            sub.conn.send(b"HTTP/1.1 426 Upgrade Required\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            self._drop(sub, "not websocket")
+            return
+        response = ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                    f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n").encode("ascii")
+        with self._lock:
+            sub.kind = "ws"
+            sub.pending[:0] = response + (ws_frame(self._event) if self._event is not None else b"")
+
+    def _client_frames(self, sub):
+        while True:
+            frame = _read_frame(sub.inbound)
+            if frame is None:
+                if len(sub.inbound) > MAX_REQUEST:
+                    self._drop(sub, "frame too large")
+                return
+            opcode, payload, used = frame
+            del sub.inbound[:used]
+            if opcode == 0x8:
+                with self._lock:
+                    sub.pending += ws_frame(payload[:2], 0x8)
+                self._flush(sub)
+                self._drop(sub, "bye")
+                return
+            if opcode == 0x9:
+                with self._lock:
+                    sub.pending += ws_frame(payload, 0xA)
+
+    def _read(self, sub):
+        try:
+            data = sub.conn.recv(MAX_REQUEST)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(sub, "closed")
+            return
+        if sub.kind == "line":
+            return   # Nothing to say to a line subscriber; it just listens
+        sub.inbound += data
+        if sub.kind == "handshake":
+            self._handshake(sub)
+        if sub.kind == "ws":
+            self._client_frames(sub)
+
+    def _flush(self, sub):
+        """Send what the socket takes; True if the subscriber is still there"""
+        with self._lock:
+            if sub.kind == "handshake" or not sub.pending:
+                data = None
+            elif len(sub.pending) > MAX_PENDING:
+                data = False
+            else:
+                data = bytes(sub.pending)
+        if data is False:
+            self._drop(sub, "too slow")
+            return False
+        if data is None:
+            return True
+        try:
+            sent = sub.conn.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(sub, "closed")
+            return False
+        with self._lock:
+            del sub.pending[:sent]
+            waiting = bool(sub.pending)
+        sub.sent += sent
+        if waiting and sub.blocked_since is None:
+            sub.blocked_since = time.monotonic()
+        elif not waiting:
+            sub.blocked_since = None
+        try:
+            self._epoll.modify(sub.conn.fileno(), select.EPOLLIN | (select.EPOLLOUT if waiting else 0))
+        except (OSError, ValueError):
+            pass
+        return True
+
+    def fileno(self):
+        return self._epoll.fileno()
+
+    def next_deadline(self):
+        deadlines = []
+        with self._lock:
+            for sub in self._subs.values():
+                if sub.kind == "handshake":
+                    deadlines.append(sub.started + HANDSHAKE_TIMEOUT)
+                elif sub.blocked_since is not None:
+                    deadlines.append(sub.blocked_since + STALL_SECONDS)
+        return min(deadlines) if deadlines else None
+
+    def step(self, timeout=0):
+        """Accept, read and send whatever is ready, waiting up to `timeout` seconds (None: forever)"""
+        for fd, events in self._epoll.poll(-1 if timeout is None else timeout):
+            if fd == self._wake_r:
+                try:
+                    os.read(self._wake_r, 4096)
+                except BlockingIOError:
+                    pass
+            elif self.sock is not None and fd == self.sock.fileno():
+                self._accept()
+            else:
+                sub = self._subs.get(fd)
+                if sub is not None and events & (select.EPOLLIN | select.EPOLLHUP | select.EPOLLERR):
+                    self._read(sub)
+        now = time.monotonic()
+        for sub in list(self._subs.values()):
+            if sub.kind == "handshake" and now - sub.started > HANDSHAKE_TIMEOUT:
+                self._drop(sub, "handshake timeout")
+            elif sub.blocked_since is not None and now - sub.blocked_since > STALL_SECONDS:
+                self._drop(sub, "stalled")
+            elif sub.conn.fileno() >= 0:
+                self._flush(sub)
+
+    def run(self):
+        while True:
+            deadline = self.next_deadline()
+            self.step(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def count(self):
+        return len(self._subs)
+
+    def stats_line(self):
+        with self._lock:
+            subs = list(self._subs.values())
+        lines = [f"events={self.events} subscribers={len(subs)} "
+                 f"dropped={sum(v for _, v in dropped.items())}"]
+        for sub in subs:
+            lines.append(f"  {sub.kind} {sub.peer} sent={sub.sent} pending={len(sub.pending)}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        sys.exit(1)
+    with socket.create_connection((sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 6789)) as conn:
+        conn.sendall(b"SUBSCRIBE\n")
+        for line in conn.makefile("r", encoding="utf-8"):
+            print(line.rstrip())
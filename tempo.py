@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Beat grid for songs with a tempo
+
+A song may carry "bpm" and an optional "time_signature" ("3/4", "6/8", ...;
+4/4 by default). Beat n falls at anchor + n * 60 / bpm, computed from the
+monotonic song-change time rather than by adding up sleeps, so a late frame
+never pushes later beats back and panels sharing an anchor pulse together.
+The first bar(s) after a song change are a count-in.
+"""
+import math
+
+PULSE_TIME = 0.12          # Seconds the beat marker stays lit after each beat
+COUNT_IN_BARS = 1          # Bars counted in after a song change (0 to skip)
+MIN_BPM = 20
+MAX_BPM = 400
+
+_EPSILON = 1e-4
+
+
+def parse_signature(value):
+    """(beats per bar, note value) from "3/4", [3, 4] or 3; 4/4 if unusable"""
+    try:
+        if isinstance(value, str):
+            beats, _, unit = value.partition("/")
+            beats, unit = int(beats), int(unit or 4)
+        elif isinstance(value, (list, tuple)):
+            beats, unit = int(value[0]), int(value[1])
+        else:
+            beats, unit = int(value), 4
+    except (TypeError, ValueError, IndexError):
+        return 4, 4
+    if beats < 1 or unit < 1:
+        return 4, 4
+    return beats, unit
+
+
+def song_tempo(song):
+    """(bpm, beats per bar) for a song, or None if it has no usable bpm"""
+    try:
+        bpm = float(song.get("bpm") or 0)
+    except (TypeError, ValueError):
+        return None
+    if not MIN_BPM <= bpm <= MAX_BPM:
+        return None
+    beats, unit = parse_signature(song.get("time_signature", "4/4"))
+    if unit == 8 and beats % 3 == 0 and beats > 3:
+        beats //= 3  # Compound time: pulse the dotted-quarter beats the bpm usually counts
+    return bpm, beats
+
+
+class BeatGrid:
+    """Where the beat is at a given monotonic time"""
+
+    def __init__(self, bpm, beats_per_bar=4, anchor=0.0, count_in_bars=COUNT_IN_BARS):
+        self.bpm = bpm
+        self.beats_per_bar = beats_per_bar
+        self.period = 60.0 / bpm
+        self.anchor = anchor
+        self.count_in = count_in_bars * beats_per_bar
+        self.pulse = min(PULSE_TIME, self.period / 2)
+
+    def beat_time(self, n):
+        return self.anchor + n * self.period
+
+    def beat_index(self, now):
+        """Number of the latest beat at `now`, or -1 before the first one"""
+        if now < self.anchor:
+            return -1
+        return int(math.floor((now - self.anchor) / self.period))
+
+    def mark(self, now):
+        """(beat number, beat in bar, counting in, lit), or None before the first beat"""
+        n = self.beat_index(now)
+        if n < 0:
+            return None
+        lit = now - self.beat_time(n) < self.pulse
+        return n, n % self.beats_per_bar, n < self.count_in, lit
+
+    def next_change(self, now):
+        """Monotonic time the marker next changes: the next beat or the end of a pulse"""
+        n = self.beat_index(now)
+        if n < 0:
+            return self.anchor + _EPSILON
+        start = self.beat_time(n)
+        if now - start < self.pulse:
+            return start + self.pulse + _EPSILON
+        return self.beat_time(n + 1) + _EPSILON
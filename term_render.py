@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Truecolor terminal view of the panel framebuffer
+
+Every terminal cell shows two panel pixels with the upper half block "▀"
+(foreground = top pixel, background = bottom pixel), so a 64x32 panel takes
+64x16 cells. Only cells that changed since the last frame are sent, using
+cursor addressing and colour changes only where needed, so a scrolling title
+costs a few KB/s over SSH. The panel sits at the top of the terminal and
+everything else that is printed scrolls in a region below it.
+
+    SETLIST_HEADLESS=term python3 main.py     # the real render loop, in a terminal
+    python3 term_render.py                    # test pattern
+"""
+import os
+import sys
+import time
+
+HALF_BLOCK = "▀"
+PANEL_TOP = 2        # Terminal row of the first cell row (1-based), below the border
+PANEL_LEFT = 2
+
+
+class TerminalRenderer:
+    """Draws RGB framebuffers (row-major, 3 bytes per pixel) into a terminal"""
+
+    def __init__(self, width, height, stream=None):
+        self.width = width
+        self.height = height
+        self.rows = (height + 1) // 2
+        self.stream = stream or sys.stdout
+        self._row_bytes = [None] * self.rows   # Previous frame, two pixel rows per cell row
+        self.frames = 0
+        self.bytes_written = 0
+        self._started = False
+
+    def _setup(self):
+        try:
+            term_rows = os.get_terminal_size(self.stream.fileno()).lines
+        except (OSError, ValueError, AttributeError):
+            term_rows = 48
+        bottom = PANEL_TOP + self.rows
+        border = "┌" + "─" * self.width + "┐"
+        out = ["\x1b[?25l\x1b[2J\x1b[H", border]
+        for row in range(self.rows):
+            out.append(f"\x1b[{PANEL_TOP + row};1H│\x1b[{PANEL_TOP + row};{PANEL_LEFT + self.width}H│")
+        out.append(f"\x1b[{bottom};1H└" + "─" * self.width + "┘")
+        # Everything printed from now on scrolls below the panel
+        out.append(f"\x1b[{bottom + 1};{term_rows}r\x1b[{bottom + 1};1H")
+        self._write("".join(out))
+        self._started = True
+
+    def _write(self, text):
+        self.bytes_written += len(text.encode("utf-8"))
+        self.stream.write(text)
+        self.stream.flush()
+
+    def draw(self, pixels):
+        """Show a frame; returns the number of cells that changed"""
+        if not self._started:
+            self._setup()
+        width = self.width
+        stride = width * 3
+        out = []
+        fg = bg = None
+        changed = 0
+        cursor = None
+        for row in range(self.rows):
+            top_line = 2 * row * stride
+            has_bottom = 2 * row + 1 < self.height
+            row_bytes = bytes(pixels[top_line:top_line + 2 * stride])
+            if row_bytes == self._row_bytes[row]:
+                continue
+            previous = self._row_bytes[row]
+            self._row_bytes[row] = row_bytes
+            for x in range(width):
+                i = x * 3
+                top = row_bytes[i:i + 3]
+                bottom = row_bytes[stride + i:stride + i + 3] if has_bottom else b"\0\0\0"
+                if previous is not None and previous[i:i + 3] == top and \
+                        previous[stride + i:stride + i + 3] == bottom:
+                    continue
+                changed += 1
+                if cursor != (row, x):
+                    out.append(f"\x1b[{PANEL_TOP + row};{PANEL_LEFT + x}H")
+                if bottom != bg:
+                    out.append(f"\x1b[48;2;{bottom[0]};{bottom[1]};{bottom[2]}m")
+                    bg = bottom
+                if top == bottom:
+                    out.append(" ")   # Background alone will do; no colour change
+                    cursor = (row, x + 1)
+                    continue
+                if top != fg:
+                    out.append(f"\x1b[38;2;{top[0]};{top[1]};{top[2]}m")
+                    fg = top
+                out.append(HALF_BLOCK)
+                cursor = (row, x + 1)
+        self.frames += 1
+        if out:
+            # Save/restore the cursor so output scrolling below is not disturbed
+            self._write("\x1b7" + "".join(out) + "\x1b[0m\x1b8")
+        return changed
+
+    def close(self):
+        if self._started:
+            self._write("\x1b[0m\x1b[r\x1b[?25h\n")
+            self._started = False
+
+
+def _demo():
+    width, height = 64, 32
+    renderer = TerminalRenderer(width, height)
+    pixels = bytearray(width * height * 3)
+    started = time.monotonic()
+    try:
+        for frame in range(300):
+            pixels[:] = bytes(len(pixels))
+            for y in range(height):
+                for x in range(width):
+                    if (x + frame) % 16 < 8 and y > 20:
+                        i = (y * width + x) * 3
+                        pixels[i:i + 3] = bytes((x * 4, y * 8, 255 - x * 4))
+            bar = frame % width
+            for y in range(4, 14):
+                i = (y * width + bar) * 3
+                pixels[i:i + 3] = b"\xff\x00\x00"
+            renderer.draw(pixels)
+            time.sleep(1 / 30)
+    finally:
+        renderer.close()
+    elapsed = time.monotonic() - started
+    print(f"📺 {renderer.frames} frames, {renderer.bytes_written / elapsed / 1024:.1f} KB/s")
+
+
+if __name__ == "__main__":
+    _demo()
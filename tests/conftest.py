@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the top of the repository, next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SETLIST_HEADLESS", "1")
@@ -0,0 +1,86 @@
+import queue
+import socket
+
+import pytest
+
+import display_sync
+
+SETLIST = [{"title": "One", "key": "C", "capo": 0}, {"title": "Two", "key": "G", "capo": 2}]
+
+
+def _free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_packet_round_trip():
+    set_hash = display_sync.setlist_hash(SETLIST)
+    packet = display_sync.pack_state(7, 42, set_hash, 1, 2.5)
+    assert display_sync.unpack_state(packet) == (7, 42, set_hash, 1, 2.5)
+    assert display_sync.unpack_state(b"XXXX" + packet[4:]) is None
+    assert display_sync.unpack_state(packet[:-1]) is None
+
+
+def test_follower_drops_stale_and_counts_lost():
+    follower = display_sync.SyncFollower.__new__(display_sync.SyncFollower)
+    follower.session, follower.seq, follower.lost, follower.stale = None, 0, 0, 0
+    assert follower._accept(1, 10)
+    assert not follower._accept(1, 10)
+    assert follower._accept(1, 13)
+    assert (follower.lost, follower.stale) == (2, 1)
+    assert follower._accept(2, 1)   # Leader restarted
+
+
+@pytest.fixture
+def pair():
+    """Leader and follower on loopback with free ports; yields (leader, applied states queue)"""
+    port = _free_port(socket.SOCK_DGRAM)
+    fetch_port = _free_port(socket.SOCK_STREAM)
+    applied = queue.Queue()
+    try:
+        follower = display_sync.SyncFollower(lambda setlist, index, phase: applied.put((setlist, index)),
+                                             b"", port=port, fetch_port=fetch_port, iface="127.0.0.1")
+    except OSError as e:
+        pytest.skip(f"no multicast on loopback: {e}")
+    leader = display_sync.SyncLeader(port=port, fetch_port=fetch_port, iface="127.0.0.1", interval=0.05)
+    leader.set_setlist(SETLIST)
+    leader.publish(0)
+    follower.start()
+    leader.start()
+    yield leader, applied
+    follower.sock.close()
+    leader.sock.close()
+
+
+def _next(applied, timeout=2.0):
+    try:
+        return applied.get(timeout=timeout)
+    except queue.Empty:
+        pytest.fail("follower applied nothing")
+
+
+def test_follower_fetches_setlist_then_follows_song_changes(pair):
+    leader, applied = pair
+    setlist, index = _next(applied)
+    while setlist is None:   # Heartbeats before the fetch finished
+        setlist, index = _next(applied)
+    assert setlist == SETLIST
+    assert index == 0
+    leader.publish(1)
+    while index != 1:
+        setlist, index = _next(applied)
+    assert setlist is None   # Same hash now: no second fetch
+
+
+def test_stalled_fetch_does_not_block_other_followers(monkeypatch):
+    monkeypatch.setattr(display_sync, "FETCH_TIMEOUT", 0.2)
+    fetch_port = _free_port(socket.SOCK_STREAM)
+    leader = display_sync.SyncLeader(port=_free_port(socket.SOCK_DGRAM), fetch_port=fetch_port,
+                                     iface="127.0.0.1", interval=1.0)
+    leader.set_setlist(SETLIST)
+    leader.start()
+    with socket.create_connection(("127.0.0.1", fetch_port)):   # Connects, never asks
+        fetched = display_sync.fetch_setlist("127.0.0.1", display_sync.setlist_hash(SETLIST), fetch_port)
+    assert fetched == SETLIST
+    leader.sock.close()
@@ -0,0 +1,47 @@
+import os
+
+import frame_capture
+import visual_regress
+
+WIDTH, HEIGHT = 8, 4
+SIZE = WIDTH * HEIGHT * 3
+
+
+def test_delta_round_trip():
+    key = bytes(range(SIZE))
+    changed = bytearray(key)
+    changed[10:13] = b"\xff\x00\x7f"
+    payload = frame_capture.encode(bytes(changed), key)
+    assert len(payload) < 10
+    assert frame_capture.decode(payload, key, SIZE) == bytes(changed)
+    assert frame_capture.decode(frame_capture.encode(key), None, SIZE) == key
+
+
+def test_capture_keeps_every_distinct_frame(tmp_path):
+    path = str(tmp_path / "run.slfc")
+    frames = [bytes([i]) * SIZE for i in (0, 1, 1, 2)]
+    writer = frame_capture.CaptureWriter(path, WIDTH, HEIGHT)
+    for t, frame in enumerate(frames):
+        writer.note(frame, float(t), block=True)
+    writer.close()
+    width, height, _, read = frame_capture.read_capture(path)
+    assert (width, height) == (WIDTH, HEIGHT)
+    assert [frame for _, frame in read] == [frames[0], frames[1], frames[3]]
+    assert frame_capture.diff(path, path) == []
+
+
+def test_navigation_matches_the_golden_capture(tmp_path):
+    """Rendering regression: after an intended change, run visual_regress.py --update"""
+    path = str(tmp_path / "run.slfc")
+    visual_regress.run(visual_regress.SCRIPT, path, str(tmp_path))
+    assert frame_capture.diff(path, visual_regress.GOLDEN, str(tmp_path / "diffs")) == []
+
+
+def test_golden_run_turns_chart_pages():
+    import main as app
+    app.load_setlist()
+    app.setup_pages(prefetch=False)
+    song = app.setlist[1]
+    assert song["title"] == "House of the Rising Sun"
+    assert app.pages.content_path(song) == os.path.join(visual_regress.HERE, "songs", "house_of_the_rising_sun.cho")
+    assert app.pages.page_count(song) >= 2   # The script's two PAGE NEXT each show a new page
@@ -0,0 +1,87 @@
+import threading
+
+import gpio_buttons
+
+MS = 1_000_000
+PIN = 17
+
+
+def _reader(**kwargs):
+    """(ButtonInput on a MockLineProvider, list of fired actions)"""
+    fired = []
+    button = gpio_buttons.Button(PIN, lambda: fired.append("press"),
+                                 on_long_press=lambda: fired.append("long"), **kwargs)
+    provider = gpio_buttons.MockLineProvider((PIN,))
+    return gpio_buttons.ButtonInput([button], provider), button, provider, fired
+
+
+def _edges(reader, provider, edges):
+    """Inject (ms, low) edges, then hand them to the reader as the kernel would"""
+    for at_ms, low in edges:
+        provider.inject(PIN, low, at_ms * MS)
+    for pin, falling, timestamp_ns in provider.read_events():
+        reader.handle_edge(pin, falling, timestamp_ns)
+
+
+def test_bouncy_press_fires_once():
+    reader, button, provider, fired = _reader()
+    _edges(reader, provider, [(0, True), (2, False), (4, True), (6, False), (8, True)])
+    reader.handle_timers(40 * MS)
+    assert fired == ["press"]
+    assert button.bounces == 4
+    assert button.pressed
+    reader.close()
+
+
+def test_settle_check_reads_the_level_after_a_bounce():
+    reader, button, provider, fired = _reader()
+    # Released inside the window: only the settle check sees that the button is up
+    _edges(reader, provider, [(0, True), (5, False)])
+    assert button.pressed
+    reader.handle_timers(30 * MS)
+    assert not button.pressed
+    assert fired == ["press"]
+    reader.close()
+
+
+def test_long_press_fires_after_the_hold_time():
+    reader, button, provider, fired = _reader(long_press_ms=800)
+    _edges(reader, provider, [(0, True)])
+    reader.handle_timers(799 * MS)
+    assert fired == ["press"]
+    reader.handle_timers(800 * MS)
+    reader.handle_timers(900 * MS)
+    assert fired == ["press", "long"]
+    reader.close()
+
+
+def test_window_shrinks_for_a_clean_switch_and_grows_for_a_bouncy_one():
+    reader, button, provider, fired = _reader(debounce_ms=30)
+    t = 0
+    for _ in range(gpio_buttons.ADAPT_AFTER // 2 + 1):
+        _edges(reader, provider, [(t, True), (t + 100, False)])
+        t += 200
+    assert button.debounce_ns == gpio_buttons.MIN_DEBOUNCE_MS * MS
+    # Two taps 15 ms apart now count twice
+    _edges(reader, provider, [(t, True), (t + 15, False), (t + 30, True)])
+    assert fired.count("press") == gpio_buttons.ADAPT_AFTER // 2 + 3
+    t += 1000
+    # A switch that bounces for 8 ms widens the window at once
+    _edges(reader, provider, [(t, False), (t + 500, True), (t + 504, False), (t + 508, True)])
+    reader.handle_timers((t + 600) * MS)
+    assert button.debounce_ns == 16 * MS
+    _edges(reader, provider, [(t + 1000, False), (t + 1012, True), (t + 1014, False)])
+    assert button.bounces == 4   # 12 ms later is still bounce under the 16 ms window
+    reader.close()
+
+
+def test_run_stops_and_closes_its_pipe():
+    reader, button, provider, fired = _reader()
+    thread = threading.Thread(target=reader.run)
+    thread.start()
+    provider.inject(PIN, True)
+    reader.stop()
+    thread.join(2.0)
+    assert not thread.is_alive()
+    assert reader._closed
+    reader.stop()   # A second stop must not write to a closed fd
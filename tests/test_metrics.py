@@ -0,0 +1,17 @@
+import metrics
+
+
+def test_rate_is_not_capped_and_weights_by_amount(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metrics.time, "monotonic", lambda: now[0])
+    counter = metrics.Counter("test_total", "test", label="key")
+    for _ in range(100):            # 10 s at 300 events and 3000 bytes per second
+        for _ in range(30):
+            counter.inc("events")
+            counter.inc("bytes", 10)
+        now[0] += 0.1
+    assert abs(counter.rate("events") - 300) < 1
+    assert abs(counter.rate("bytes") - 3000) < 10
+    assert counter.value("events") == 3000
+    now[0] += 60                    # Nothing since: old seconds no longer count
+    assert counter.rate("events") == 0.0
@@ -0,0 +1,35 @@
+import osc_input
+
+
+def _server(got):
+    actions = {"goto": got.append, "next": lambda: got.append("next"), "prev": None, "set": None}
+    return osc_input.OscServer(actions, lambda: (0, "", 1), port=0, host="127.0.0.1")
+
+
+def _send(server, packet, host="10.0.0.2"):
+    server.handle(bytearray(packet), len(packet), (host, 9000))
+
+
+def test_goto_rounds_floats_and_rejects_non_finite():
+    got = []
+    server = _server(got)
+    try:
+        for value in (float("nan"), float("inf"), float("-inf"), 2.6, 3):
+            _send(server, osc_input.message("/setlist/goto", value))
+        assert got == [3, 3]
+        assert server.counts["malformed"] == 3
+    finally:
+        server.sock.close()
+
+
+def test_retransmitted_sequence_number_is_dropped():
+    got = []
+    server = _server(got)
+    try:
+        _send(server, osc_input.message("/setlist/next", 17))
+        _send(server, osc_input.message("/setlist/next", 17))
+        _send(server, osc_input.message("/setlist/next", 17), host="10.0.0.3")
+        assert got == ["next", "next"]
+        assert server.counts["duplicate"] == 1
+    finally:
+        server.sock.close()
@@ -0,0 +1,10 @@
+import ringlog
+
+
+def test_recent_returns_at_least_one_and_never_the_whole_ring_for_zero():
+    for n in range(5):
+        ringlog.info("line %d", n)
+    assert ringlog.recent(2)[-1].endswith("line 4")
+    assert len(ringlog.recent(2)) == 2
+    assert len(ringlog.recent(0)) == 1
+    assert len(ringlog.recent(-3)) == 1
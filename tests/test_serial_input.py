@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+import serial_input
+
+
+def test_frames_split_on_cr_and_lf_and_keep_partial_lines():
+    port = serial_input.SerialPort("/dev/null")
+    assert port.frames(b"NEXT\nPREV\r\nGOTO 3\nNE") == ["NEXT", "PREV", "GOTO 3"]
+    assert port.frames(b"XT\n") == ["NEXT"]
+    assert port.commands == 4
+
+
+def test_overlong_frame_is_dropped_to_the_next_terminator():
+    port = serial_input.SerialPort("/dev/null")
+    assert port.frames(b"x" * (serial_input.MAX_FRAME + 1)) == []
+    assert port.frames(b"still the same line\nNEXT\n") == ["NEXT"]
+    assert port.errors == 1
+
+
+def test_rate_counts_only_bytes_since_the_last_open():
+    port = serial_input.SerialPort("/dev/null")
+    port.open(serial_input.DEFAULT_BAUD)
+    port.frames(b"x" * 1000)
+    port.close()
+    port.open(serial_input.DEFAULT_BAUD)
+    port.frames(b"NEXT\n")
+    port.opened_at -= 1.0
+    try:
+        assert "bytes=1005 (5.0B/s)" in port.stats()
+        assert "reconnects=1" in port.stats()
+    finally:
+        port.close()
+
+
+@pytest.fixture
+def pty():
+    """(master fd, slave path) of a fresh pseudo-terminal"""
+    master, slave = os.openpty()
+    path = os.ttyname(slave)
+    os.close(slave)
+    yield master, path
+    try:
+        os.close(master)
+    except OSError:
+        pass
+
+
+def _pump(reader, received, count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(received) < count and time.monotonic() < deadline:
+        reader.step(0.05)
+    return received
+
+
+def test_commands_from_a_pty_arrive_in_order(pty):
+    master, path = pty
+    received = []
+    reader = serial_input.SerialInput(lambda line, port: received.append((line, port)), patterns=[path])
+    reader.step(0)
+    assert reader.ports[path].fd is not None
+    os.write(master, b"NEXT\nPREV\r\nGOTO 3\nNE")
+    os.write(master, b"XT\n")
+    assert _pump(reader, received, 4) == [("NEXT", path), ("PREV", path), ("GOTO 3", path), ("NEXT", path)]
+    assert f"{path} open bytes=23 " in reader.stats_line()
+    reader.stop()
+    reader.run()
+    assert reader.ports[path].fd is None
+
+
+def test_hangup_closes_the_port_and_a_new_device_is_opened(pty):
+    master, path = pty
+    received = []
+    reader = serial_input.SerialInput(lambda line, port: received.append(line), patterns=[path])
+    reader.step(0)
+    os.write(master, b"NEXT\n")
+    _pump(reader, received, 1)
+    os.close(master)
+    deadline = time.monotonic() + 2.0
+    while reader.ports[path].fd is not None and time.monotonic() < deadline:
+        reader.step(0.05)
+    assert reader.ports[path].fd is None
+    assert reader.ports[path].errors == 1
+
+    master2, slave2 = os.openpty()
+    path2 = os.ttyname(slave2)
+    os.close(slave2)
+    try:
+        reader.add_pattern(path2)
+        reader.step(0)
+        os.write(master2, b"GOTO 1\n")
+        assert _pump(reader, received, 2) == ["NEXT", "GOTO 1"]
+    finally:
+        os.close(master2)
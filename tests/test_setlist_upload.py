@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import setlist_upload
+
+SETLIST = [{"title": "One", "key": "C", "capo": 0}, {"title": "Two", "key": "G", "capo": 2}]
+
+
+@pytest.mark.parametrize("data, rest", [
+    (b"UPLOAD\n\0\0", b"\n\0\0"),
+    (b"upload \0", b" \0"),
+    (b"UPLOAD", b""),
+    (b"UPLOADS\n", None),
+    (b"uploaded\n", None),
+    (b"NEXT\n", None),
+])
+def test_only_the_upload_word_starts_an_upload(data, rest):
+    assert setlist_upload.upload_data(data) == rest
+
+
+def test_stream_is_checked_and_renamed_into_place(tmp_path):
+    path = tmp_path / "setlist.json"
+    session = setlist_upload.UploadSession(str(path))
+    stream = setlist_upload.encode(json.dumps(SETLIST).encode(), chunk_bytes=16)
+    assert session.feed(setlist_upload.upload_data(stream))
+    assert session.commit() == SETLIST
+    assert json.loads(path.read_text()) == SETLIST
+    assert [p.name for p in tmp_path.iterdir()] == ["setlist.json"]
+
+
+def test_bad_setlist_leaves_no_temporary_file(tmp_path):
+    session = setlist_upload.UploadSession(str(tmp_path / "setlist.json"))
+    session.feed(setlist_upload.upload_data(setlist_upload.encode(b'[{"key": "C"}]')))
+    with pytest.raises(setlist_upload.UploadError):
+        session.commit()
+    assert list(tmp_path.iterdir()) == []
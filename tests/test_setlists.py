@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+import setlists
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(setlists, "_loaded", setlists.OrderedDict())
+    monkeypatch.setattr(setlists, "_loaded_bytes", 0)
+    monkeypatch.setattr(setlists, "cache_bytes", setlists.CACHE_BYTES)
+    for name in ("early", "late", "encore"):
+        songs = [{"title": f"{name} {n}", "key": "C", "capo": 0} for n in range(20)]
+        (tmp_path / f"{name}.json").write_text(json.dumps(songs))
+    return str(tmp_path)
+
+
+def test_load_is_case_insensitive_and_checks_the_setlist(directory):
+    name, setlist = setlists.load("LATE", directory)
+    assert name == "late"
+    assert len(setlist) == 20
+    with pytest.raises(ValueError):
+        setlists.load("missing", directory)
+
+
+def test_parsed_setlists_stay_within_the_budget(directory):
+    size = len(open(f"{directory}/early.json").read())
+    setlists.set_budget(2 * size)
+    assert setlists.preload(directory) == 3
+    assert list(setlists._loaded) == ["encore", "late"]   # Loaded in name order; "early" evicted
+    setlists.load("late", directory)     # Most recently used moves to the back
+    setlists.load("early", directory)
+    assert list(setlists._loaded) == ["late", "early"]
+    assert setlists._loaded_bytes <= 2 * size
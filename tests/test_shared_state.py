@@ -0,0 +1,36 @@
+import shared_state
+
+SETLIST = [{"title": "One", "key": "C", "capo": 0}, {"title": "Two", "key": "G", "capo": 2}]
+
+
+def test_state_and_setlist_reach_the_reader():
+    state = shared_state.SharedState()
+    applied = []
+    state.publish(1, 2, 100.5, 42.25, SETLIST)
+    state.receive(lambda *args: applied.append(args))
+    state.publish(0, 0, 101.0, 90.0)
+    state.receive(lambda *args: applied.append(args))
+    assert applied == [(SETLIST, 1, 2, 100.5, 42.25), (None, 0, 0, 101.0, 90.0)]
+
+
+def test_render_counters_are_shared():
+    state = shared_state.SharedState()
+    assert state.read_render() is None
+    state.publish_render(10, 3, 29.5, 0.002, 0.004)
+    assert state.read_render() == (10, 3, 29.5, 0.002, 0.004)
+
+
+def test_setlist_that_does_not_fit_is_refused():
+    state = shared_state.SharedState(setlist_bytes=64)
+    assert state.fits(SETLIST[:1])
+    assert not state.fits(SETLIST * 4)
+
+
+def test_reader_gives_up_on_a_writer_that_died_mid_write():
+    state = shared_state.SharedState()
+    state.publish(1, 0, 1.0, 0.0, SETLIST)
+    state.buf[0] |= 1   # Odd sequence, never made even again
+    assert state.read() is None
+    applied = []
+    state.receive(lambda *args: applied.append(args))
+    assert applied == []
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Visual regression check for the panel rendering
+
+Drives a scripted navigation run through handle_command on a headless
+display and draws every frame at fixed points in virtual time (FPS per
+second after each command), so a run renders the same pixels every time.
+The clock and set timer are pinned and the battery icon hidden, since they
+depend on the wall clock and the pedal. The frames go to a capture that is
+compared with a golden one, frame by frame; any rendering change shows up
+as the first frame that differs, with golden / new / changed pixels images.
+
+    python3 visual_regress.py --update          # after an intended change
+    python3 visual_regress.py                   # exit status 1 on any difference
+    python3 visual_regress.py --script run.txt --golden golden/run.slfc
+
+A script is one "<seconds> <command>" per line: the command, then that many
+seconds of frames. Text is drawn with the built-in placeholder glyphs, so the
+committed golden matches on every machine; --fonts renders with real BDF
+fonts instead, for a golden kept next to the panel. The run uses the charts
+in songs/ and setlist.json, so changing those needs --update too.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+os.environ.setdefault("SETLIST_HEADLESS", "1")
+
+import frame_capture
+import main as app
+import ringlog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN = os.path.join(HERE, "golden", "navigation.slfc")
+FPS = 30
+PINNED_TEXT = {"clock": "12:00", "set_timer": "0:00"}
+
+# Every kind of screen change: transitions, a long title's marquee, chart pages, wrap-around
+SCRIPT = [
+    (1.5, "GOTO 0"),
+    (1.0, "NEXT"),
+    (4.0, "NEXT"),
+    (1.0, "PREV"),
+    (0.5, "PAGE NEXT"),
+    (0.5, "PAGE NEXT"),
+    (0.5, "PAGE 0"),
+    (1.0, "PREV"),
+    (1.0, "PREV"),
+    (1.0, "GOTO 5"),
+]
+
+
+def load_script(path):
+    script = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            seconds, _, command = line.partition(" ")
+            try:
+                script.append((float(seconds), command.strip()))
+            except ValueError:
+                raise SystemExit(f"{path}:{number}: expected '<seconds> <command>'")
+    return script
+
+
+def _pin_volatile_layers():
+    app._screen = app._build_screen()
+    for layer in app._screen.layers:
+        if layer.name in PINNED_TEXT:
+            layer.text = lambda now, text=PINNED_TEXT[layer.name]: text
+        elif layer.name == "battery":
+            layer.content = lambda now: None
+
+
+def run(script, path, font_dir):
+    """Render the script into a capture at `path`; returns the frame count
+
+    Fonts come from `font_dir`; one without the panel's .bdf files gives
+    placeholder glyphs.
+    """
+    app.BDF_FONT_DIR = os.path.join(font_dir, "")
+    app.load_setlist()
+    app.setup_pages(prefetch=False)
+    _pin_volatile_layers()
+    capture = frame_capture.CaptureWriter(path, app.options.cols, app.options.rows)
+    t = 0.0
+    changed_at = since = None
+    for seconds, command in script:
+        app.handle_command(command, source="tcp")
+        if app.song_changed_at != changed_at:
+            changed_at, since = app.song_changed_at, 0.0
+        for step in range(max(1, round(seconds * FPS))):
+            app.draw_screen(force=True, now=changed_at + since + step / FPS)
+            capture.note(bytes(app.matrix.front.pixels), t + step / FPS, block=True)
+        since += seconds
+        t += seconds
+    capture.close()
+    return capture.frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scripted panel rendering with a golden capture")
+    parser.add_argument("--golden", default=GOLDEN, help="golden capture (default golden/navigation.slfc)")
+    parser.add_argument("--script", help="navigation script instead of the built-in one")
+    parser.add_argument("--fonts", metavar="DIR", help="BDF font directory (default: placeholder glyphs)")
+    parser.add_argument("--update", action="store_true", help="write the golden capture from this run")
+    parser.add_argument("--keep", metavar="PATH", help="also keep this run's capture here")
+    parser.add_argument("--png", metavar="DIR", help="write images of differing frames here")
+    args = parser.parse_args()
+    ringlog.start(open(os.devnull, "w"))
+    script = load_script(args.script) if args.script else SCRIPT
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.slfc")
+        try:
+            frames = run(script, path, args.fonts or tmp)   # tmp has no fonts: placeholder glyphs
+        finally:
+            ringlog.stop()
+        if args.keep:
+            shutil.copyfile(path, args.keep)
+        if args.update:
+            os.makedirs(os.path.dirname(os.path.abspath(args.golden)), exist_ok=True)
+            shutil.copyfile(path, args.golden)
+            print(f"🎥 Golden capture {args.golden} updated: {frames} distinct frames")
+            return
+        if not os.path.exists(args.golden):
+            sys.exit(f"❌ No golden capture at {args.golden}; make one with --update")
+        problems = frame_capture.diff(path, args.golden, args.png)
+    for problem in problems[:20]:
+        print(f"❌ {problem}")
+    if len(problems) > 20:
+        print(f"   ... and {len(problems) - 20} more")
+    if problems:
+        sys.exit(1)
+    print(f"✅ {frames} frames match {args.golden}")
+
+
+if __name__ == "__main__":
+    main()